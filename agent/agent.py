@@ -20,12 +20,18 @@ from agent.router import Router
 from agent.pipeline import Pipeline
 from agent.memory import Memory
 from agent.agent_task import run_tasks
+from agent.services.crawler.board_demand import record_board_demand
+from agent.services.indexing.content_store import post_texts
 from infrastructure.model_factory.factory import chat_model
 from utils.prompt_loader import load_answer_sufficiency_prompt
 from utils.logger_handler import logger
 from agent.tools.summarize import rag_summarize
 
 
+# RAG 参考资料中每篇帖子正文的最大字数（从正文存储按需读取）
+RAG_POST_BODY_CHARS = 800
+
+
 def _invoke_cb(callbacks: Optional[Dict[str, Callable]], name: str, *args, **kwargs) -> None:
     """若 callbacks 中存在 name 且为可调用，则调用，忽略异常。"""
     if not callbacks or not callable(callbacks.get(name)):
@@ -51,6 +57,7 @@ class Agent:
         from agent.tools.query import (
             query_user_data,
             query_post_data,
+            query_post_meta,
             query_structure_boards,
         )
         from agent.tools.search import crawl_board_recent_posts
@@ -58,6 +65,7 @@ class Agent:
         self.tools_registry = {
             "query_user_data": query_user_data,
             "query_post_data": query_post_data,
+            "query_post_meta": query_post_meta,
             "query_structure_data": query_structure_boards,
             "crawl_board_recent_posts": crawl_board_recent_posts,
         }
@@ -135,16 +143,28 @@ class Agent:
             task, tool_name, self.tools_registry, context=context
         )
         # 记录本任务使用的版面，供充分性判断时按版面逐一排查
-        if tool_name in ("query_post_data", "crawl_board_recent_posts"):
+        if tool_name in ("query_post_data", "query_post_meta", "crawl_board_recent_posts"):
             used = context.get("selected_boards") or []
             result = dict(result) if isinstance(result, dict) else {"status": "failed", "result": result}
             result["board_path_used"] = used[:1] if isinstance(used, list) else [used] if used else []
         self.memory.update_task_result(
             conversation_id, task.get("id", ""), result, task.get("description", "")
         )
+        self._record_board_demand(conversation_id, tool_name, result)
         success = result.get("status") == "success"
         return success, result
 
+    def _record_board_demand(self, conversation_id: str, tool_name: str, result: Dict[str, Any]) -> None:
+        """记录本任务涉及的版面需求（实际查询/爬取的版面与结构检索选中的版面），供后台刷新热门版面。"""
+        try:
+            if result.get("board_path_used"):
+                record_board_demand(result["board_path_used"], source="used")
+            elif tool_name == "query_structure_data" and result.get("status") == "success":
+                selected = self.memory.get_context(conversation_id).get("selected_boards") or []
+                record_board_demand(selected, source="selected")
+        except Exception as e:
+            logger.debug("记录版面需求失败: %s", e)
+
     def _needs_replanning(self, result: dict, task: dict, tool_name: str = "") -> bool:
         """判断是否需要重新规划（含结果充分性：帖子过少可触发爬取）。"""
         if result.get("status") == "failed":
@@ -361,9 +381,21 @@ class Agent:
             return "暂未检索到可用的具体内容。"
         return "\n".join(parts)
 
+    @staticmethod
+    def _post_bodies(completed_tasks: list) -> dict:
+        """按帖子链接（doc_key）从正文存储批量读取正文开头，供 RAG 上下文使用；读不到的帖子不出现。"""
+        urls = []
+        for item in completed_tasks:
+            result = item.get("result")
+            if not result or result.get("status") != "success" or not isinstance(result.get("result"), list):
+                continue
+            urls.extend(it["url"] for it in result["result"] if isinstance(it, dict) and it.get("url"))
+        return post_texts(dict.fromkeys(urls), max_chars=RAG_POST_BODY_CHARS) if urls else {}
+
     def _build_rag_context(self, completed_tasks: list) -> str:
-        """从已完成任务中拼出供 RAG 总结使用的参考资料全文；本地文件优先，其次版面/帖子。"""
+        """从已完成任务中拼出供 RAG 总结使用的参考资料全文；本地文件优先，其次版面/帖子。帖子正文取自正文存储，缺失时用结果中的摘要。"""
         lines = []
+        bodies = self._post_bodies(completed_tasks)
         for item in completed_tasks:
             result = item.get("result")
             if not result or result.get("status") != "success":
@@ -376,13 +408,16 @@ class Agent:
             for it in raw:
                 if not isinstance(it, dict):
                     continue
+                body = (bodies.get(it.get("url", "")) or "").strip()
                 # 本地文件（用户上传/用户数据）：有 file 且无 hierarchy_path，优先纳入并带内容摘要
                 file_path = it.get("file", "")
                 content_preview = (it.get("content_preview") or "").strip()
                 hierarchy_path = it.get("hierarchy_path") or it.get("board_path") or ""
                 if file_path and not hierarchy_path:
                     line = f"本地文件：{file_path}"
-                    if content_preview:
+                    if body:
+                        line += f"；正文：{body}"
+                    elif content_preview:
                         line += f"；内容摘要：{content_preview}"
                     lines.append(line)
                     continue
@@ -400,7 +435,9 @@ class Agent:
                     parts.append(f"标题：{title}")
                 if url:
                     parts.append(f"链接：{url}")
-                if post_preview:
+                if body:
+                    parts.append(f"正文：{body}")
+                elif post_preview:
                     parts.append(f"内容摘要：{post_preview}")
                 if agree_count not in (None, ""):
                     parts.append(f"赞同/点赞：{agree_count}")
@@ -3,11 +3,27 @@ Pipeline，Pipeline是Agent的执行流程，负责协调Agent的各个组件，
 '''
 import asyncio
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Dict, Any, Optional, List
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from utils.logger_handler import logger
 
+# 用户问题含以下词时，帖子查询启用时效衰减排序
+RECENCY_KEYWORDS = ("最近", "最新", "近期", "这几天", "本周", "这周", "今天")
+RECENCY_HALF_LIFE_DAYS = 7.0
+# 用户问题含以下词时，帖子查询按回复数排序，直接走元数据侧存储
+HOT_POST_KEYWORDS = ("回复最多", "最热", "热门", "热帖", "讨论最多")
+# 时间范围词 -> 回溯天数
+DATE_RANGE_KEYWORDS = {"今天": 0, "本周": 7, "这周": 7, "这几天": 3, "本月": 30, "这个月": 30}
+
+
+def _date_from_keywords(user_input: str) -> Optional[str]:
+    """按问题中的时间范围词返回日期下限（YYYY-MM-DD），没有时返回 None。"""
+    for word, days in DATE_RANGE_KEYWORDS.items():
+        if word in user_input:
+            return (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+    return None
+
 
 class Pipeline:
     def __init__(self, max_workers: int = 3, task_timeout: int = 30):
@@ -194,6 +210,29 @@ class Pipeline:
             params.update({"k": 10, "include_content_preview": True})
         elif "post_data" in tool_name:
             params.update({"k": 10, "include_content_preview": False})
+            user_input = context.get("user_input") or ""
+            if any(word in user_input for word in HOT_POST_KEYWORDS):
+                # 问「最热/回复最多」类问题时，在与任务描述相关的帖子中按回复数排序
+                params["order_by"] = "reply_count"
+            elif any(word in user_input for word in RECENCY_KEYWORDS):
+                # 问「最近/最新」类问题时按发布时间衰减排序，优先用已索引的近期帖子回答
+                params["recency_half_life_days"] = RECENCY_HALF_LIFE_DAYS
+            date_from = _date_from_keywords(user_input)
+            if date_from:
+                params["date_from"] = date_from
+            if board_path:
+                params["board_path"] = board_path
+            elif section is not None and board is not None:
+                params["section"] = section
+                params["board"] = board
+        elif "post_meta" in tool_name:
+            # 结构化问题（回复最多、某段时间内的帖子）：直接查元数据侧存储，不做向量检索
+            user_input = context.get("user_input") or ""
+            hot = any(word in user_input for word in HOT_POST_KEYWORDS)
+            params.update({"k": 10, "order_by": "reply_count" if hot else "ts"})
+            date_from = _date_from_keywords(user_input)
+            if date_from:
+                params["date_from"] = date_from
             if board_path:
                 params["board_path"] = board_path
             elif section is not None and board is not None:
@@ -29,6 +29,11 @@ class Router:
                 "keywords": ["帖子内容", "版面帖子", "讨论内容", "帖子列表", "具体内容"],
                 "capabilities": {"works_offline": True, "requires_network": False},
             },
+            "query_post_meta": {
+                "description": "按版面、作者、日期、回复数查询帖子元数据",
+                "keywords": ["回复最多", "热帖", "讨论最多", "帖子元数据", "发帖时间"],
+                "capabilities": {"works_offline": True, "requires_network": False},
+            },
             "crawl_board_recent_posts": {
                 "description": "爬取指定版面的最近帖子并清理、向量化",
                 "keywords": ["爬取最近帖子", "爬取版面", "抓取帖子", "更新版面", "拉取最近"],
@@ -87,6 +92,10 @@ class Router:
             "版面结构": "query_structure_data",
             "讨论区": "query_structure_data",
             "论坛结构": "query_structure_data",
+            "回复最多": "query_post_meta",
+            "热帖": "query_post_meta",
+            "讨论最多": "query_post_meta",
+            "帖子元数据": "query_post_meta",
             "版面帖子": "query_post_data",
             "帖子内容": "query_post_data",
             "具体内容": "query_post_data",
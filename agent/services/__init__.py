@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""
+服务层：承载查询、索引、爬取等业务编排核心；agent/tools 仅做参数适配并调用此处实现。
+
+- query：检索结果融合等查询侧逻辑。
+- indexing：帖子记录解析与本地索引（词法倒排等）。
+"""
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+爬取服务：版面游标、版面需求与热门版面刷新排序、增量暂存与幂等落盘、论坛结构索引、浏览器会话池、HTTP 抓取与原始页面缓存、全局爬取调度与自适应并发、流式分阶段流水线、持久化任务队列与版面任务委派等爬取侧状态，供 agent/tools/search 调用。
+"""
+from .adaptive import (
+    AIMDController,
+    build_aimd_controller,
+    classify_outcome,
+)
+from .board_cursor import (
+    BoardCursorStore,
+    get_board_cursor_store,
+)
+from .board_demand import (
+    BoardDemandStore,
+    board_spec_from_path,
+    get_board_demand_store,
+    get_refresh_config,
+    plan_refresh,
+    record_board_demand,
+)
+from .board_jobs import (
+    BOARD_INGEST_JOB,
+    BoardSpec,
+    board_ingest_payload,
+    enqueue_board_ingest,
+    get_worker_config,
+    ingest_via_workers,
+)
+from .browser_pool import (
+    BrowserPool,
+    get_browser_pool,
+)
+from .http_fetcher import (
+    HttpFetchError,
+    HttpFetcher,
+    LoginRequiredError,
+    crawl_board_http,
+    get_http_fetcher,
+    parse_article,
+    parse_board_list,
+)
+from .incremental import (
+    get_crawler_config,
+    is_caught_up,
+    post_fingerprint,
+    promote_staged_files,
+)
+from .job_queue import (
+    JobQueue,
+    default_idempotency_key,
+    get_job_queue,
+    get_job_queue_config,
+    make_worker_id,
+)
+from .page_cache import (
+    PageCache,
+    get_page_cache,
+    scoped_key,
+)
+from .scheduler import (
+    CrawlScheduler,
+    TokenBucket,
+    get_crawl_scheduler,
+    get_crawler_scheduler_config,
+    host_of,
+)
+from .streaming import (
+    Stage,
+    get_pipeline_config,
+    run_stages,
+)
+from .structure_index import (
+    ForumStructureIndex,
+    get_structure_index,
+    resolve_board,
+    split_hierarchy_path,
+)
+
+__all__ = [
+    "AIMDController",
+    "build_aimd_controller",
+    "classify_outcome",
+    "BoardCursorStore",
+    "get_board_cursor_store",
+    "BoardDemandStore",
+    "board_spec_from_path",
+    "get_board_demand_store",
+    "get_refresh_config",
+    "plan_refresh",
+    "record_board_demand",
+    "BOARD_INGEST_JOB",
+    "BoardSpec",
+    "board_ingest_payload",
+    "enqueue_board_ingest",
+    "get_worker_config",
+    "ingest_via_workers",
+    "BrowserPool",
+    "get_browser_pool",
+    "HttpFetchError",
+    "HttpFetcher",
+    "LoginRequiredError",
+    "crawl_board_http",
+    "get_http_fetcher",
+    "parse_article",
+    "parse_board_list",
+    "get_crawler_config",
+    "is_caught_up",
+    "post_fingerprint",
+    "promote_staged_files",
+    "JobQueue",
+    "default_idempotency_key",
+    "get_job_queue",
+    "get_job_queue_config",
+    "make_worker_id",
+    "PageCache",
+    "get_page_cache",
+    "scoped_key",
+    "CrawlScheduler",
+    "TokenBucket",
+    "get_crawl_scheduler",
+    "get_crawler_scheduler_config",
+    "host_of",
+    "Stage",
+    "get_pipeline_config",
+    "run_stages",
+    "ForumStructureIndex",
+    "get_structure_index",
+    "resolve_board",
+    "split_hierarchy_path",
+]
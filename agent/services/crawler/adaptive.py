@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+爬取服务 - 自适应并发（AIMD）：根据页面延迟与错误率动态调整全局页面并发窗口。
+
+- 加性增：延迟（EWMA）不超过 latency_target_ms 且近期错误率低于 error_rate_threshold 时，
+  每累计「一个窗口」的成功请求，窗口 + additive_increase；
+- 乘性减：出现超时、429/5xx、登录挑战等拥塞信号时窗口 × multiplicative_decrease，
+  cooldown_seconds 内只减一次，避免同一波错误把窗口压到底；
+- 普通错误（如解析失败）只计入错误率，不直接触发减窗；
+- 归类按异常类型与状态码（LoginRequiredError、HttpFetchError.status 等），不匹配异常消息中的文字，
+  URL 或解析错误里出现 login 之类的字样不会被当作拥塞。
+
+由 CrawlScheduler 持有，窗口即调度器当前的页面并发上限；stats() 供日志与监控查看。
+配置见 config/crawler/crawler.json 的 aimd。
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+import asyncio
+import threading
+import time
+from collections import deque
+
+from utils.logger_handler import logger
+
+from agent.services.crawler.errors import LoginRequiredError
+
+OUTCOME_OK = "ok"
+OUTCOME_TIMEOUT = "timeout"
+OUTCOME_THROTTLED = "throttled"
+OUTCOME_SERVER_ERROR = "server_error"
+OUTCOME_LOGIN_CHALLENGE = "login_challenge"
+OUTCOME_ERROR = "error"
+
+CONGESTION_OUTCOMES = (OUTCOME_TIMEOUT, OUTCOME_THROTTLED, OUTCOME_SERVER_ERROR, OUTCOME_LOGIN_CHALLENGE)
+
+DEFAULT_AIMD_CONFIG = {
+    "enabled": True,
+    "initial_window": 16,
+    "min_window": 2,
+    "max_window": 64,
+    "additive_increase": 1,
+    "multiplicative_decrease": 0.5,
+    "latency_target_ms": 3000,
+    "error_rate_threshold": 0.1,
+    "sample_size": 50,
+    "cooldown_seconds": 5,
+}
+
+
+
+def _status_of(exc: BaseException) -> int | None:
+    """异常携带的 HTTP 状态码：HttpFetchError.status，或 requests 异常的 response.status_code。"""
+    status = getattr(exc, "status", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def classify_outcome(exc: BaseException | None = None, status: int | None = None) -> str:
+    """
+    把一次请求的结果归类为 ok / timeout / throttled / server_error / login_challenge / error。
+    :param exc: 请求抛出的异常（无异常时为 None）
+    :param status: HTTP 状态码（已知时）
+    """
+    if status is not None:
+        if status == 429:
+            return OUTCOME_THROTTLED
+        if status >= 500:
+            return OUTCOME_SERVER_ERROR
+    if exc is None:
+        return OUTCOME_OK
+    if isinstance(exc, LoginRequiredError):
+        return OUTCOME_LOGIN_CHALLENGE
+    # requests 的 ReadTimeout/ConnectTimeout、Playwright 的 TimeoutError 等按类型名识别
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError)) or "timeout" in type(exc).__name__.lower():
+        return OUTCOME_TIMEOUT
+    status = _status_of(exc)
+    if status is not None and (status == 429 or status >= 500):
+        return classify_outcome(status=status)
+    return OUTCOME_ERROR
+
+
+class AIMDController:
+    """线程安全的 AIMD 并发窗口控制器。"""
+
+    def __init__(
+        self,
+        initial_window: float = 16,
+        min_window: float = 2,
+        max_window: float = 64,
+        additive_increase: float = 1,
+        multiplicative_decrease: float = 0.5,
+        latency_target_ms: float = 3000,
+        error_rate_threshold: float = 0.1,
+        sample_size: int = 50,
+        cooldown_seconds: float = 5,
+    ):
+        self.min_window = max(float(min_window), 1.0)
+        self.max_window = max(float(max_window), self.min_window)
+        self.additive_increase = float(additive_increase)
+        self.multiplicative_decrease = min(max(float(multiplicative_decrease), 0.05), 0.95)
+        self.latency_target = float(latency_target_ms) / 1000.0
+        self.error_rate_threshold = float(error_rate_threshold)
+        self.cooldown_seconds = float(cooldown_seconds)
+        self._window = min(max(float(initial_window), self.min_window), self.max_window)
+        self._lock = threading.Lock()
+        self._recent: deque[bool] = deque(maxlen=max(int(sample_size), 1))
+        self._ewma_latency: float | None = None
+        self._acked = 0.0
+        self._last_decrease = 0.0
+        self._counts: dict[str, int] = {}
+        self._increases = 0
+        self._decreases = 0
+
+    @property
+    def window(self) -> int:
+        """当前并发窗口（向下取整，至少 min_window）。"""
+        return int(self._window)
+
+    def error_rate(self) -> float:
+        with self._lock:
+            return self._error_rate()
+
+    def _error_rate(self) -> float:
+        if not self._recent:
+            return 0.0
+        return sum(1 for ok in self._recent if not ok) / len(self._recent)
+
+    def record(self, outcome: str, latency: float | None = None) -> int:
+        """
+        记录一次请求结果并调整窗口。
+        :param outcome: classify_outcome 的结果
+        :param latency: 请求耗时（秒），未知时为 None（只看错误率）
+        :return: 调整后的窗口
+        """
+        with self._lock:
+            self._counts[outcome] = self._counts.get(outcome, 0) + 1
+            self._recent.append(outcome == OUTCOME_OK)
+            if latency is not None and outcome == OUTCOME_OK:
+                self._ewma_latency = latency if self._ewma_latency is None else 0.8 * self._ewma_latency + 0.2 * latency
+            if outcome in CONGESTION_OUTCOMES:
+                self._decrease(outcome)
+            elif outcome == OUTCOME_OK and self._healthy():
+                self._acked += 1
+                if self._acked >= self._window:
+                    self._acked = 0.0
+                    old = self._window
+                    self._window = min(self._window + self.additive_increase, self.max_window)
+                    if self._window > old:
+                        self._increases += 1
+            return int(self._window)
+
+    def _healthy(self) -> bool:
+        latency_ok = self._ewma_latency is None or self._ewma_latency <= self.latency_target
+        return latency_ok and self._error_rate() < self.error_rate_threshold
+
+    def _decrease(self, outcome: str) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown_seconds:
+            return
+        old = self._window
+        self._window = max(self._window * self.multiplicative_decrease, self.min_window)
+        self._acked = 0.0
+        self._last_decrease = now
+        if self._window < old:
+            self._decreases += 1
+            logger.warning(f"[aimd]{outcome}，并发窗口 {int(old)} -> {int(self._window)}")
+
+    def stats(self) -> dict:
+        """当前窗口、延迟 EWMA、近期错误率与各类结果计数。"""
+        with self._lock:
+            return {
+                "window": int(self._window),
+                "min_window": int(self.min_window),
+                "max_window": int(self.max_window),
+                "ewma_latency_ms": None if self._ewma_latency is None else round(self._ewma_latency * 1000, 1),
+                "error_rate": round(self._error_rate(), 3),
+                "increases": self._increases,
+                "decreases": self._decreases,
+                "outcomes": dict(self._counts),
+            }
+
+
+def build_aimd_controller(config: dict | None) -> AIMDController | None:
+    """按 crawler.json 的 aimd 配置创建控制器；enabled 为 false 时返回 None（使用固定并发上限）。"""
+    cfg = {**DEFAULT_AIMD_CONFIG, **(config or {})}
+    if not cfg.get("enabled"):
+        return None
+    return AIMDController(
+        initial_window=cfg["initial_window"],
+        min_window=cfg["min_window"],
+        max_window=cfg["max_window"],
+        additive_increase=cfg["additive_increase"],
+        multiplicative_decrease=cfg["multiplicative_decrease"],
+        latency_target_ms=cfg["latency_target_ms"],
+        error_rate_threshold=cfg["error_rate_threshold"],
+        sample_size=cfg["sample_size"],
+        cooldown_seconds=cfg["cooldown_seconds"],
+    )
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+爬取服务 - 版面游标：持久化每个版面已见过的最新帖子（时间、标识）与各帖子/文件的内容指纹。
+
+- board_cursors：(section, board) -> 最新帖子时间戳/标识、上次爬取时间与页数，用于增量爬取时判断是否已追上；
+- seen_posts：帖子稳定标识 -> 内容指纹，判断帖子是否已知、是否有变化；
+- seen_files：落盘文件（相对输出根目录）-> 内容指纹，作为幂等键，内容未变时不重写文件。
+
+路径见 config/crawler/crawler.json 的 cursor_store_path（默认 vector_db/dynamic/crawl_state.sqlite3）。
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+import time
+from typing import Iterable
+
+from utils.config_handler import load_json_config
+from utils.sqlite_handler import sqlite_session
+
+CRAWLER_CONFIG = "config/crawler/crawler.json"
+DEFAULT_CURSOR_STORE_PATH = "vector_db/dynamic/crawl_state.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS board_cursors (
+    section TEXT NOT NULL,
+    board TEXT NOT NULL,
+    newest_ts REAL,
+    newest_key TEXT,
+    last_crawl_at REAL,
+    last_pages INTEGER DEFAULT 0,
+    PRIMARY KEY (section, board)
+);
+CREATE TABLE IF NOT EXISTS seen_posts (
+    post_key TEXT PRIMARY KEY,
+    section TEXT,
+    board TEXT,
+    ts REAL,
+    fingerprint TEXT NOT NULL,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_seen_posts_board_ts ON seen_posts(section, board, ts);
+CREATE TABLE IF NOT EXISTS seen_files (
+    rel_path TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    updated_at REAL
+);
+"""
+
+
+class BoardCursorStore:
+    """版面游标与内容指纹的 SQLite 存储。"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        with sqlite_session(self.db_path) as conn:
+            conn.executescript(_SCHEMA)
+
+    def get_cursor(self, section: str, board: str) -> dict | None:
+        """读取版面游标：{newest_ts, newest_key, last_crawl_at, last_pages}，从未爬取过返回 None。"""
+        with sqlite_session(self.db_path) as conn:
+            row = conn.execute(
+                "SELECT newest_ts, newest_key, last_crawl_at, last_pages FROM board_cursors "
+                "WHERE section = ? AND board = ?",
+                (section, board),
+            ).fetchone()
+        return dict(row) if row else None
+
+    def advance_cursor(
+        self,
+        section: str,
+        board: str,
+        newest_ts: float | None,
+        newest_key: str,
+        pages: int,
+    ) -> None:
+        """记录本次爬取：最新帖子时间只前进不后退。"""
+        with sqlite_session(self.db_path) as conn:
+            conn.execute(
+                "INSERT INTO board_cursors(section, board, newest_ts, newest_key, last_crawl_at, last_pages) "
+                "VALUES(?, ?, ?, ?, ?, ?) ON CONFLICT(section, board) DO UPDATE SET "
+                "newest_key = CASE WHEN excluded.newest_ts >= COALESCE(newest_ts, excluded.newest_ts) "
+                "THEN excluded.newest_key ELSE newest_key END, "
+                "newest_ts = MAX(COALESCE(newest_ts, excluded.newest_ts), COALESCE(excluded.newest_ts, newest_ts)), "
+                "last_crawl_at = excluded.last_crawl_at, last_pages = excluded.last_pages",
+                (section, board, newest_ts, newest_key, time.time(), pages),
+            )
+
+    def post_fingerprints(self, post_keys: Iterable[str]) -> dict[str, dict]:
+        """批量读取已知帖子：{post_key: {"fingerprint", "ts"}}。"""
+        keys = list(dict.fromkeys(post_keys))
+        found: dict[str, dict] = {}
+        with sqlite_session(self.db_path) as conn:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                placeholders = ",".join("?" for _ in chunk)
+                for row in conn.execute(
+                    f"SELECT post_key, fingerprint, ts FROM seen_posts WHERE post_key IN ({placeholders})", chunk
+                ):
+                    found[row["post_key"]] = {"fingerprint": row["fingerprint"], "ts": row["ts"]}
+        return found
+
+    def file_fingerprint(self, rel_path: str) -> str | None:
+        """读取落盘文件的内容指纹。"""
+        with sqlite_session(self.db_path) as conn:
+            row = conn.execute("SELECT fingerprint FROM seen_files WHERE rel_path = ?", (rel_path,)).fetchone()
+        return row["fingerprint"] if row else None
+
+    def record(self, posts: Iterable[tuple], files: Iterable[tuple[str, str]]) -> None:
+        """
+        写入帖子与文件指纹。
+        :param posts: (post_key, section, board, ts, fingerprint) 序列
+        :param files: (rel_path, fingerprint) 序列
+        """
+        now = time.time()
+        with sqlite_session(self.db_path) as conn:
+            conn.executemany(
+                "INSERT INTO seen_posts(post_key, section, board, ts, fingerprint, updated_at) "
+                "VALUES(?, ?, ?, ?, ?, ?) ON CONFLICT(post_key) DO UPDATE SET section = excluded.section, "
+                "board = excluded.board, ts = excluded.ts, fingerprint = excluded.fingerprint, "
+                "updated_at = excluded.updated_at",
+                [(*p, now) for p in posts],
+            )
+            conn.executemany(
+                "INSERT INTO seen_files(rel_path, fingerprint, updated_at) VALUES(?, ?, ?) "
+                "ON CONFLICT(rel_path) DO UPDATE SET fingerprint = excluded.fingerprint, "
+                "updated_at = excluded.updated_at",
+                [(*f, now) for f in files],
+            )
+
+
+_default_store: BoardCursorStore | None = None
+
+
+def get_board_cursor_store() -> BoardCursorStore:
+    """获取版面游标存储（单例，路径取 crawler.json 的 cursor_store_path）。"""
+    global _default_store
+    if _default_store is None:
+        cfg = load_json_config(default_path=CRAWLER_CONFIG)
+        _default_store = BoardCursorStore(cfg.get("cursor_store_path") or DEFAULT_CURSOR_STORE_PATH)
+    return _default_store
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+爬取服务 - 版面需求与后台刷新排序：记录 Agent 运行中被查询的版面（selected_boards / board_path_used），
+按「需求 × 陈旧度」挑选最值得提前刷新的热门版面。
+
+- 需求分：每次查询累加权重，按半衰期指数衰减（half_life_hours），近期热门版面得分高；
+- 陈旧度：距上次爬取（版面游标 last_crawl_at）的时间 / target_freshness_seconds，封顶 max_staleness；从未爬取过取封顶值；
+- 预算：每轮最多 max_boards_per_cycle 个版面、合计 max_pages_per_cycle 页，min_refresh_interval_seconds 内爬过的版面不再刷新。
+
+路径与参数见 config/crawler/crawler.json 的 refresh（默认 vector_db/dynamic/board_demand.sqlite3）；
+enabled 默认 false，关闭时不记录版面需求。
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+import time
+from typing import Iterable
+
+from utils.config_handler import load_json_config
+from utils.sqlite_handler import sqlite_session
+
+from agent.services.crawler.board_cursor import CRAWLER_CONFIG, BoardCursorStore, get_board_cursor_store
+from agent.services.crawler.structure_index import split_hierarchy_path
+
+SECONDS_PER_HOUR = 3600.0
+
+DEFAULT_REFRESH_CONFIG = {
+    "enabled": False,
+    "demand_store_path": "vector_db/dynamic/board_demand.sqlite3",
+    "half_life_hours": 24,
+    "used_weight": 1.0,
+    "selected_weight": 0.5,
+    "min_demand": 0.5,
+    "interval_seconds": 900,
+    "max_boards_per_cycle": 8,
+    "max_pages_per_cycle": 16,
+    "pages_per_board": 1,
+    "target_freshness_seconds": 3600,
+    "min_refresh_interval_seconds": 600,
+    "max_staleness": 24,
+    "priority": 0,
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS board_demand (
+    board_path TEXT PRIMARY KEY,
+    score REAL NOT NULL,
+    total_hits INTEGER DEFAULT 0,
+    last_hit_at REAL
+);
+"""
+
+
+def get_refresh_config() -> dict:
+    """读取 crawler.json 的 refresh 配置（缺省项取默认值）。"""
+    return {**DEFAULT_REFRESH_CONFIG, **(load_json_config(default_path=CRAWLER_CONFIG).get("refresh") or {})}
+
+
+def board_spec_from_path(board_path: str) -> dict | None:
+    """「讨论区/[二级目录/]版面」转为 {"forum", "board", "sub_board"}，与 crawl_board_recent_posts 的解析一致。"""
+    parts = split_hierarchy_path(board_path)
+    if not parts:
+        return None
+    if len(parts) < 2:
+        return {"forum": "", "board": parts[0], "sub_board": None}
+    return {"forum": parts[0], "board": parts[-1], "sub_board": parts[1] if len(parts) > 2 else None}
+
+
+class BoardDemandStore:
+    """版面查询需求的 SQLite 存储（分数按半衰期衰减，读写时换算到当前时刻）。"""
+
+    def __init__(self, db_path: str, half_life_hours: float = 24):
+        self.db_path = db_path
+        self.half_life_seconds = max(float(half_life_hours), 0.01) * SECONDS_PER_HOUR
+        with sqlite_session(self.db_path) as conn:
+            conn.executescript(_SCHEMA)
+
+    def _decayed(self, score: float, last_hit_at: float | None, now: float) -> float:
+        if not last_hit_at:
+            return score
+        return score * 0.5 ** (max(now - last_hit_at, 0.0) / self.half_life_seconds)
+
+    def record(self, board_paths: Iterable[str], weight: float = 1.0) -> None:
+        """为每个版面累加一次需求（同一调用内重复的路径只计一次）。"""
+        paths = [p for p in dict.fromkeys(str(p).strip() for p in board_paths if p) if p]
+        if not paths or weight <= 0:
+            return
+        now = time.time()
+        with sqlite_session(self.db_path) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            placeholders = ",".join("?" for _ in paths)
+            existing = {
+                row["board_path"]: row
+                for row in conn.execute(
+                    f"SELECT board_path, score, last_hit_at FROM board_demand WHERE board_path IN ({placeholders})",
+                    paths,
+                )
+            }
+            rows = []
+            for path in paths:
+                row = existing.get(path)
+                score = self._decayed(row["score"], row["last_hit_at"], now) if row else 0.0
+                rows.append((path, score + weight, now))
+            conn.executemany(
+                "INSERT INTO board_demand(board_path, score, total_hits, last_hit_at) VALUES(?, ?, 1, ?) "
+                "ON CONFLICT(board_path) DO UPDATE SET score = excluded.score, "
+                "total_hits = total_hits + 1, last_hit_at = excluded.last_hit_at",
+                rows,
+            )
+
+    def demands(self, min_demand: float = 0.0) -> list[dict]:
+        """当前各版面需求：[{"board_path", "demand", "total_hits", "last_hit_at"}]，按需求降序。"""
+        now = time.time()
+        with sqlite_session(self.db_path) as conn:
+            rows = conn.execute("SELECT board_path, score, total_hits, last_hit_at FROM board_demand").fetchall()
+        items = [
+            {
+                "board_path": row["board_path"],
+                "demand": self._decayed(row["score"], row["last_hit_at"], now),
+                "total_hits": row["total_hits"],
+                "last_hit_at": row["last_hit_at"],
+            }
+            for row in rows
+        ]
+        items = [item for item in items if item["demand"] >= min_demand]
+        items.sort(key=lambda item: item["demand"], reverse=True)
+        return items
+
+    def prune(self, min_demand: float = 0.01) -> int:
+        """删除需求已衰减到 min_demand 以下的版面，返回删除条数。"""
+        stale = [item["board_path"] for item in self.demands() if item["demand"] < min_demand]
+        if stale:
+            with sqlite_session(self.db_path) as conn:
+                conn.executemany("DELETE FROM board_demand WHERE board_path = ?", [(p,) for p in stale])
+        return len(stale)
+
+
+def plan_refresh(
+    store: BoardDemandStore,
+    cursors: BoardCursorStore | None = None,
+    config: dict | None = None,
+) -> list[dict]:
+    """
+    按「需求 × 陈旧度」排序并在预算内挑选待刷新版面。
+    :return: [{"board_path", "spec", "demand", "staleness", "score", "max_pages", "last_crawl_at"}]，按 score 降序
+    """
+    cfg = config or get_refresh_config()
+    cursors = cursors or get_board_cursor_store()
+    now = time.time()
+    target = max(float(cfg["target_freshness_seconds"]), 1.0)
+    max_staleness = float(cfg["max_staleness"])
+    min_interval = float(cfg["min_refresh_interval_seconds"])
+    candidates = []
+    for item in store.demands(min_demand=float(cfg["min_demand"])):
+        spec = board_spec_from_path(item["board_path"])
+        if spec is None:
+            continue
+        cursor = cursors.get_cursor(spec["forum"], spec["board"])
+        last_crawl_at = (cursor or {}).get("last_crawl_at")
+        if last_crawl_at is None:
+            staleness = max_staleness
+        else:
+            age = now - last_crawl_at
+            if age < min_interval:
+                continue
+            staleness = min(age / target, max_staleness)
+        candidates.append({
+            **item,
+            "spec": spec,
+            "staleness": staleness,
+            "score": item["demand"] * staleness,
+            "last_crawl_at": last_crawl_at,
+        })
+    candidates.sort(key=lambda c: c["score"], reverse=True)
+
+    pages_per_board = max(int(cfg["pages_per_board"]), 1)
+    pages_left = int(cfg["max_pages_per_cycle"])
+    selected = []
+    for cand in candidates[:max(int(cfg["max_boards_per_cycle"]), 0)]:
+        if pages_left < pages_per_board:
+            break
+        selected.append({**cand, "max_pages": pages_per_board})
+        pages_left -= pages_per_board
+    return selected
+
+
+_default_store: BoardDemandStore | None = None
+
+
+def get_board_demand_store() -> BoardDemandStore:
+    """获取版面需求存储（单例，路径取 crawler.json 的 refresh.demand_store_path）。"""
+    global _default_store
+    if _default_store is None:
+        cfg = get_refresh_config()
+        _default_store = BoardDemandStore(
+            cfg.get("demand_store_path") or DEFAULT_REFRESH_CONFIG["demand_store_path"],
+            half_life_hours=cfg["half_life_hours"],
+        )
+    return _default_store
+
+
+def record_board_demand(board_paths: Iterable[str], weight: float | None = None, source: str = "used") -> None:
+    """
+    记录一次版面需求（Agent 调用）。
+    :param source: "used" 为实际查询/爬取的版面（used_weight），"selected" 为结构检索选中的候选版面（selected_weight）
+    """
+    cfg = get_refresh_config()
+    if not cfg.get("enabled"):
+        return
+    if weight is None:
+        weight = float(cfg["selected_weight"] if source == "selected" else cfg["used_weight"])
+    get_board_demand_store().record(board_paths, weight)
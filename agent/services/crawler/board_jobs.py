@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+爬取服务 - 版面任务定义与委派：版面「爬取 -> 清理 -> 向量化」任务的类型、payload 与入队，
+以及 Agent 侧把任务交给独立 worker 进程执行（ingest_via_workers）。
+
+只依赖任务队列与配置，批量流程（tools/search/search）与 worker（tools/search/ingest_jobs）都从这里导入，
+两者之间不再相互引用。worker 参数见 config/crawler/crawler.json 的 workers。
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+from typing import TypedDict
+
+from utils.config_handler import load_json_config
+
+from agent.services.crawler.board_cursor import CRAWLER_CONFIG
+from agent.services.crawler.job_queue import STATE_SUCCEEDED, JobQueue, get_job_queue
+
+BOARD_INGEST_JOB = "board_ingest"
+
+DEFAULT_WORKER_CONFIG = {
+    "ingest_mode": "auto",
+    "processes": 2,
+    "poll_interval_seconds": 2,
+    "heartbeat_seconds": 15,
+    "worker_stale_seconds": 60,
+    "agent_wait_seconds": 120,
+    "agent_priority": 10,
+    "nice": 10,
+}
+
+
+class BoardSpec(TypedDict):
+    """单个版面配置：讨论区、版面名、可选二级目录。"""
+    forum: str
+    board: str
+    sub_board: str | None
+
+
+def board_ingest_payload(
+    spec: BoardSpec,
+    max_pages: int,
+    output_root: str | None = None,
+    data_root: str | None = None,
+) -> dict:
+    """版面爬取->清理->向量化任务的 payload（同一 payload 的默认幂等键相同）。"""
+    return {
+        "forum": spec["forum"],
+        "board": spec["board"],
+        "sub_board": spec.get("sub_board"),
+        "max_pages": max_pages,
+        "output_root": output_root,
+        "data_root": data_root,
+    }
+
+
+def get_worker_config() -> dict:
+    """读取 crawler.json 的 workers 配置（缺省项取默认值）。"""
+    return {**DEFAULT_WORKER_CONFIG, **(load_json_config(default_path=CRAWLER_CONFIG).get("workers") or {})}
+
+
+def enqueue_board_ingest(
+    forum: str,
+    board: str,
+    sub_board: str | None = None,
+    max_pages: int = 1,
+    priority: int = 0,
+    queue: JobQueue | None = None,
+    dedupe: bool = True,
+) -> dict:
+    """
+    把一个版面的爬取->清理->向量化任务按幂等键入队，返回任务 dict。
+    :param dedupe: 为 False 时不复用 dedupe 窗口内已成功的任务（见 JobQueue.enqueue）
+    """
+    spec: BoardSpec = {"forum": forum, "board": board, "sub_board": sub_board}
+    queue = queue or get_job_queue()
+    return queue.enqueue(BOARD_INGEST_JOB, board_ingest_payload(spec, max_pages), priority=priority, dedupe=dedupe)
+
+
+def ingest_via_workers(
+    forum: str,
+    board: str,
+    sub_board: str | None = None,
+    max_pages: int = 1,
+) -> dict | None:
+    """
+    Agent 侧：把版面任务交给独立 worker 进程执行并等待结果（最多 agent_wait_seconds 秒）。
+    显式请求总是重新爬取：不复用 dedupe 窗口内已成功的任务，只合并正在排队或执行的同一任务。
+    :return: 成功时 {"success": True, "saved_paths", "cleaned_count", "vector_store_ok", "job_id"}；
+             失败或等待超时时 {"success": False, "job_id", "state", "error"}；
+             应在本进程执行时（ingest_mode=inline，或 auto 且无在线 worker）返回 None
+    """
+    cfg = get_worker_config()
+    mode = str(cfg.get("ingest_mode") or "auto").lower()
+    if mode == "inline":
+        return None
+    queue = get_job_queue()
+    if mode == "auto" and not queue.active_workers(cfg["worker_stale_seconds"]):
+        return None
+    job = enqueue_board_ingest(
+        forum, board, sub_board, max_pages=max_pages, priority=cfg["agent_priority"], queue=queue, dedupe=False,
+    )
+    done = queue.wait([job["id"]], timeout=cfg["agent_wait_seconds"], poll_interval=cfg["poll_interval_seconds"])
+    job = done.get(job["id"], job)
+    if job["state"] == STATE_SUCCEEDED:
+        result = job.get("result") or {}
+        return {
+            "success": True,
+            "saved_paths": result.get("saved_paths", []),
+            "cleaned_count": result.get("cleaned_count", 0),
+            "vector_store_ok": bool(result.get("ok")),
+            "job_id": job["id"],
+        }
+    return {
+        "success": False,
+        "job_id": job["id"],
+        "state": job["state"],
+        "error": job.get("error") or "等待超时，任务仍在队列中",
+    }
@@ -0,0 +1,322 @@
+# -*- coding: utf-8 -*-
+"""
+爬取服务 - 浏览器会话池：在独立事件循环线程中维护若干已启动、已登录的 GlobalBrowser，供 Agent 按需爬取时借用，
+避免每个爬取任务都冷启动 Chromium 并重新登录。
+
+- 健康检查：借出前检查浏览器连接，失效则关闭重建；
+- 会话复用：首次登录后保存 cookies，新建浏览器时直接注入，在有效期内不再走登录流程；
+- 过期重登：会话超过 session_ttl_seconds 后借出前重新登录；
+- 页面上限：所有借用者的页面并发之和不超过 max_total_pages，超出时等待；
+- 回收：单个浏览器借出 max_uses 次后关闭重建，防止长期运行的内存增长；
+- 导出：export_cookies 把登录后的 cookies 交给 HTTP 抓取模式复用。
+
+Playwright 对象绑定创建它的事件循环，借用者通过 run() 把协程提交到池的事件循环线程执行，同步阻塞等待结果。
+配置见 config/crawler/crawler.json 的 browser_pool。
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+import asyncio
+import atexit
+import threading
+import time
+from typing import Any, Awaitable, Callable, TypeVar
+
+from utils.config_handler import load_json_config
+from utils.logger_handler import logger
+
+from agent.services.crawler.board_cursor import CRAWLER_CONFIG
+
+T = TypeVar("T")
+
+DEFAULT_POOL_CONFIG = {
+    "size": 2,
+    "max_total_pages": 32,
+    "session_ttl_seconds": 1800,
+    "max_uses": 50,
+    "headless": True,
+}
+
+
+class _Session:
+    """池中的一个浏览器会话。"""
+
+    def __init__(self, browser: Any):
+        self.browser = browser
+        self.logged_in_at: float | None = None
+        self.uses = 0
+
+
+class BrowserPool:
+    """已登录浏览器会话池（运行在独立事件循环线程中）。"""
+
+    def __init__(
+        self,
+        size: int = 2,
+        max_total_pages: int = 32,
+        session_ttl_seconds: float = 1800,
+        max_uses: int = 50,
+        headless: bool = True,
+    ):
+        self.size = max(int(size), 1)
+        self.max_total_pages = max(int(max_total_pages), 1)
+        self.session_ttl_seconds = float(session_ttl_seconds)
+        self.max_uses = max(int(max_uses), 1)
+        self.headless = headless
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        # 以下状态只在池的事件循环中访问
+        self._idle: list[_Session] = []
+        self._created = 0
+        self._pages_in_use = 0
+        self._cond: asyncio.Condition | None = None
+        self._cookies: list[dict] | None = None
+        self._cookies_at: float | None = None
+        self._closed = False
+
+    # ---------- 事件循环线程 ----------
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._closed:
+                raise RuntimeError("浏览器池已关闭")
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def _run_loop() -> None:
+                    asyncio.set_event_loop(loop)
+                    self._cond = asyncio.Condition()
+                    ready.set()
+                    loop.run_forever()
+
+                self._thread = threading.Thread(target=_run_loop, name="browser-pool", daemon=True)
+                self._thread.start()
+                ready.wait()
+                self._loop = loop
+            return self._loop
+
+    def run(
+        self,
+        fn: Callable[[Any, int], Awaitable[T]],
+        pages: int = 16,
+        timeout: float | None = None,
+    ) -> T:
+        """
+        借用一个已登录浏览器执行 fn(browser, pages)，同步等待结果；结束后自动归还。
+        :param fn: 接收 (browser, 实际分配的页面并发数) 的协程函数
+        :param pages: 申请的页面并发数（不超过 max_total_pages）
+        :param timeout: 等待结果的秒数，None 表示不限
+        """
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(self._lease_and_run(fn, pages), loop)
+        return future.result(timeout=timeout)
+
+    async def _lease_and_run(self, fn: Callable[[Any, int], Awaitable[T]], pages: int) -> T:
+        pages = min(max(int(pages), 1), self.max_total_pages)
+        await self._acquire_pages(pages)
+        session = None
+        healthy = True
+        try:
+            session = await self._acquire_session()
+            return await fn(session.browser, pages)
+        except Exception:
+            healthy = False
+            raise
+        finally:
+            if session is not None:
+                # 爬取本身出错不一定是浏览器坏了，再做一次健康检查决定是否回收
+                if not healthy:
+                    healthy = await self._is_healthy(session)
+                await self._release_session(session, healthy)
+            await self._release_pages(pages)
+
+    # ---------- 页面额度 ----------
+
+    async def _acquire_pages(self, pages: int) -> None:
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._pages_in_use + pages <= self.max_total_pages)
+            self._pages_in_use += pages
+
+    async def _release_pages(self, pages: int) -> None:
+        async with self._cond:
+            self._pages_in_use -= pages
+            self._cond.notify_all()
+
+    # ---------- 会话 ----------
+
+    async def _acquire_session(self) -> _Session:
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._idle or self._created < self.size)
+            if self._idle:
+                session = self._idle.pop()
+            else:
+                self._created += 1
+                session = None
+        try:
+            if session is None or not await self._is_healthy(session):
+                if session is not None:
+                    await self._close_session(session)
+                session = _Session(await self._start_browser())
+            await self._ensure_login(session)
+        except Exception:
+            if session is not None:
+                await self._close_session(session)
+            async with self._cond:
+                self._created -= 1
+                self._cond.notify_all()
+            raise
+        session.uses += 1
+        return session
+
+    async def _release_session(self, session: _Session, healthy: bool) -> None:
+        if not healthy or session.uses >= self.max_uses or self._closed:
+            await self._close_session(session)
+            async with self._cond:
+                self._created -= 1
+                self._cond.notify_all()
+            return
+        async with self._cond:
+            self._idle.append(session)
+            self._cond.notify_all()
+
+    async def _start_browser(self) -> Any:
+        from infrastructure.browser_manager.browser_manager import GlobalBrowser
+
+        browser = GlobalBrowser(headless=self.headless)
+        await browser.start()
+        logger.info("[browser_pool]已启动浏览器")
+        return browser
+
+    @staticmethod
+    def _context_of(browser: Any) -> Any:
+        return getattr(browser, "context", None)
+
+    async def _is_healthy(self, session: _Session) -> bool:
+        inner = getattr(session.browser, "browser", None)
+        checker = getattr(inner, "is_connected", None) or getattr(session.browser, "is_connected", None)
+        if checker is None:
+            return True
+        try:
+            result = checker()
+            return bool(await result) if asyncio.iscoroutine(result) else bool(result)
+        except Exception:
+            return False
+
+    def _session_fresh(self, logged_in_at: float | None) -> bool:
+        return logged_in_at is not None and time.time() - logged_in_at < self.session_ttl_seconds
+
+    async def _ensure_login(self, session: _Session) -> None:
+        """会话过期时重新登录；池内已有有效 cookies 时直接注入，省去登录往返。"""
+        if self._session_fresh(session.logged_in_at):
+            return
+        context = self._context_of(session.browser)
+        if context is not None and self._cookies and self._session_fresh(self._cookies_at):
+            try:
+                await context.add_cookies(self._cookies)
+                session.logged_in_at = self._cookies_at
+                return
+            except Exception as e:
+                logger.warning(f"[browser_pool]注入 cookies 失败，改为重新登录: {e}")
+
+        from utils.env_handler import get_bbs_credentials
+        from infrastructure.browser_manager.login import login
+
+        username, password = get_bbs_credentials()
+        if not (username and password):
+            session.logged_in_at = time.time()
+            return
+        await login(session.browser, username, password)
+        session.logged_in_at = time.time()
+        if context is not None:
+            try:
+                self._cookies = await context.cookies()
+                self._cookies_at = session.logged_in_at
+            except Exception as e:
+                logger.warning(f"[browser_pool]读取登录 cookies 失败: {e}")
+        logger.info("[browser_pool]浏览器已登录")
+
+    async def _close_session(self, session: _Session) -> None:
+        try:
+            await session.browser.close()
+        except Exception as e:
+            logger.warning(f"[browser_pool]关闭浏览器失败: {e}")
+
+    # ---------- 会话导出 ----------
+
+    def export_cookies(self, force_login: bool = False, timeout: float | None = None) -> list[dict]:
+        """
+        导出已登录会话的 cookies，供 HTTP 抓取复用（一次浏览器登录，多次 HTTP 请求）。
+        :param force_login: 为 True 时先作废现有登录状态并重新登录（HTTP 侧遇到登录挑战时使用）
+        """
+        if force_login:
+            asyncio.run_coroutine_threadsafe(self._invalidate_login(), self._ensure_loop()).result(timeout=timeout)
+
+        async def _export(browser: Any, _pages: int) -> list[dict]:
+            context = self._context_of(browser)
+            return list(await context.cookies()) if context is not None else []
+
+        return self.run(_export, pages=1, timeout=timeout)
+
+    async def _invalidate_login(self) -> None:
+        self._cookies = None
+        self._cookies_at = None
+        for session in self._idle:
+            session.logged_in_at = None
+
+    # ---------- 状态与关闭 ----------
+
+    def stats(self) -> dict:
+        """当前池状态：已创建/空闲会话数、占用页面数。"""
+        return {
+            "size": self.size,
+            "created": self._created,
+            "idle": len(self._idle),
+            "pages_in_use": self._pages_in_use,
+            "max_total_pages": self.max_total_pages,
+        }
+
+    async def _close_all(self) -> None:
+        while self._idle:
+            await self._close_session(self._idle.pop())
+            self._created -= 1
+
+    def close(self, timeout: float = 30.0) -> None:
+        """关闭全部空闲浏览器并停止事件循环线程；借出中的会话归还时关闭。"""
+        with self._start_lock:
+            if self._closed:
+                return
+            self._closed = True
+            loop = self._loop
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._close_all(), loop).result(timeout=timeout)
+        except Exception as e:
+            logger.warning(f"[browser_pool]关闭浏览器池失败: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+
+
+_default_pool: BrowserPool | None = None
+_default_pool_lock = threading.Lock()
+
+
+def get_browser_pool() -> BrowserPool:
+    """获取进程内浏览器池（单例，参数取 crawler.json 的 browser_pool），进程退出时自动关闭。"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            cfg = {**DEFAULT_POOL_CONFIG, **(load_json_config(default_path=CRAWLER_CONFIG).get("browser_pool") or {})}
+            _default_pool = BrowserPool(
+                size=cfg["size"],
+                max_total_pages=cfg["max_total_pages"],
+                session_ttl_seconds=cfg["session_ttl_seconds"],
+                max_uses=cfg["max_uses"],
+                headless=cfg["headless"],
+            )
+            atexit.register(_default_pool.close)
+        return _default_pool
@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+"""
+爬取服务 - 抓取异常：HTTP 抓取与 AIMD 结果归类共用的异常类型（http_fetcher 抛出，adaptive 按类型归类）。
+"""
+
+
+class HttpFetchError(Exception):
+    """HTTP 抓取失败（含状态码时 status 不为 None）；调用方据此回退到浏览器爬取。"""
+
+    def __init__(self, message: str, status: int | None = None):
+        super().__init__(message)
+        self.status = status
+
+
+class LoginRequiredError(HttpFetchError):
+    """页面要求登录（cookies 缺失或过期）。"""
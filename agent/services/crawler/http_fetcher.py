@@ -0,0 +1,365 @@
+# -*- coding: utf-8 -*-
+"""
+爬取服务 - HTTP 抓取模式：论坛版面列表页与帖子详情页基本为服务端渲染，直接用 requests 抓取并用 BeautifulSoup 解析，
+不经过 Playwright 页面，单页内存与 CPU 开销远低于浏览器渲染。
+
+- 连接池：进程内每个站点一个 requests.Session（keep-alive，连接数随爬取并发），失败按 502/503/504 退避重试；
+- 登录：cookies 取自一次浏览器登录（调用方传入的 GlobalBrowser 或浏览器池），遇到登录挑战时刷新一次；
+- 调度：每次请求占用全局调度器的一个页面槽位并取主机令牌，结果与耗时上报给 AIMD 控制器；
+- 回退：列表页解析不到帖子、持续要求登录等情况抛出 HttpFetchError，由调用方回退到浏览器爬取；
+- 缓存：开启 page_cache 时按输出目录做条件请求，未变的列表页/详情页不解析、不落盘；
+  新页面的校验头在帖子写入（或由调用方合并进正式目录）之后才记入缓存；
+- 输出：与浏览器爬取一致的版面-日期 JSON（section_name、board_name、date、posts），同名文件按 url 合并。
+
+选择器按 nForum 页面结构：列表 table.board-list（td.title_9 标题、td.title_10 时间、td.title_11 回复数、td.title_12 作者），
+详情 td.a-content（含 发信人/信区/标题/发信站/正文/来源，由清理流程分块）。
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+import asyncio
+import json
+import re
+import threading
+from datetime import datetime
+from typing import Any, Callable, Iterable
+from urllib.parse import urljoin
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from knowledge.ingestion.utils_tools import sanitize_dir
+from utils.file_handler import atomic_write_json
+from utils.headers_handler import get_headers
+from utils.logger_handler import logger
+
+from agent.services.crawler.errors import HttpFetchError, LoginRequiredError
+from agent.services.crawler.page_cache import PageCache, content_hash, get_page_cache, scoped_key
+from agent.services.crawler.scheduler import get_crawl_scheduler, host_of
+
+DEFAULT_HTTP_CONFIG = {
+    "pool_size": 32,
+    "timeout_seconds": 15,
+    "retries": 2,
+    "page_cache": True,
+}
+
+_LOGIN_MARKERS = ("您未登录", "请登录", "ajax_code\":\"0305")
+_STATION_TIME_PATTERN = re.compile(r"发信站[:：][^(（]*[(（]([^)）]+)[)）]")
+_DIGITS = re.compile(r"\d+")
+
+
+# ---------- 解析 ----------
+
+def _text(node: Any) -> str:
+    return node.get_text(" ", strip=True) if node is not None else ""
+
+
+def _split_list_time(value: str) -> tuple[str, str]:
+    """列表中的时间：当天帖子只显示时分秒，补上今天日期；其余为日期。"""
+    value = (value or "").strip()
+    if re.fullmatch(r"\d{1,2}:\d{2}(:\d{2})?", value):
+        return datetime.now().strftime("%Y-%m-%d"), value
+    return value[:10], ""
+
+
+def parse_board_list(html: str, base_url: str) -> list[dict]:
+    """
+    解析版面列表页，返回 [{"title", "url", "author", "date", "time", "reply_count", "pinned"}]。
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    rows = soup.select("table.board-list tbody tr") or soup.select("table.board-list tr")
+    out: list[dict] = []
+    for tr in rows:
+        link = tr.select_one("td.title_9 a")
+        if link is None or not link.get("href"):
+            continue
+        author = tr.select_one("td.title_12 a") or tr.select_one("td.title_12")
+        replies = _DIGITS.search(_text(tr.select_one("td.title_11")))
+        date, time_str = _split_list_time(_text(tr.select_one("td.title_10")))
+        out.append({
+            "title": _text(link),
+            "url": urljoin(base_url + "/", link["href"]),
+            "author": _text(author),
+            "date": date,
+            "time": time_str,
+            "reply_count": int(replies.group()) if replies else 0,
+            "pinned": "top" in (tr.get("class") or []),
+        })
+    return out
+
+
+def parse_article(html: str) -> dict:
+    """解析帖子详情页首楼，返回 {"content", "date", "time"}（时间取自「发信站」行）。"""
+    soup = BeautifulSoup(html, "html.parser")
+    node = soup.select_one("td.a-content") or soup.select_one(".a-content")
+    content = node.get_text("\n", strip=True) if node is not None else ""
+    result = {"content": content, "date": "", "time": ""}
+    match = _STATION_TIME_PATTERN.search(content)
+    if match:
+        try:
+            dt = datetime.strptime(match.group(1).strip(), "%a %b %d %H:%M:%S %Y")
+            result["date"], result["time"] = dt.strftime("%Y-%m-%d"), dt.strftime("%H:%M:%S")
+        except ValueError:
+            pass
+    return result
+
+
+# ---------- 抓取 ----------
+
+class HttpFetcher:
+    """单站点 HTTP 抓取器：连接池 Session + 浏览器登录 cookies，可选原始页面缓存。"""
+
+    def __init__(
+        self,
+        base_url: str,
+        pool_size: int = 32,
+        timeout: float = 15,
+        retries: int = 2,
+        cache: PageCache | None = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.cache = cache
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=max(int(pool_size), 1),
+            max_retries=Retry(
+                total=retries,
+                backoff_factor=0.5,
+                status_forcelist=(502, 503, 504),
+                allowed_methods=("GET",),
+                raise_on_status=False,
+            ),
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update(get_headers({
+            "Referer": self.base_url + "/",
+            "X-Requested-With": "XMLHttpRequest",
+        }))
+        self.has_cookies = False
+
+    def load_cookies(self, cookies: Iterable[dict]) -> None:
+        """载入浏览器导出的 cookies（Playwright context.cookies() 格式）。"""
+        for c in cookies or []:
+            if c.get("name"):
+                self.session.cookies.set(c["name"], c.get("value", ""), domain=c.get("domain"), path=c.get("path") or "/")
+        self.has_cookies = True
+
+    def get(self, url: str, headers: dict | None = None) -> requests.Response:
+        """GET 一个页面（相对路径按站点根解析）；4xx/5xx 与登录挑战抛出 HttpFetchError（status 供 AIMD 区分 429/5xx）。"""
+        resp = self.session.get(urljoin(self.base_url + "/", url), headers=headers, timeout=self.timeout)
+        if resp.status_code == 304:
+            return resp
+        if resp.status_code >= 400:
+            raise HttpFetchError(f"HTTP {resp.status_code}: {url}", resp.status_code)
+        if resp.encoding is None or resp.encoding.lower() == "iso-8859-1":
+            resp.encoding = resp.apparent_encoding
+        if resp.status_code == 200 and any(marker in resp.text for marker in _LOGIN_MARKERS):
+            raise LoginRequiredError(f"需要登录: {url}")
+        return resp
+
+    def get_text(self, url: str) -> str:
+        return self.get(url).text
+
+    def fetch(self, url: str, scope: str = "") -> tuple[str, bool, dict | None]:
+        """
+        抓取页面并经缓存校验：有缓存时发条件请求，304 或内容哈希不变即为未变。
+        有变化的页面不立即写入缓存，而是返回待提交项，由调用方在内容落盘后传给 commit_pages。
+        :param scope: 缓存作用域（输出目录），不同目的地的缓存互不影响
+        :return: (页面原文, 是否有变化, 待提交的缓存项或 None)；未开启缓存时恒为有变化且无待提交项
+        """
+        full_url = urljoin(self.base_url + "/", url)
+        if self.cache is None:
+            return self.get(full_url).text, True, None
+        key = scoped_key(full_url, scope)
+        entry = self.cache.lookup(key)
+        resp = self.get(full_url, headers=self.cache.conditional_headers(entry))
+        if resp.status_code == 304 and entry is not None:
+            return self.cache.read(entry), False, None
+        pending = {
+            "url": key,
+            "text": resp.text,
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+        }
+        if entry is not None and entry["content_hash"] == content_hash(resp.text):
+            # 内容未变，只刷新校验头
+            self.commit_pages([pending])
+            return resp.text, False, None
+        return resp.text, True, pending
+
+    def commit_pages(self, pending: Iterable[dict | None]) -> int:
+        """把 fetch 返回的待提交项写入页面缓存（内容已落盘后调用），返回写入数。"""
+        if self.cache is None:
+            return 0
+        count = 0
+        for item in pending or []:
+            if item:
+                self.cache.store(item["url"], item["text"], item.get("etag"), item.get("last_modified"))
+                count += 1
+        return count
+
+
+_fetchers: dict[str, HttpFetcher] = {}
+_fetchers_lock = threading.Lock()
+
+
+def get_http_fetcher(base_url: str, config: dict | None = None) -> HttpFetcher:
+    """获取站点对应的进程内 HttpFetcher（单例，参数取 crawler.json 的 http）。"""
+    cfg = {**DEFAULT_HTTP_CONFIG, **(config or {})}
+    key = base_url.rstrip("/")
+    with _fetchers_lock:
+        fetcher = _fetchers.get(key)
+        if fetcher is None:
+            fetcher = _fetchers[key] = HttpFetcher(
+                key,
+                pool_size=cfg["pool_size"],
+                timeout=cfg["timeout_seconds"],
+                retries=cfg["retries"],
+                cache=get_page_cache() if cfg.get("page_cache") else None,
+            )
+        return fetcher
+
+
+def _board_path(board_info: dict) -> str:
+    url = (board_info.get("url") or "").strip()
+    if url:
+        return url
+    return f"/board/{board_info.get('id') or board_info.get('name')}"
+
+
+def _merge_write(path: str, section_name: str, board_name: str, date: str, posts: list[dict]) -> None:
+    """写入版面-日期 JSON；文件已存在时按 url 合并（本次抓取的帖子覆盖旧版本）。"""
+    merged: dict[str, dict] = {}
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                old = json.load(f)
+            for p in old.get("posts") or []:
+                if isinstance(p, dict):
+                    merged[p.get("url") or f"#{len(merged)}"] = p
+        except Exception as e:
+            logger.warning(f"[http_fetcher]读取已有文件 {path} 失败，将覆盖: {e}")
+    for p in posts:
+        merged[p.get("url") or f"#{len(merged)}"] = p
+    atomic_write_json(
+        path, {"section_name": section_name, "board_name": board_name, "date": date, "posts": list(merged.values())},
+    )
+
+
+async def crawl_board_http(
+    fetcher: HttpFetcher,
+    section_name: str,
+    board_info: dict,
+    output_root: str,
+    max_pages: int = 1,
+    concurrency: int = 8,
+    select_unchanged: Callable[[list[dict]], set[str]] | None = None,
+    flow: str = "http",
+    cache_scope: str | None = None,
+    defer_cache: bool = False,
+    start_page: int = 1,
+) -> dict:
+    """
+    HTTP 模式爬取一个版面：并发抓列表页，再抓详情页，按日期写版面-日期 JSON。
+    开启页面缓存时，未变的列表页不解析（其中帖子视为无变化），未变的详情页不解析、不写入；
+    有变化页面的校验头在文件写入后提交，defer_cache=True 时交给调用方在合并进正式目录后提交。
+    :param fetcher: HttpFetcher（已载入登录 cookies）
+    :param section_name: 讨论区名称
+    :param board_info: 版面 dict（含 name，及 url 或 id）
+    :param output_root: 输出根目录（<讨论区>/<版面>/<日期>.json）
+    :param max_pages: 抓到第几页为止（含）
+    :param concurrency: 详情页并发上限（另受全局调度器限制）
+    :param select_unchanged: 传入列表行，返回无需抓详情的帖子 url 集合（如回复数未变的已知帖子）
+    :param flow: 调度公平队列分组
+    :param cache_scope: 页面缓存作用域（最终输出目录），None 时取 output_root
+    :param defer_cache: 是否不在此提交页面缓存，而由调用方落盘后调用 fetcher.commit_pages(result["cache_pending"])
+    :param start_page: 从第几页开始抓（增量爬取的第二轮从探测页之后继续）
+    :return: {"saved_paths", "posts", "skipped": 未重新解析详情的列表行, "pages", "unchanged_pages": 未变的列表页数,
+              "cache_pending": 尚未提交的页面缓存项}
+    :raises HttpFetchError: 第 1 页解析不到帖子或请求失败，调用方应回退到浏览器爬取
+    """
+    scheduler = get_crawl_scheduler()
+    host = host_of(fetcher.base_url)
+    scope = os.path.abspath(cache_scope or output_root)
+
+    async def _get(url: str) -> tuple[str, bool, dict | None]:
+        async with scheduler.slot(host, flow, 1, report=True):
+            return await asyncio.to_thread(fetcher.fetch, url, scope)
+
+    board_path = _board_path(board_info)
+    start_page = max(int(start_page), 1)
+    pages = await asyncio.gather(*(_get(f"{board_path}?p={p}") for p in range(start_page, max(max_pages, start_page) + 1)))
+    rows: dict[str, dict] = {}
+    unchanged_pages = 0
+    for i, (html, changed, _) in enumerate(pages):
+        if not changed:
+            unchanged_pages += 1
+            continue
+        page_rows = parse_board_list(html, fetcher.base_url)
+        # 只有第 1 页为空才说明解析失败；后续页为空只是版面没有那么多页
+        if not page_rows and i == 0 and start_page == 1:
+            raise HttpFetchError(f"列表页未解析到帖子: {board_path}")
+        for row in page_rows:
+            rows.setdefault(row["url"], row)
+
+    unchanged = select_unchanged(list(rows.values())) if select_unchanged else set()
+    skipped = [row for url, row in rows.items() if url in unchanged]
+    todo = [row for url, row in rows.items() if url not in unchanged]
+
+    limit = asyncio.Semaphore(max(concurrency, 1))
+
+    pending: dict[str, dict] = {}
+
+    async def _detail(row: dict) -> dict | None:
+        async with limit:
+            html, changed, page = await _get(row["url"])
+        if not changed:
+            skipped.append(row)
+            return None
+        article = parse_article(html)
+        post = {k: row[k] for k in ("title", "author", "url", "reply_count")}
+        post["date"] = article["date"] or row["date"]
+        post["time"] = article["time"] or row["time"]
+        post["content"] = article["content"]
+        if page:
+            pending[row["url"]] = page
+        return post
+
+    posts = [p for p in await asyncio.gather(*(_detail(row) for row in todo)) if p is not None]
+    board_name = board_info.get("name", "")
+    # 列表与详情页都取不到日期的帖子无法归入版面-日期文件，跳过而不是记为今天
+    undated = [p for p in posts if not p["date"]]
+    if undated:
+        logger.warning(f"[http_fetcher]{board_path} 有 {len(undated)} 个帖子取不到日期，已跳过: {[p['url'] for p in undated][:5]}")
+        posts = [p for p in posts if p["date"]]
+    by_date: dict[str, list[dict]] = {}
+    for post in posts:
+        by_date.setdefault(post["date"], []).append(post)
+    saved: list[str] = []
+    folder = os.path.join(output_root, sanitize_dir(section_name), sanitize_dir(board_name))
+    for date, date_posts in by_date.items():
+        path = os.path.join(folder, f"{date}.json")
+        await asyncio.to_thread(_merge_write, path, section_name, board_name, date, date_posts)
+        saved.append(path)
+    # 只提交已写入帖子的详情页；被跳过的帖子下次仍会重新抓取
+    cache_pending = [page for _, _, page in pages if page] + [pending[p["url"]] for p in posts if p["url"] in pending]
+    if not defer_cache:
+        await asyncio.to_thread(fetcher.commit_pages, cache_pending)
+        cache_pending = []
+    return {
+        "saved_paths": saved,
+        "posts": len(posts),
+        "skipped": skipped,
+        "pages": len(pages),
+        "unchanged_pages": unchanged_pages,
+        "cache_pending": cache_pending,
+    }
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+爬取服务 - 增量落盘：爬取结果先写入暂存目录，再按内容指纹（幂等键）合并进正式输出目录。
+
+- 帖子指纹只取 title/author/date/time/reply_count/正文，忽略爬取时间等易变字段；
+- 文件指纹未变则不重写文件（也不进入后续清理与向量化）；
+- 版面-日期文件只替换有变化的帖子，保留已清理过的未变帖子与本次未爬到的旧帖子；
+- is_caught_up 根据首页中「近期已知帖子」数量判断是否已追上上次爬取，决定是否需要继续翻页。
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+import hashlib
+import json
+from typing import Any
+
+from utils.config_handler import load_json_config
+from utils.file_handler import atomic_write_json
+from utils.logger_handler import logger
+
+from agent.services.crawler.board_cursor import CRAWLER_CONFIG, BoardCursorStore
+from agent.services.indexing.post_records import post_body_text, post_timestamp
+
+SECONDS_PER_DAY = 86400.0
+
+DEFAULT_CRAWLER_CONFIG = {
+    "incremental": True,
+    "staging_root": "data/staging",
+    "first_pass_pages": 1,
+    "known_post_window_days": 7,
+    "min_known_posts_to_stop": 1,
+    "fetch_mode": "browser",
+}
+
+
+def get_crawler_config() -> dict:
+    """读取 config/crawler/crawler.json，缺省项使用 DEFAULT_CRAWLER_CONFIG。"""
+    return {**DEFAULT_CRAWLER_CONFIG, **load_json_config(default_path=CRAWLER_CONFIG)}
+
+
+def post_fingerprint(post: dict) -> str:
+    """帖子内容指纹：只覆盖稳定字段，爬取时间等易变字段不影响结果。"""
+    stable = [
+        post.get("title", "") or "",
+        post.get("author", "") or "",
+        post.get("date", "") or "",
+        post.get("time", "") or "",
+        str(post.get("reply_count", 0) or 0),
+        post_body_text(post.get("content")),
+    ]
+    return hashlib.sha1("\x1f".join(stable).encode("utf-8")).hexdigest()
+
+
+def _post_key(post: dict, rel_path: str, index: int | None) -> str:
+    """帖子稳定标识：优先 url，否则为相对路径（+ 序号），不依赖暂存目录位置。"""
+    url = (post.get("url") or "").strip()
+    if url:
+        return url
+    return f"{rel_path}#{index}" if index is not None else rel_path
+
+
+def _file_fingerprint(post_fps: list[tuple[str, str]]) -> str:
+    digest = hashlib.sha1()
+    for key, fp in sorted(post_fps):
+        digest.update(f"{key}\x1f{fp}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _load_json(path: str) -> Any:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        logger.error(f"[incremental]读取 {path} 失败: {e}")
+        return None
+
+
+def _merge_posts(
+    staged_posts: list[tuple[str, str, dict]],
+    target_data: Any,
+    rel_path: str,
+    known: dict[str, dict],
+) -> tuple[list[dict], list[tuple[str, str]]]:
+    """
+    合并版面-日期文件：未变帖子保留正式文件中的版本（可能已清理），有变化或新帖子取暂存版本。
+    :return: (合并后的 posts, [(post_key, 指纹)])
+    """
+    target_posts = target_data.get("posts") if isinstance(target_data, dict) else None
+    staged_by_key = {key: (fp, post) for key, fp, post in staged_posts}
+    merged: list[dict] = []
+    fps: list[tuple[str, str]] = []
+    used: set[str] = set()
+    for i, post in enumerate(target_posts if isinstance(target_posts, list) else []):
+        if not isinstance(post, dict):
+            continue
+        key = _post_key(post, rel_path, i)
+        if key in staged_by_key:
+            fp, staged_post = staged_by_key[key]
+            unchanged = known.get(key, {}).get("fingerprint") == fp
+            merged.append(post if unchanged else staged_post)
+            used.add(key)
+        else:
+            # 本次未爬到的旧帖子：沿用已记录的指纹，避免用清理后的内容重新计算
+            fp = known.get(key, {}).get("fingerprint") or post_fingerprint(post)
+            merged.append(post)
+        fps.append((key, fp))
+    for key, fp, post in staged_posts:
+        if key not in used:
+            merged.append(post)
+            fps.append((key, fp))
+    return merged, fps
+
+
+def promote_staged_files(
+    staged_paths: list[str],
+    staging_root: str,
+    output_root: str,
+    store: BoardCursorStore,
+) -> dict:
+    """
+    把暂存目录中的爬取结果按幂等键合并进正式输出目录。
+    :param staged_paths: 本次爬取写入暂存目录的文件
+    :param staging_root: 暂存根目录（与 output_root 保持相同的 讨论区/版面 子目录结构）
+    :param output_root: 正式输出根目录
+    :param store: 版面游标存储
+    :return: {"saved_paths": 实际写入的正式文件, "skipped_paths": 内容未变未重写的正式文件,
+              "posts": 帖子数, "new_posts": 新帖子数, "changed_posts": 有变化的帖子数,
+              "known_posts": [(post_key, ts)] 此前已见过的帖子, "newest_ts", "newest_key"}
+    """
+    result: dict = {
+        "saved_paths": [], "skipped_paths": [], "posts": 0, "new_posts": 0, "changed_posts": 0,
+        "known_posts": [], "newest_ts": None, "newest_key": "",
+    }
+    staged: list[tuple[str, str, Any, list[tuple[str, str, dict]]]] = []
+    for path in staged_paths:
+        data = _load_json(str(path))
+        if not isinstance(data, dict):
+            continue
+        rel_path = os.path.relpath(str(path), staging_root)
+        date = data.get("date", "")
+        posts = data.get("posts")
+        items = posts if isinstance(posts, list) else [data]
+        entries = []
+        for i, post in enumerate(items):
+            if not isinstance(post, dict):
+                continue
+            key = _post_key(post, rel_path, i if isinstance(posts, list) else None)
+            entries.append((key, post_fingerprint(post), post))
+            ts = post_timestamp(post.get("date") or date or "", post.get("time", "") or "")
+            if ts is not None and (result["newest_ts"] is None or ts > result["newest_ts"]):
+                result["newest_ts"], result["newest_key"] = ts, key
+        staged.append((str(path), rel_path, data, entries))
+
+    known = store.post_fingerprints(key for _, _, _, entries in staged for key, _, _ in entries)
+    post_rows: list[tuple] = []
+    file_rows: list[tuple[str, str]] = []
+    for path, rel_path, data, entries in staged:
+        target = os.path.join(output_root, rel_path)
+        section, board = data.get("section_name", ""), data.get("board_name", "")
+        for key, fp, post in entries:
+            result["posts"] += 1
+            seen = known.get(key)
+            if seen is None:
+                result["new_posts"] += 1
+            else:
+                result["known_posts"].append((key, seen.get("ts")))
+                if seen.get("fingerprint") != fp:
+                    result["changed_posts"] += 1
+            ts = post_timestamp(post.get("date") or data.get("date") or "", post.get("time", "") or "")
+            post_rows.append((
+                key, post.get("section_name") or section, post.get("board_name") or board, ts, fp,
+            ))
+
+        if isinstance(data.get("posts"), list):
+            target_data = _load_json(target) if os.path.exists(target) else None
+            merged, fps = _merge_posts(entries, target_data, rel_path, known)
+            out_data = {**data, "posts": merged}
+        else:
+            fps = [(key, fp) for key, fp, _ in entries]
+            out_data = data
+        file_fp = _file_fingerprint(fps)
+        if os.path.exists(target) and store.file_fingerprint(rel_path) == file_fp:
+            result["skipped_paths"].append(target)
+            continue
+        atomic_write_json(target, out_data)
+        file_rows.append((rel_path, file_fp))
+        result["saved_paths"].append(target)
+
+    store.record(post_rows, file_rows)
+    return result
+
+
+def is_caught_up(promoted: dict, cursor: dict | None, config: dict | None = None) -> bool:
+    """
+    首轮结果中是否已出现足够多「近期已知帖子」，即已追上上次爬取、无需继续翻页。
+    置顶帖一般发布较早，只统计发布时间不早于「游标最新时间 - known_post_window_days」的已知帖子。
+    从未爬取过（无游标）的版面返回 False，按完整页数回填。
+    """
+    if not cursor:
+        return False
+    cfg = config or get_crawler_config()
+    newest_ts = cursor.get("newest_ts")
+    window = float(cfg.get("known_post_window_days") or 0) * SECONDS_PER_DAY
+    recent_known = [
+        key for key, ts in promoted.get("known_posts", [])
+        if newest_ts is None or (ts is not None and ts >= newest_ts - window)
+    ]
+    return len(recent_known) >= int(cfg.get("min_known_posts_to_stop") or 1)
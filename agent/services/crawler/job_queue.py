@@ -0,0 +1,373 @@
+# -*- coding: utf-8 -*-
+"""
+爬取服务 - 持久化任务队列：版面爬取/清理/向量化任务存入本地 SQLite，进程崩溃后可恢复、可多进程并发消费。
+
+- 状态机：pending -> running -> succeeded；失败时按指数退避回到 pending，超过 max_attempts 进入 dead；
+- 幂等键：同一键的任务在 pending/running 时重复入队直接返回已有任务，成功后 dedupe_window_seconds 内也不重跑；
+- 租约：claim 时写入 lease_owner 与 lease_expires，checkpoint/heartbeat 续约；租约过期的 running 任务可被其他 worker 接手；
+- 阶段检查点：每完成一个阶段（crawl/clean/vectorize）记录其产出，重跑时跳过已完成阶段；
+- worker 登记：独立 worker 进程定期 touch_worker，Agent 据 active_workers 决定入队等待还是在本进程执行。
+
+路径与参数见 config/crawler/crawler.json 的 job_queue（默认 vector_db/dynamic/crawl_jobs.sqlite3），
+环境变量 BBS_JOB_QUEUE_PATH 可覆盖路径，使多个工作目录共用一个队列。
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+import hashlib
+import json
+import socket
+import time
+import uuid
+from typing import Any, Iterable
+
+from utils.config_handler import load_json_config
+from utils.env_handler import get_env, load_env
+from utils.sqlite_handler import sqlite_session
+
+from agent.services.crawler.board_cursor import CRAWLER_CONFIG
+
+STATE_PENDING = "pending"
+STATE_RUNNING = "running"
+STATE_SUCCEEDED = "succeeded"
+STATE_DEAD = "dead"
+TERMINAL_STATES = (STATE_SUCCEEDED, STATE_DEAD)
+
+DEFAULT_JOB_QUEUE_CONFIG = {
+    "path": "vector_db/dynamic/crawl_jobs.sqlite3",
+    "lease_seconds": 600,
+    "max_attempts": 3,
+    "retry_backoff_seconds": 30,
+    "dedupe_window_seconds": 3600,
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL,
+    priority INTEGER DEFAULT 0,
+    stages TEXT NOT NULL DEFAULT '{}',
+    attempts INTEGER DEFAULT 0,
+    max_attempts INTEGER DEFAULT 3,
+    available_at REAL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    created_at REAL,
+    updated_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(kind, state, available_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_lease ON jobs(state, lease_expires);
+CREATE TABLE IF NOT EXISTS workers (
+    worker_id TEXT PRIMARY KEY,
+    started_at REAL,
+    last_seen REAL,
+    current_job INTEGER
+);
+"""
+
+
+def make_worker_id() -> str:
+    """worker 标识：主机名:进程号:随机后缀，跨机器共享队列目录时也不冲突。"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def default_idempotency_key(kind: str, payload: dict) -> str:
+    """默认幂等键：任务类型 + 规范化 payload 的哈希。"""
+    canonical = json.dumps(payload, ensure_ascii=False, sort_keys=True)
+    return f"{kind}:{hashlib.sha1(canonical.encode('utf-8')).hexdigest()[:16]}"
+
+
+def _to_job(row: Any) -> dict | None:
+    if row is None:
+        return None
+    job = dict(row)
+    job["payload"] = json.loads(job["payload"] or "{}")
+    job["stages"] = json.loads(job["stages"] or "{}")
+    job["result"] = json.loads(job["result"]) if job.get("result") else None
+    return job
+
+
+class JobQueue:
+    """SQLite 持久化任务队列（多进程安全：写操作在 BEGIN IMMEDIATE 事务内完成）。"""
+
+    def __init__(
+        self,
+        db_path: str,
+        lease_seconds: float = 600,
+        max_attempts: int = 3,
+        retry_backoff_seconds: float = 30,
+        dedupe_window_seconds: float = 3600,
+    ):
+        self.db_path = db_path
+        self.lease_seconds = float(lease_seconds)
+        self.max_attempts = max(int(max_attempts), 1)
+        self.retry_backoff_seconds = float(retry_backoff_seconds)
+        self.dedupe_window_seconds = float(dedupe_window_seconds)
+        with sqlite_session(self.db_path) as conn:
+            conn.executescript(_SCHEMA)
+
+    # ---------- 入队 ----------
+
+    def enqueue(
+        self,
+        kind: str,
+        payload: dict,
+        idempotency_key: str | None = None,
+        priority: int = 0,
+        max_attempts: int | None = None,
+        dedupe: bool = True,
+    ) -> dict:
+        """
+        按幂等键入队：已有 pending/running 任务、或窗口内已成功的任务直接返回（pending 任务取两者中较高的优先级）；
+        过期的成功任务与 dead 任务重置为 pending（清空检查点）重新执行。
+        :param dedupe: 为 False 时不复用窗口内已成功的任务（显式请求要求重新执行），pending/running 任务仍直接返回
+        :return: 任务 dict（id, state, payload, stages, result, attempts, ...）
+        """
+        key = idempotency_key or default_idempotency_key(kind, payload)
+        now = time.time()
+        with sqlite_session(self.db_path) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT * FROM jobs WHERE idempotency_key = ?", (key,)).fetchone()
+            fresh_success = (
+                dedupe
+                and row is not None
+                and row["state"] == STATE_SUCCEEDED
+                and now - (row["finished_at"] or 0) < self.dedupe_window_seconds
+            )
+            if row is not None and (row["state"] in (STATE_PENDING, STATE_RUNNING) or fresh_success):
+                if row["state"] == STATE_PENDING and priority > (row["priority"] or 0):
+                    # 低优先级的后台任务被请求内的同一任务追上时，提升优先级
+                    conn.execute("UPDATE jobs SET priority = ?, updated_at = ? WHERE id = ?", (priority, now, row["id"]))
+                    row = conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+                return _to_job(row)
+            values = (
+                kind, json.dumps(payload, ensure_ascii=False), priority,
+                max_attempts or self.max_attempts, now, now,
+            )
+            if row is None:
+                conn.execute(
+                    "INSERT INTO jobs(kind, payload, priority, max_attempts, available_at, updated_at, "
+                    "idempotency_key, state, created_at) VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (*values, key, STATE_PENDING, now),
+                )
+            else:
+                conn.execute(
+                    "UPDATE jobs SET kind = ?, payload = ?, priority = ?, max_attempts = ?, available_at = ?, "
+                    "updated_at = ?, state = ?, stages = '{}', attempts = 0, lease_owner = NULL, "
+                    "lease_expires = NULL, result = NULL, error = NULL, finished_at = NULL WHERE idempotency_key = ?",
+                    (*values, STATE_PENDING, key),
+                )
+            return _to_job(conn.execute("SELECT * FROM jobs WHERE idempotency_key = ?", (key,)).fetchone())
+
+    # ---------- 认领与租约 ----------
+
+    def claim(self, worker_id: str, kinds: Iterable[str] | None = None, lease_seconds: float | None = None) -> dict | None:
+        """
+        认领一个可执行任务：到期的 pending 任务，或租约已过期的 running 任务（原 worker 视为崩溃）。
+        :return: 认领到的任务，无可执行任务时返回 None
+        """
+        kinds = list(kinds or [])
+        kind_sql = f" AND kind IN ({','.join('?' for _ in kinds)})" if kinds else ""
+        now = time.time()
+        with sqlite_session(self.db_path) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            while True:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE ((state = ? AND available_at <= ?) OR (state = ? AND lease_expires < ?))"
+                    f"{kind_sql} ORDER BY priority DESC, id LIMIT 1",
+                    (STATE_PENDING, now, STATE_RUNNING, now, *kinds),
+                ).fetchone()
+                if row is None:
+                    return None
+                if row["attempts"] >= row["max_attempts"]:
+                    # 租约过期且已用完重试次数：不再接手
+                    conn.execute(
+                        "UPDATE jobs SET state = ?, lease_owner = NULL, lease_expires = NULL, "
+                        "error = COALESCE(error, '租约过期'), updated_at = ?, finished_at = ? WHERE id = ?",
+                        (STATE_DEAD, now, now, row["id"]),
+                    )
+                    continue
+                return self._take(conn, row["id"], worker_id, lease_seconds, now)
+
+    def claim_job(self, job_id: int, worker_id: str, lease_seconds: float | None = None) -> dict | None:
+        """认领指定任务（pending、租约已过期，或本 worker 已持有），被其他 worker 持有时返回 None。"""
+        now = time.time()
+        with sqlite_session(self.db_path) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None or row["state"] in TERMINAL_STATES:
+                return None
+            if row["state"] == STATE_RUNNING and row["lease_owner"] != worker_id and (row["lease_expires"] or 0) >= now:
+                return None
+            return self._take(conn, job_id, worker_id, lease_seconds, now)
+
+    def _take(self, conn: Any, job_id: int, worker_id: str, lease_seconds: float | None, now: float) -> dict:
+        conn.execute(
+            "UPDATE jobs SET state = ?, lease_owner = ?, lease_expires = ?, attempts = attempts + 1, "
+            "updated_at = ? WHERE id = ?",
+            (STATE_RUNNING, worker_id, now + (lease_seconds or self.lease_seconds), now, job_id),
+        )
+        return _to_job(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def heartbeat(self, job_id: int, worker_id: str, lease_seconds: float | None = None) -> bool:
+        """续约；返回 False 表示租约已被他人接手，当前 worker 应放弃该任务。"""
+        now = time.time()
+        with sqlite_session(self.db_path) as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE id = ? AND state = ? AND lease_owner = ?",
+                (now + (lease_seconds or self.lease_seconds), now, job_id, STATE_RUNNING, worker_id),
+            )
+        return cur.rowcount == 1
+
+    # ---------- 检查点与结束 ----------
+
+    def checkpoint(self, job_id: int, worker_id: str, stage: str, data: dict | None = None) -> bool:
+        """记录阶段完成及其产出（同时续约）；返回 False 表示租约已丢失。"""
+        now = time.time()
+        with sqlite_session(self.db_path) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT stages FROM jobs WHERE id = ? AND state = ? AND lease_owner = ?",
+                (job_id, STATE_RUNNING, worker_id),
+            ).fetchone()
+            if row is None:
+                return False
+            stages = json.loads(row["stages"] or "{}")
+            stages[stage] = data or {}
+            conn.execute(
+                "UPDATE jobs SET stages = ?, lease_expires = ?, updated_at = ? WHERE id = ?",
+                (json.dumps(stages, ensure_ascii=False), now + self.lease_seconds, now, job_id),
+            )
+        return True
+
+    def complete(self, job_id: int, worker_id: str, result: dict | None = None) -> bool:
+        """标记成功并记录结果。"""
+        now = time.time()
+        with sqlite_session(self.db_path) as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET state = ?, result = ?, error = NULL, lease_owner = NULL, lease_expires = NULL, "
+                "updated_at = ?, finished_at = ? WHERE id = ? AND state = ? AND lease_owner = ?",
+                (STATE_SUCCEEDED, json.dumps(result or {}, ensure_ascii=False), now, now,
+                 job_id, STATE_RUNNING, worker_id),
+            )
+        return cur.rowcount == 1
+
+    def fail(self, job_id: int, worker_id: str, error: str) -> str | None:
+        """
+        标记失败：未用完重试次数时按指数退避回到 pending（保留已完成阶段的检查点），否则进入 dead。
+        :return: 新状态，租约已丢失时返回 None
+        """
+        now = time.time()
+        with sqlite_session(self.db_path) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND state = ? AND lease_owner = ?",
+                (job_id, STATE_RUNNING, worker_id),
+            ).fetchone()
+            if row is None:
+                return None
+            state = STATE_DEAD if row["attempts"] >= row["max_attempts"] else STATE_PENDING
+            delay = self.retry_backoff_seconds * (2 ** max(row["attempts"] - 1, 0))
+            conn.execute(
+                "UPDATE jobs SET state = ?, error = ?, available_at = ?, lease_owner = NULL, lease_expires = NULL, "
+                "updated_at = ?, finished_at = ? WHERE id = ?",
+                (state, str(error)[:2000], now + delay, now, now if state == STATE_DEAD else None, job_id),
+            )
+        return state
+
+    # ---------- worker 登记 ----------
+
+    def touch_worker(self, worker_id: str, current_job: int | None = None) -> None:
+        """登记 / 刷新 worker 心跳。"""
+        now = time.time()
+        with sqlite_session(self.db_path) as conn:
+            conn.execute(
+                "INSERT INTO workers(worker_id, started_at, last_seen, current_job) VALUES(?, ?, ?, ?) "
+                "ON CONFLICT(worker_id) DO UPDATE SET last_seen = excluded.last_seen, "
+                "current_job = excluded.current_job",
+                (worker_id, now, now, current_job),
+            )
+
+    def remove_worker(self, worker_id: str) -> None:
+        with sqlite_session(self.db_path) as conn:
+            conn.execute("DELETE FROM workers WHERE worker_id = ?", (worker_id,))
+
+    def active_workers(self, max_age_seconds: float = 60) -> list[dict]:
+        """最近 max_age_seconds 内有心跳的 worker。"""
+        with sqlite_session(self.db_path) as conn:
+            rows = conn.execute(
+                "SELECT worker_id, started_at, last_seen, current_job FROM workers WHERE last_seen >= ? "
+                "ORDER BY started_at",
+                (time.time() - max_age_seconds,),
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    # ---------- 查询 ----------
+
+    def get(self, job_id: int) -> dict | None:
+        with sqlite_session(self.db_path) as conn:
+            return _to_job(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def get_many(self, job_ids: Iterable[int]) -> dict[int, dict]:
+        ids = list(dict.fromkeys(job_ids))
+        if not ids:
+            return {}
+        with sqlite_session(self.db_path) as conn:
+            rows = conn.execute(f"SELECT * FROM jobs WHERE id IN ({','.join('?' for _ in ids)})", ids).fetchall()
+        return {r["id"]: _to_job(r) for r in rows}
+
+    def wait(self, job_ids: Iterable[int], timeout: float | None = None, poll_interval: float = 1.0) -> dict[int, dict]:
+        """
+        轮询等待任务结束（succeeded / dead），超时返回当前状态。
+        :return: {job_id: 任务 dict}
+        """
+        ids = list(dict.fromkeys(job_ids))
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            jobs = self.get_many(ids)
+            if all(j["state"] in TERMINAL_STATES for j in jobs.values()):
+                return jobs
+            if deadline is not None and time.monotonic() >= deadline:
+                return jobs
+            time.sleep(poll_interval if deadline is None else max(min(poll_interval, deadline - time.monotonic()), 0))
+
+    def stats(self) -> dict:
+        """各状态任务数。"""
+        with sqlite_session(self.db_path) as conn:
+            rows = conn.execute("SELECT state, COUNT(*) AS n FROM jobs GROUP BY state").fetchall()
+        return {r["state"]: r["n"] for r in rows}
+
+
+def get_job_queue_config() -> dict:
+    """读取 crawler.json 的 job_queue 配置（缺省项取默认值）。"""
+    cfg = {**DEFAULT_JOB_QUEUE_CONFIG, **(load_json_config(default_path=CRAWLER_CONFIG).get("job_queue") or {})}
+    load_env()
+    cfg["path"] = get_env("BBS_JOB_QUEUE_PATH", cfg["path"])
+    return cfg
+
+
+_default_queue: JobQueue | None = None
+
+
+def get_job_queue() -> JobQueue:
+    """获取版面任务队列（单例，参数取 crawler.json 的 job_queue）。"""
+    global _default_queue
+    if _default_queue is None:
+        cfg = get_job_queue_config()
+        _default_queue = JobQueue(
+            cfg["path"],
+            lease_seconds=cfg["lease_seconds"],
+            max_attempts=cfg["max_attempts"],
+            retry_backoff_seconds=cfg["retry_backoff_seconds"],
+            dedupe_window_seconds=cfg["dedupe_window_seconds"],
+        )
+    return _default_queue
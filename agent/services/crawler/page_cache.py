@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+爬取服务 - 原始页面缓存：按 URL 缓存抓取到的 HTML 原文及其 ETag / Last-Modified / 内容哈希，
+HTTP 抓取时带 If-None-Match / If-Modified-Since 做条件请求；304 或内容哈希不变即视为页面未变，
+调用方直接跳过解析与后续清理。
+
+- 作用域：缓存按「目的地（输出根目录）+ URL」记录，同一页面写到不同输出目录互不影响；
+- 提交时机：新内容的校验头由调用方在帖子落盘/合并进正式目录之后再写入（store），
+  抓取后、落盘前崩溃时下次仍视为有变化，不会漏掉帖子。
+
+- 存储：页面原文写在 data/raw/webdata_raw/<哈希前两位>/<url 哈希>.html，元数据在同目录 page_index.sqlite3；
+- 淘汰：总大小超过 max_cache_mb 时按最近访问时间淘汰到上限的 90%。
+
+配置见 config/data/raw/webdata_raw.json（data_path、max_cache_mb）。
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+import hashlib
+import time
+
+from utils.config_handler import load_json_config
+from utils.file_handler import atomic_write_text
+from utils.logger_handler import logger
+from utils.path_tool import get_abs_path
+from utils.sqlite_handler import sqlite_session
+
+WEBDATA_RAW_CONFIG = "config/data/raw/webdata_raw.json"
+DEFAULT_CACHE_ROOT = "data/raw/webdata_raw"
+DEFAULT_MAX_CACHE_MB = 512
+INDEX_NAME = "page_index.sqlite3"
+EVICT_TARGET_RATIO = 0.9
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    file_name TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    content_hash TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    fetched_at REAL,
+    accessed_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_pages_accessed ON pages(accessed_at);
+"""
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def scoped_key(url: str, scope: str = "") -> str:
+    """缓存键：目的地作用域 + URL；scope 为空时即 URL。"""
+    return f"{scope}\x1f{url}" if scope else url
+
+
+class PageCache:
+    """原始 HTML 页面缓存（磁盘文件 + SQLite 元数据索引）。"""
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root if os.path.isabs(root) else get_abs_path(root)
+        self.max_bytes = max(int(max_bytes), 0)
+        self.db_path = os.path.join(self.root, INDEX_NAME)
+        os.makedirs(self.root, exist_ok=True)
+        with sqlite_session(self.db_path) as conn:
+            conn.executescript(_SCHEMA)
+
+    def _file_path(self, file_name: str) -> str:
+        return os.path.join(self.root, file_name[:2], file_name)
+
+    def lookup(self, url: str) -> dict | None:
+        """按缓存键（见 scoped_key）读取缓存元数据 {url, file_name, etag, last_modified, content_hash, size, ...}，未缓存返回 None。"""
+        with sqlite_session(self.db_path) as conn:
+            row = conn.execute("SELECT * FROM pages WHERE url = ?", (url,)).fetchone()
+        if row is None or not os.path.exists(self._file_path(row["file_name"])):
+            return None
+        return dict(row)
+
+    @staticmethod
+    def conditional_headers(entry: dict | None) -> dict:
+        """由缓存元数据生成条件请求头。"""
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def read(self, entry: dict) -> str:
+        """读取缓存的页面原文并更新访问时间。"""
+        with open(self._file_path(entry["file_name"]), "r", encoding="utf-8") as f:
+            text = f.read()
+        self.touch(entry["url"])
+        return text
+
+    def touch(self, url: str) -> None:
+        with sqlite_session(self.db_path) as conn:
+            conn.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (time.time(), url))
+
+    def store(self, url: str, text: str, etag: str | None = None, last_modified: str | None = None) -> bool:
+        """
+        写入页面原文与校验头（url 为缓存键，见 scoped_key）。应在页面内容已落盘/合并后调用。
+        :return: 页面内容是否有变化（首次缓存视为有变化）
+        """
+        digest = content_hash(text)
+        previous = self.lookup(url)
+        now = time.time()
+        file_name = f"{hashlib.sha1(url.encode('utf-8')).hexdigest()}.html"
+        changed = previous is None or previous["content_hash"] != digest
+        if changed:
+            atomic_write_text(self._file_path(file_name), text)
+        with sqlite_session(self.db_path) as conn:
+            conn.execute(
+                "INSERT INTO pages(url, file_name, etag, last_modified, content_hash, size, fetched_at, accessed_at) "
+                "VALUES(?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(url) DO UPDATE SET file_name = excluded.file_name, "
+                "etag = excluded.etag, last_modified = excluded.last_modified, "
+                "content_hash = excluded.content_hash, size = excluded.size, "
+                "fetched_at = excluded.fetched_at, accessed_at = excluded.accessed_at",
+                (url, file_name, etag or "", last_modified or "", digest, len(text.encode("utf-8")), now, now),
+            )
+        if changed:
+            self.evict()
+        return changed
+
+    def total_bytes(self) -> int:
+        with sqlite_session(self.db_path) as conn:
+            return int(conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0])
+
+    def evict(self) -> int:
+        """总大小超过上限时按最近访问时间淘汰，返回淘汰页数。"""
+        if not self.max_bytes:
+            return 0
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return 0
+        target = int(self.max_bytes * EVICT_TARGET_RATIO)
+        evicted: list[tuple[str, str]] = []
+        with sqlite_session(self.db_path) as conn:
+            for row in conn.execute("SELECT url, file_name, size FROM pages ORDER BY accessed_at ASC"):
+                if total <= target:
+                    break
+                evicted.append((row["url"], row["file_name"]))
+                total -= row["size"]
+            conn.executemany("DELETE FROM pages WHERE url = ?", [(url,) for url, _ in evicted])
+        for _, file_name in evicted:
+            try:
+                os.remove(self._file_path(file_name))
+            except OSError:
+                pass
+        if evicted:
+            logger.info(f"[page_cache]淘汰 {len(evicted)} 个页面，缓存约 {total / 1024 / 1024:.1f} MB")
+        return len(evicted)
+
+
+_default_cache: PageCache | None = None
+
+
+def get_page_cache() -> PageCache:
+    """获取原始页面缓存（单例，目录与上限取 webdata_raw.json）。"""
+    global _default_cache
+    if _default_cache is None:
+        cfg = load_json_config(default_path=WEBDATA_RAW_CONFIG)
+        _default_cache = PageCache(
+            cfg.get("data_path") or DEFAULT_CACHE_ROOT,
+            float(cfg.get("max_cache_mb") or DEFAULT_MAX_CACHE_MB) * 1024 * 1024,
+        )
+    return _default_cache
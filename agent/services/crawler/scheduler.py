@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+"""
+爬取服务 - 全局爬取调度器：所有爬取（批量版面爬取、Agent 按需爬取）共享一个进程级页面并发上限，
+并按主机做令牌桶限速，避免多个版面各自开满并发后被论坛限流、内存暴涨。
+
+- 全局上限：同时占用的页面槽位之和不超过 max_concurrent_pages；
+- 公平排队：等待者按 flow（如请求方、版面）分队，槽位释放时在各 flow 之间轮转分配，单个大批量不会饿死其他请求；
+- 主机限速：每个主机一个令牌桶（host_rate_per_sec / host_burst），版面任务开始与每次页面抓取各取令牌；
+- 背压：run_bounded 惰性消费任务，同时在途的任务不超过 max_pending_jobs，其余任务不提前创建；
+- 自适应：启用 aimd 时，页面并发上限取 AIMD 控制器的当前窗口（不超过 max_concurrent_pages），
+  单页抓取的 slot（report=True）结束时自动上报结果与耗时（超时、429/5xx、登录挑战触发减窗）。
+
+调度器线程安全，可同时服务浏览器池事件循环线程与批量爬取的事件循环。配置见 config/crawler/crawler.json 的 scheduler。
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+import asyncio
+import contextvars
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable
+from urllib.parse import urlparse
+
+from utils.config_handler import load_json_config
+
+from agent.services.crawler.adaptive import (
+    OUTCOME_OK,
+    AIMDController,
+    build_aimd_controller,
+    classify_outcome,
+)
+from agent.services.crawler.board_cursor import CRAWLER_CONFIG
+
+DEFAULT_SCHEDULER_CONFIG = {
+    "max_concurrent_pages": 32,
+    "board_concurrency": 8,
+    "host_rate_per_sec": 4.0,
+    "host_burst": 8,
+    "max_pending_jobs": 16,
+}
+
+
+# 当前任务已占用的槽位：嵌套 slot 在其中取并发额度
+_held_allowance: contextvars.ContextVar[asyncio.Semaphore | None] = contextvars.ContextVar(
+    "crawl_slot_allowance", default=None,
+)
+
+
+def host_of(url: str) -> str:
+    """URL 的主机部分（不含协议），无法解析时原样返回。"""
+    return urlparse(url).netloc or url
+
+
+class TokenBucket:
+    """线程安全的令牌桶：按 rate 个/秒补充，最多积累 burst 个；令牌不足时预约并等待。"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = max(float(rate), 1e-6)
+        self.burst = max(float(burst), 1.0)
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, n: float) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= n
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    async def acquire(self, n: float = 1.0) -> None:
+        """取 n 个令牌；不足时先预约（令牌可为负），按缺口等待，保证先到先得。"""
+        wait = self._reserve(n)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class _Waiter:
+    __slots__ = ("loop", "future", "slots")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, future: asyncio.Future, slots: int):
+        self.loop = loop
+        self.future = future
+        self.slots = slots
+
+
+def _resolve(future: asyncio.Future, slots: int) -> None:
+    if not future.done():
+        future.set_result(slots)
+
+
+class CrawlScheduler:
+    """全局爬取调度器：页面槽位上限 + 按 flow 公平排队 + 按主机令牌桶限速。"""
+
+    def __init__(
+        self,
+        max_concurrent_pages: int = 32,
+        host_rate_per_sec: float = 4.0,
+        host_burst: float = 8,
+        max_pending_jobs: int = 16,
+        controller: AIMDController | None = None,
+    ):
+        self.max_concurrent_pages = max(int(max_concurrent_pages), 1)
+        self.controller = controller
+        self.host_rate_per_sec = host_rate_per_sec
+        self.host_burst = host_burst
+        self.max_pending_jobs = max(int(max_pending_jobs), 1)
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._flows: "OrderedDict[str, deque[_Waiter]]" = OrderedDict()
+        self._buckets: dict[str, TokenBucket] = {}
+        self._granted = 0
+        self._waited = 0
+
+    @property
+    def capacity(self) -> int:
+        """当前页面并发上限：AIMD 窗口与 max_concurrent_pages 取小。"""
+        if self.controller is None:
+            return self.max_concurrent_pages
+        return max(min(self.controller.window, self.max_concurrent_pages), 1)
+
+    def bucket(self, host: str) -> TokenBucket:
+        """主机对应的令牌桶（首次使用时创建）。"""
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.host_rate_per_sec, self.host_burst)
+            return bucket
+
+    # ---------- 槽位 ----------
+
+    async def acquire(self, flow: str = "default", slots: int = 1) -> int:
+        """
+        申请 slots 个页面槽位（不超过当前上限），有其他等待者或槽位不足时按 flow 公平排队。
+        :return: 实际占用的槽位数（上限收缩时可能少于 slots），需配对调用 release
+        """
+        slots = max(int(slots), 1)
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            slots = min(slots, self.capacity)
+            if not self._flows and self._in_use + slots <= self.capacity:
+                self._in_use += slots
+                self._granted += 1
+                return slots
+            waiter = _Waiter(loop, loop.create_future(), slots)
+            self._flows.setdefault(flow, deque()).append(waiter)
+            self._waited += 1
+        try:
+            return await waiter.future
+        except asyncio.CancelledError:
+            with self._lock:
+                queue = self._flows.get(flow)
+                if queue is not None and waiter in queue:
+                    queue.remove(waiter)
+                    if not queue:
+                        del self._flows[flow]
+                    granted = False
+                else:
+                    granted = True
+            if granted:
+                self.release(waiter.slots)
+            raise
+
+    def release(self, slots: int) -> None:
+        """归还槽位并唤醒排队者。"""
+        with self._lock:
+            self._in_use -= slots
+            self._dispatch()
+
+    def _dispatch(self) -> None:
+        """在持锁状态下按 flow 轮转分配空闲槽位；队首放不下时停止，避免大请求被小请求持续插队。"""
+        capacity = self.capacity
+        while self._flows:
+            flow, queue = next(iter(self._flows.items()))
+            waiter = queue[0]
+            waiter.slots = min(waiter.slots, capacity)
+            if self._in_use + waiter.slots > capacity:
+                break
+            queue.popleft()
+            self._in_use += waiter.slots
+            self._granted += 1
+            if queue:
+                self._flows.move_to_end(flow)
+            else:
+                del self._flows[flow]
+            waiter.loop.call_soon_threadsafe(_resolve, waiter.future, waiter.slots)
+
+    def report(self, outcome: str, latency: float | None = None) -> None:
+        """上报一次请求结果给 AIMD 控制器；窗口扩大时立即唤醒排队者。"""
+        if self.controller is None:
+            return
+        before = self.capacity
+        self.controller.record(outcome, latency)
+        if self.capacity > before:
+            with self._lock:
+                self._dispatch()
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        host: str,
+        flow: str = "default",
+        slots: int = 1,
+        report: bool = False,
+    ) -> AsyncIterator[int]:
+        """
+        占用槽位并从主机令牌桶取一个令牌后进入：版面任务用 slots=页面并发数，单次页面抓取用 slots=1。
+        在已占用的槽位内嵌套调用时（版面任务中的单页抓取），只在外层分到的槽位数内并发，不再占用全局槽位。
+        report 为 True 时（单页抓取）退出时按是否抛异常与耗时上报 AIMD；版面级槽位不上报，
+        避免无耗时的成功计入加性增计数。
+        用法: async with scheduler.slot(host, flow, n) as granted: ...
+        """
+        allowance = _held_allowance.get()
+        if allowance is not None:
+            # 已在外层槽位内（如版面任务中的单页抓取）：从外层分到的槽位中取，不再向全局申请，避免嵌套占用死锁
+            async with allowance:
+                await self.bucket(host).acquire(1)
+                start = time.monotonic()
+                try:
+                    yield 1
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    if report:
+                        self.report(classify_outcome(e))
+                    raise
+                if report:
+                    self.report(OUTCOME_OK, time.monotonic() - start)
+            return
+        granted = await self.acquire(flow, slots)
+        token = _held_allowance.set(asyncio.Semaphore(granted))
+        try:
+            await self.bucket(host).acquire(1)
+            start = time.monotonic()
+            try:
+                yield granted
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if report:
+                    self.report(classify_outcome(e))
+                raise
+            if report:
+                self.report(OUTCOME_OK, time.monotonic() - start)
+        finally:
+            _held_allowance.reset(token)
+            self.release(granted)
+
+    # ---------- 背压 ----------
+
+    async def run_bounded(self, factories: Iterable[Callable[[], Awaitable[Any]]]) -> list[Any]:
+        """
+        惰性执行任务：同时在途的任务不超过 max_pending_jobs，后续任务在有空位时才创建。
+        任一任务抛异常（或本协程被取消）时，先取消并等待其余在途任务结束（释放其槽位与令牌），再向上抛出。
+        :param factories: 无参协程工厂
+        :return: 按输入顺序的结果列表
+        """
+        results: dict[int, Any] = {}
+        running: set[asyncio.Task] = set()
+        index_of: dict[asyncio.Task, int] = {}
+        try:
+            for i, factory in enumerate(factories):
+                if len(running) >= self.max_pending_jobs:
+                    done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        results[index_of.pop(task)] = task.result()
+                task = asyncio.ensure_future(factory())
+                index_of[task] = i
+                running.add(task)
+            while running:
+                done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    results[index_of.pop(task)] = task.result()
+        finally:
+            pending = [task for task in running if not task.done()]
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            # 同批完成但未取结果的任务：取走其异常，避免「异常未被获取」告警
+            for task in index_of:
+                if task.done() and not task.cancelled():
+                    task.exception()
+        return [results[i] for i in range(len(results))]
+
+    def stats(self) -> dict:
+        """当前上限、占用槽位、排队数、累计分配/排队次数与 AIMD 状态。"""
+        with self._lock:
+            return {
+                "max_concurrent_pages": self.max_concurrent_pages,
+                "capacity": self.capacity,
+                "in_use": self._in_use,
+                "queued": sum(len(q) for q in self._flows.values()),
+                "flows": len(self._flows),
+                "granted": self._granted,
+                "waited": self._waited,
+                "aimd": self.controller.stats() if self.controller is not None else None,
+            }
+
+
+_default_scheduler: CrawlScheduler | None = None
+_default_lock = threading.Lock()
+
+
+def get_crawler_scheduler_config() -> dict:
+    """读取 crawler.json 的 scheduler 配置，缺省项使用 DEFAULT_SCHEDULER_CONFIG。"""
+    cfg = load_json_config(default_path=CRAWLER_CONFIG).get("scheduler") or {}
+    return {**DEFAULT_SCHEDULER_CONFIG, **cfg}
+
+
+def get_crawl_scheduler() -> CrawlScheduler:
+    """获取进程级爬取调度器（单例）。"""
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            cfg = get_crawler_scheduler_config()
+            _default_scheduler = CrawlScheduler(
+                max_concurrent_pages=cfg["max_concurrent_pages"],
+                host_rate_per_sec=cfg["host_rate_per_sec"],
+                host_burst=cfg["host_burst"],
+                max_pending_jobs=cfg["max_pending_jobs"],
+                controller=build_aimd_controller(load_json_config(default_path=CRAWLER_CONFIG).get("aimd")),
+            )
+        return _default_scheduler
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+爬取服务 - 流式分阶段流水线：各阶段之间用有界队列连接，每个阶段有独立的 worker 数，
+上游产出一项就交给下游处理，而不是「全部爬完再全部清理再全部向量化」的屏障式执行。
+
+- 有界队列：下游处理不过来时上游 put 阻塞，形成背压，内存占用与在途项数成正比；
+- 阻塞型阶段（清理、向量化等同步函数）在线程中执行，不阻塞事件循环；
+- 单项失败不中断整条流水线，失败项连同阶段名与错误返回给调用方（stats["failures"]）；
+- 返回各阶段处理数、失败数、累计耗时，总耗时应接近最慢阶段而非各阶段之和。
+
+批量爬取（tools/search/search）以版面为流水线的一项，而不是单个帖子或列表页：
+爬取按「版面-日期」写 JSON，同一天的帖子来自多个列表页、按 url 合并进同一个文件；增量爬取先写暂存目录，
+整版面按内容指纹合并进正式目录并推进版面游标。按页拆分会让同一个文件被反复改写、反复清理与向量化，
+也会在合并前把暂存中的半成品交给下游。因此重叠发生在版面之间：某个版面合并完成即进入清理，
+不等其他版面；单个版面的爬取时长由 max_pages 限定。
+
+各阶段 worker 数与队列容量见 config/crawler/crawler.json 的 pipeline。
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+import asyncio
+import time
+from typing import Any, Callable, Iterable
+
+from utils.config_handler import load_json_config
+from utils.logger_handler import logger
+
+from agent.services.crawler.board_cursor import CRAWLER_CONFIG
+
+DEFAULT_PIPELINE_CONFIG = {
+    "queue_size": 8,
+    "clean_workers": 2,
+    "vectorize_workers": 4,
+}
+
+_DONE = object()
+
+
+def get_pipeline_config() -> dict:
+    """读取 crawler.json 的 pipeline 配置（各阶段 worker 数与队列容量），缺省项使用 DEFAULT_PIPELINE_CONFIG。"""
+    return {**DEFAULT_PIPELINE_CONFIG, **(load_json_config(default_path=CRAWLER_CONFIG).get("pipeline") or {})}
+
+
+class Stage:
+    """流水线阶段：fn 接收上游产出的一项并返回交给下游的一项。"""
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[Any], Any],
+        workers: int = 1,
+        queue_size: int = 8,
+        blocking: bool = False,
+    ):
+        """
+        :param name: 阶段名（用于日志与统计）
+        :param fn: 协程函数，或 blocking=True 时的同步函数
+        :param workers: 该阶段并发 worker 数
+        :param queue_size: 该阶段输入队列容量
+        :param blocking: 是否为同步阻塞函数（在线程中执行）
+        """
+        self.name = name
+        self.fn = fn
+        self.workers = max(int(workers), 1)
+        self.queue_size = max(int(queue_size), 1)
+        self.blocking = blocking
+
+
+async def run_stages(items: Iterable[Any], stages: list[Stage]) -> tuple[list[Any], dict]:
+    """
+    以流式方式让 items 依次经过各阶段。
+    :param items: 输入项（惰性消费，受第一个阶段的队列容量限制）
+    :param stages: 阶段列表，按执行顺序
+    :return: (最后一个阶段的产出列表（完成顺序）,
+              统计 {"elapsed": 秒, "stages": {阶段名: {processed, failed, busy}},
+                    "failures": [{"stage": 阶段名, "item": 该阶段的输入项, "error": 错误信息}]})
+    """
+    if not stages:
+        return list(items), {"elapsed": 0.0, "stages": {}, "failures": []}
+    queues = [asyncio.Queue(maxsize=stage.queue_size) for stage in stages]
+    stats = {stage.name: {"processed": 0, "failed": 0, "busy": 0.0} for stage in stages}
+    failures: list[dict] = []
+    outputs: list[Any] = []
+    started = time.monotonic()
+
+    async def _feed() -> None:
+        for item in items:
+            await queues[0].put(item)
+        for _ in range(stages[0].workers):
+            await queues[0].put(_DONE)
+
+    async def _worker(index: int) -> None:
+        stage = stages[index]
+        inbox = queues[index]
+        outbox = queues[index + 1] if index + 1 < len(stages) else None
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                return
+            t0 = time.monotonic()
+            try:
+                result = await asyncio.to_thread(stage.fn, item) if stage.blocking else await stage.fn(item)
+            except Exception as e:
+                stats[stage.name]["failed"] += 1
+                failures.append({"stage": stage.name, "item": item, "error": str(e)})
+                logger.error(f"[streaming]阶段 {stage.name} 处理失败: {e}")
+                continue
+            finally:
+                stats[stage.name]["busy"] += time.monotonic() - t0
+            stats[stage.name]["processed"] += 1
+            if outbox is None:
+                outputs.append(result)
+            else:
+                await outbox.put(result)
+
+    async def _run_stage(index: int) -> None:
+        await asyncio.gather(*(_worker(index) for _ in range(stages[index].workers)))
+        # 本阶段全部 worker 结束后再通知下游结束
+        if index + 1 < len(stages):
+            for _ in range(stages[index + 1].workers):
+                await queues[index + 1].put(_DONE)
+
+    await asyncio.gather(_feed(), *(_run_stage(i) for i in range(len(stages))))
+    elapsed = time.monotonic() - started
+    for name in stats:
+        stats[name]["busy"] = round(stats[name]["busy"], 3)
+    return outputs, {"elapsed": round(elapsed, 3), "stages": stats, "failures": failures}
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+爬取服务 - 论坛结构索引：进程内缓存 forum_structure.json 并建立版面查找表，文件 mtime 变化时自动重建。
+
+支持 O(1) 查找：
+- (讨论区, 二级目录, 版面) 或 (讨论区, 版面)；
+- 仅版面名（可能对应多个版面，按结构文件中的出现顺序返回）；
+- hierarchy_path（如「生活时尚/悄悄话」「北邮校园/院系校区/信息与通信工程学院」）。
+
+结构按通用方式遍历：带 name 的 dict 视为节点，不再包含带 name 子节点的节点视为版面，
+祖先节点名依次为讨论区、二级目录。索引未命中时回退到 forum_updater 的线性查找（使用缓存的结构，不重读文件）。
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+import threading
+from typing import Any, Iterator
+
+from knowledge.ingestion.forum_updater import (
+    load_forum_structure,
+    get_board_by_section_subsection_and_name,
+)
+from utils.logger_handler import logger
+from utils.path_tool import get_abs_path
+
+DEFAULT_STRUCTURE_PATH = "data/web_structure/forum_structure.json"
+NAME_KEYS = ("name", "title")
+
+
+def _node_names(node: dict) -> list[str]:
+    names = []
+    for key in NAME_KEYS:
+        value = node.get(key)
+        if isinstance(value, str) and value.strip() and value.strip() not in names:
+            names.append(value.strip())
+    return names
+
+
+def _child_nodes(node: Any) -> Iterator[dict]:
+    """产出 node 下一层带名字的子节点（穿过不带名字的 list/dict 容器）。"""
+    values = node.values() if isinstance(node, dict) else node if isinstance(node, list) else ()
+    for value in values:
+        if isinstance(value, dict):
+            if _node_names(value):
+                yield value
+            else:
+                yield from _child_nodes(value)
+        elif isinstance(value, list):
+            yield from _child_nodes(value)
+
+
+def split_hierarchy_path(path: str) -> list[str]:
+    """「讨论区/二级目录/版面」拆分为各级名称。"""
+    return [p.strip() for p in (path or "").replace("\\", "/").strip("/").split("/") if p.strip()]
+
+
+class ForumStructureIndex:
+    """论坛结构的版面查找表。"""
+
+    def __init__(self, structure: Any):
+        self.structure = structure
+        self._by_triple: dict[tuple[str, str, str], dict] = {}
+        self._by_forum_board: dict[tuple[str, str], dict] = {}
+        self._by_name: dict[str, list[dict]] = {}
+        self._by_path: dict[str, dict] = {}
+        roots = [structure] if isinstance(structure, dict) and _node_names(structure) else list(_child_nodes(structure))
+        for root in roots:
+            self._walk(root, [])
+
+    def __len__(self) -> int:
+        return len(self._by_path)
+
+    def _walk(self, node: dict, ancestors: list[str]) -> None:
+        names = _node_names(node)
+        children = list(_child_nodes(node))
+        if children:
+            for child in children:
+                self._walk(child, [*ancestors, names[0]])
+            return
+        if not ancestors:
+            return
+        forum, subs = ancestors[0], ancestors[1:]
+        sub_board = subs[-1] if subs else ""
+        for name in names:
+            self._by_triple.setdefault((forum, sub_board, name), node)
+            self._by_forum_board.setdefault((forum, name), node)
+            self._by_path.setdefault("/".join([*ancestors, name]), node)
+            bucket = self._by_name.setdefault(name, [])
+            if not any(b is node for b in bucket):
+                bucket.append(node)
+        own_path = node.get("hierarchy_path")
+        if isinstance(own_path, str) and own_path.strip():
+            self._by_path.setdefault("/".join(split_hierarchy_path(own_path)), node)
+
+    def get(self, forum: str, board: str, sub_board: str | None = None) -> dict | None:
+        """按 (讨论区, 二级目录, 版面) 查找；未给二级目录时按 (讨论区, 版面) 查找。"""
+        forum, board = (forum or "").strip(), (board or "").strip()
+        if sub_board:
+            return self._by_triple.get((forum, sub_board.strip(), board))
+        return self._by_forum_board.get((forum, board))
+
+    def find_by_name(self, board: str) -> list[dict]:
+        """按版面名查找，可能有多个同名版面。"""
+        return list(self._by_name.get((board or "").strip(), []))
+
+    def find_by_path(self, hierarchy_path: str) -> dict | None:
+        """按 hierarchy_path 查找；路径只有两级以上时也尝试 (讨论区, 版面)。"""
+        parts = split_hierarchy_path(hierarchy_path)
+        if not parts:
+            return None
+        node = self._by_path.get("/".join(parts))
+        if node is None and len(parts) >= 2:
+            node = self._by_forum_board.get((parts[0], parts[-1]))
+        return node
+
+
+_lock = threading.Lock()
+_cache: dict[str, tuple[tuple[int, int], ForumStructureIndex]] = {}
+
+
+def _resolve_structure_path(structure_path: str | None) -> str:
+    path = structure_path or DEFAULT_STRUCTURE_PATH
+    return os.path.normpath(path if os.path.isabs(path) else get_abs_path(path))
+
+
+def get_structure_index(structure_path: str | None = None) -> ForumStructureIndex | None:
+    """
+    获取论坛结构索引（进程内缓存，结构文件 mtime/大小变化时重建）。
+    :param structure_path: 结构 JSON 路径，None 时使用 data/web_structure/forum_structure.json
+    :return: 索引；结构文件不存在时返回 None
+    """
+    path = _resolve_structure_path(structure_path)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    version = (st.st_mtime_ns, st.st_size)
+    cached = _cache.get(path)
+    if cached and cached[0] == version:
+        return cached[1]
+    with _lock:
+        cached = _cache.get(path)
+        if cached and cached[0] == version:
+            return cached[1]
+        index = ForumStructureIndex(load_forum_structure(structure_path=path))
+        _cache[path] = (version, index)
+        logger.info(f"[structure_index]已加载论坛结构 {path}，版面 {len(index)} 个")
+        return index
+
+
+def resolve_board(
+    forum: str,
+    board: str,
+    sub_board: str | None = None,
+    structure_path: str | None = None,
+) -> dict | None:
+    """
+    解析版面信息：先查索引，未命中时在缓存的结构上回退到 forum_updater 的线性查找。
+    :return: 版面 dict（含 id, name, url 等），未找到返回 None
+    """
+    index = get_structure_index(structure_path)
+    if index is None:
+        return None
+    node = index.get(forum, board, sub_board)
+    if node is None and not forum:
+        matches = index.find_by_name(board)
+        node = matches[0] if matches else None
+    if node is not None:
+        return node
+    return get_board_by_section_subsection_and_name(
+        index.structure,
+        section_name=forum,
+        board_name=board,
+        sub_section_name=sub_board,
+    )
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+索引服务：帖子记录解析、词法倒排索引、元数据侧存储、正文内容哈希、近重复聚类、帖子分块清理引擎、帖子段文件存储、mmap 正文存储、动态向量库增量 upsert 等索引实现，由清理/向量化流程增量维护。
+"""
+from .post_records import (
+    DEFAULT_RECORD_BATCH_SIZE,
+    iter_files_post_records,
+    iter_post_record_batches,
+    iter_post_records,
+    load_post_records,
+    normalize_source_path,
+    parse_datetime,
+    post_body_text,
+    post_doc_key,
+    post_timestamp,
+)
+from .lexical_index import (
+    LexicalIndex,
+    get_lexical_index,
+    update_lexical_index,
+    lexical_search,
+    recent_posts,
+    tokenize,
+)
+from .post_meta_store import (
+    PostMetaStore,
+    get_post_meta_store,
+    update_post_meta_store,
+)
+from .content_dedup import (
+    ContentHashIndex,
+    body_hash,
+    get_content_hash_index,
+    normalize_post_body,
+    raw_content_hash,
+)
+from .embedding_batcher import (
+    SharedEmbedder,
+    get_shared_embedder,
+)
+from .near_dup import (
+    NearDupIndex,
+    collapse_near_duplicates,
+    get_near_dup_config,
+    get_near_dup_index,
+    hamming_distance,
+    simhash,
+)
+from .post_cleaner import (
+    CleanEngine,
+    get_clean_engine,
+    get_clean_engine_config,
+)
+from .segment_store import (
+    SegmentStore,
+    get_segment_store,
+    get_segment_store_config,
+    update_segment_store,
+)
+from .content_store import (
+    PostContentStore,
+    get_content_store_config,
+    get_post_content_store,
+    post_previews,
+    post_texts,
+    update_post_content_store,
+)
+from .vector_upsert import (
+    build_post_documents,
+    chunk_id,
+    upsert_post_files,
+    upsert_segment_records,
+)
+from .indexer import (
+    index_post_files,
+    index_post_records,
+)
+
+__all__ = [
+    "DEFAULT_RECORD_BATCH_SIZE",
+    "iter_files_post_records",
+    "iter_post_record_batches",
+    "iter_post_records",
+    "load_post_records",
+    "normalize_source_path",
+    "parse_datetime",
+    "post_body_text",
+    "post_doc_key",
+    "post_timestamp",
+    "LexicalIndex",
+    "get_lexical_index",
+    "update_lexical_index",
+    "lexical_search",
+    "recent_posts",
+    "tokenize",
+    "PostMetaStore",
+    "get_post_meta_store",
+    "update_post_meta_store",
+    "ContentHashIndex",
+    "body_hash",
+    "get_content_hash_index",
+    "normalize_post_body",
+    "raw_content_hash",
+    "SharedEmbedder",
+    "get_shared_embedder",
+    "NearDupIndex",
+    "collapse_near_duplicates",
+    "get_near_dup_config",
+    "get_near_dup_index",
+    "hamming_distance",
+    "simhash",
+    "CleanEngine",
+    "get_clean_engine",
+    "get_clean_engine_config",
+    "SegmentStore",
+    "get_segment_store",
+    "get_segment_store_config",
+    "update_segment_store",
+    "PostContentStore",
+    "get_content_store_config",
+    "get_post_content_store",
+    "post_previews",
+    "post_texts",
+    "update_post_content_store",
+    "build_post_documents",
+    "chunk_id",
+    "upsert_post_files",
+    "upsert_segment_records",
+    "index_post_files",
+    "index_post_records",
+]
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+索引服务 - 帖子正文内容哈希：对归一化后的帖子正文计算哈希，重爬或转载出现相同正文时复用已有结果。
+
+- 归一化：去掉「※ 来源 / ※ 修改」等随 IP、编辑时间变化的附注行与转载提示行，空白折叠；
+- 清理复用：原始正文哈希 -> 已清理的分块 content，同一正文不再重复清理（content_hashes 表）；
+  复用时只取与哈希内容一致的块（发信人/信区/标题/正文），每次发帖/重爬都会变的 发信站、来源 按本次原始 content 重建；
+- 向量复用：body_hash（标题 + 归一化正文）写入向量分片元数据，只有回复数等元数据变化时原地更新元数据，
+  不重新 embedding（见 vector_upsert）。
+
+路径见 config/vector_store/dynamic.json 的 content_hash_store_path（默认 vector_db/dynamic/content_hashes.sqlite3）。
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+import hashlib
+import json
+import re
+import time
+from pathlib import Path
+from typing import Any, Iterable
+
+from utils.config_handler import load_json_config
+from utils.file_handler import atomic_write_json
+from utils.logger_handler import logger
+from utils.sqlite_handler import sqlite_session
+
+from agent.services.indexing.post_records import normalize_source_path, post_body_text
+
+DYNAMIC_STORE_CONFIG = "config/vector_store/dynamic.json"
+DEFAULT_CONTENT_HASH_STORE_PATH = "vector_db/dynamic/content_hashes.sqlite3"
+
+# 随重爬变化、与正文语义无关的行：来源/修改附注（含 IP、时间）与转载提示
+_VOLATILE_LINE = re.compile(r"^\s*(※\s*(来源|修改|转载)|【\s*以下文字转载自).*$", re.MULTILINE)
+_WHITESPACE = re.compile(r"\s+")
+# 清理复用键不包含的行：分块后进入 发信站 / 来源 块（或被丢弃）的易变行，复用时按新 content 重建
+_CLEAN_VOLATILE_LINE = re.compile(r"^\s*(※\s*(来\s*源|修\s*改)|发信站\s*[:：]).*$", re.MULTILINE)
+_STATION = re.compile(r"^\s*发信站\s*[:：]\s*(?P<value>.*?)\s*$", re.MULTILINE)
+_SOURCE = re.compile(r"^\s*※\s*来\s*源\s*[:：]\s*[·.]?\s*(?P<value>.*?)\s*$", re.MULTILINE)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS content_hashes (
+    raw_hash TEXT PRIMARY KEY,
+    cleaned TEXT NOT NULL,
+    hits INTEGER DEFAULT 0,
+    updated_at REAL
+);
+"""
+
+
+def normalize_post_body(text: str) -> str:
+    """归一化帖子正文：去掉易变附注行，折叠空白。"""
+    return _WHITESPACE.sub(" ", _VOLATILE_LINE.sub("", text or "")).strip()
+
+
+def body_hash(title: str, body: Any) -> str:
+    """帖子语义内容哈希：标题 + 归一化正文（content 可为原始字符串或清理后的分块 dict）。"""
+    text = f"{(title or '').strip()}\n{normalize_post_body(post_body_text(body))}"
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def raw_content_hash(content: str) -> str:
+    """原始（未清理）content 去掉 发信站 / ※ 来源、修改 行并折叠空白后的哈希，作为清理结果的复用键。"""
+    text = _WHITESPACE.sub(" ", _CLEAN_VOLATILE_LINE.sub("", (content or "").replace("\xa0", " "))).strip()
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _reuse_blocks(cached: Any, content: str) -> Any:
+    """复用已清理的分块：保留复用键覆盖的块，发信站、来源 取本次原始 content（来源取最后一条）。"""
+    if not isinstance(cached, dict):
+        return cached
+    text = (content or "").replace("\xa0", " ")
+    station = _STATION.search(text)
+    sources = _SOURCE.findall(text)
+    return {
+        **cached,
+        "发信站": station.group("value") if station else "",
+        "来源": sources[-1] if sources else "",
+    }
+
+
+def _load(path: str) -> Any:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        logger.error(f"[content_dedup]读取 {path} 失败: {e}")
+        return None
+
+
+def _posts_of(data: Any) -> list[dict]:
+    if not isinstance(data, dict):
+        return []
+    posts = data.get("posts")
+    return [p for p in posts if isinstance(p, dict)] if isinstance(posts, list) else [data]
+
+
+def _post_key(post: dict) -> str:
+    """帖子在文件内的标识：优先 url，没有 url 时取 标题 + 作者 + 时间（清理写回可能删除或重排帖子，不能用序号）。"""
+    url = (post.get("url") or "").strip()
+    if url:
+        return url
+    return "\x1f".join(str(post.get(k) or "") for k in ("title", "author", "time"))
+
+
+class ContentHashIndex:
+    """原始正文哈希 -> 清理结果的 SQLite 索引。"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        with sqlite_session(self.db_path) as conn:
+            conn.executescript(_SCHEMA)
+
+    def get(self, raw_hashes: Iterable[str]) -> dict[str, Any]:
+        """批量读取已清理的 content，返回 {raw_hash: content}。"""
+        keys = list(dict.fromkeys(raw_hashes))
+        found: dict[str, Any] = {}
+        with sqlite_session(self.db_path) as conn:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                rows = conn.execute(
+                    f"SELECT raw_hash, cleaned FROM content_hashes WHERE raw_hash IN ({','.join('?' for _ in chunk)})",
+                    chunk,
+                ).fetchall()
+                found.update((r["raw_hash"], json.loads(r["cleaned"])) for r in rows)
+            if found:
+                conn.executemany(
+                    "UPDATE content_hashes SET hits = hits + 1 WHERE raw_hash = ?", [(k,) for k in found]
+                )
+        return found
+
+    def put(self, items: Iterable[tuple[str, Any]]) -> int:
+        """记录 (raw_hash, 已清理 content)，返回写入条数。"""
+        now = time.time()
+        rows = [(h, json.dumps(c, ensure_ascii=False), now) for h, c in items if h]
+        if not rows:
+            return 0
+        with sqlite_session(self.db_path) as conn:
+            conn.executemany(
+                "INSERT INTO content_hashes(raw_hash, cleaned, updated_at) VALUES(?, ?, ?) "
+                "ON CONFLICT(raw_hash) DO UPDATE SET cleaned = excluded.cleaned, updated_at = excluded.updated_at",
+                rows,
+            )
+        return len(rows)
+
+    def reuse_cleaned(self, file_paths: Iterable[str | Path]) -> tuple[list[str], dict[str, dict[str, str]], int]:
+        """
+        清理前调用：正文已清理过的帖子直接填回已清理的 content，发信站、来源 块与其余字段取本次爬取的新值。
+        :return: (仍需清理的文件, {文件: {帖子标识(url): raw_hash}} 待清理帖子, 完全复用无需清理的文件数)
+        """
+        pending_paths: list[str] = []
+        pending: dict[str, dict[str, str]] = {}
+        reused_files = 0
+        for path in dict.fromkeys(normalize_source_path(str(p)) for p in file_paths or []):
+            data = _load(path)
+            posts = [p for p in _posts_of(data) if isinstance(p.get("content"), str)]
+            if not posts:
+                continue
+            raw = [(p, raw_content_hash(p["content"])) for p in posts]
+            cached = self.get(h for _, h in raw)
+            remaining: dict[str, str] = {}
+            reused = False
+            for post, h in raw:
+                if h in cached:
+                    post["content"] = _reuse_blocks(cached[h], post["content"])
+                    reused = True
+                else:
+                    remaining[_post_key(post)] = h
+            if reused:
+                atomic_write_json(path, data)
+            if remaining:
+                pending_paths.append(path)
+                pending[path] = remaining
+            else:
+                reused_files += 1
+        return pending_paths, pending, reused_files
+
+    def remember_cleaned(self, pending: dict[str, dict[str, str]]) -> int:
+        """清理写回后调用：按帖子标识（url）找回本次新清理的帖子，记录 raw_hash -> 已清理 content。"""
+        items: list[tuple[str, Any]] = []
+        for path, hashes in pending.items():
+            posts = {_post_key(p): p for p in _posts_of(_load(path))}
+            for key, h in hashes.items():
+                post = posts.get(key)
+                if post is not None and not isinstance(post.get("content"), str):
+                    items.append((h, post["content"]))
+        return self.put(items)
+
+
+_default_index: ContentHashIndex | None = None
+
+
+def get_content_hash_index() -> ContentHashIndex:
+    """获取帖子正文哈希索引（单例，路径取 dynamic.json 的 content_hash_store_path）。"""
+    global _default_index
+    if _default_index is None:
+        cfg = load_json_config(default_path=DYNAMIC_STORE_CONFIG)
+        _default_index = ContentHashIndex(cfg.get("content_hash_store_path") or DEFAULT_CONTENT_HASH_STORE_PATH)
+    return _default_index
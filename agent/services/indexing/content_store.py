@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+索引服务 - 帖子正文存储：按版面把帖子正文原文（UTF-8）追加到段文件，doc_key -> (段, 偏移, 长度) 记在 SQLite，
+读取时经 mmap 只取需要的字节区间。
+
+- 摘要只读取正文开头 (max_chars + 1) * 4 字节并解码，不需要取回整篇文档；
+- 全文按需读取，RAG 上下文、结果摘要不再依赖向量库返回的分片文本，向量检索只需返回 id、元数据与分数；
+- 段滚动、多进程写入、压缩与 segment_store 相同（PostContentStore 是其子类，只替换编码方式）；
+  只有正文变化时才追加，回复数等元数据变化不会重写正文。
+
+由 indexer 在帖子清理写回后增量写入。参数见 config/vector_store/dynamic.json 的 content_store。
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+from typing import Iterable
+
+from utils.config_handler import load_json_config
+from utils.logger_handler import logger
+
+from agent.services.indexing.segment_store import DYNAMIC_STORE_CONFIG, SegmentStore
+
+DEFAULT_CONTENT_STORE_CONFIG = {
+    "enabled": True,
+    "root": "data/post_content",
+    "index_path": "data/post_content/index.sqlite3",
+    "max_segment_bytes": 32 * 1024 * 1024,
+    "compact_garbage_ratio": 0.3,
+    "compact_min_bytes": 1024 * 1024,
+}
+DEFAULT_PREVIEW_CHARS = 200
+
+# UTF-8 单个字符最多 4 字节
+_MAX_CHAR_BYTES = 4
+
+
+def get_content_store_config() -> dict:
+    """读取 dynamic.json 的 content_store 配置（缺省项取默认值）。"""
+    cfg = load_json_config(default_path=DYNAMIC_STORE_CONFIG).get("content_store") or {}
+    return {**DEFAULT_CONTENT_STORE_CONFIG, **cfg}
+
+
+class PostContentStore(SegmentStore):
+    """帖子正文存储：每条为正文原文字节，按 doc_key 读取摘要或全文。"""
+
+    FILE_PREFIX = "body"
+    FILE_SUFFIX = ".txt"
+
+    def encode(self, record: dict) -> bytes | None:
+        text = (record.get("content") or "").strip()
+        return text.encode("utf-8") if text else None
+
+    def decode(self, data: bytes) -> str:
+        # 按字节截断读取时末尾可能是半个字符，直接丢弃
+        return data.decode("utf-8", errors="ignore")
+
+    def _prefixes(self, doc_keys: Iterable[str], max_chars: int) -> dict[str, str]:
+        """只读取正文开头，多读一个字符用于判断是否被截断。"""
+        return self.get_many(doc_keys, max_bytes=(max_chars + 1) * _MAX_CHAR_BYTES)
+
+    def texts(self, doc_keys: Iterable[str], max_chars: int | None = None) -> dict[str, str]:
+        """
+        批量读取正文。
+        :param max_chars: 每篇最多返回的字符数，None 时返回全文
+        :return: {doc_key: 正文}，不在存储中的 doc_key 不出现
+        """
+        if max_chars is None:
+            return self.get_many(doc_keys)
+        return {key: text[:max_chars] for key, text in self._prefixes(doc_keys, max_chars).items()}
+
+    def text(self, doc_key: str, max_chars: int | None = None) -> str | None:
+        """读取单篇正文（max_chars 含义同 texts），不存在时返回 None。"""
+        return self.texts([doc_key], max_chars=max_chars).get(doc_key)
+
+    def previews(self, doc_keys: Iterable[str], max_chars: int = DEFAULT_PREVIEW_CHARS) -> dict[str, str]:
+        """正文摘要：前 max_chars 字，超出时以「…」结尾。"""
+        return {
+            key: (text[:max_chars] + "…") if len(text) > max_chars else text
+            for key, text in self._prefixes(doc_keys, max_chars).items()
+        }
+
+
+_default_store: PostContentStore | None = None
+
+
+def get_post_content_store() -> PostContentStore:
+    """获取帖子正文存储（单例，参数取 dynamic.json 的 content_store）。"""
+    global _default_store
+    if _default_store is None:
+        cfg = get_content_store_config()
+        _default_store = PostContentStore(
+            root=cfg["root"],
+            index_path=cfg["index_path"],
+            max_segment_bytes=cfg["max_segment_bytes"],
+            compact_garbage_ratio=cfg["compact_garbage_ratio"],
+            compact_min_bytes=cfg["compact_min_bytes"],
+        )
+    return _default_store
+
+
+def update_post_content_store(records: list[dict]) -> int:
+    """把帖子正文追加到正文存储；未启用或失败时只记录日志，返回写入篇数。"""
+    if not records or not get_content_store_config().get("enabled", True):
+        return 0
+    try:
+        return get_post_content_store().append(records)
+    except Exception as e:
+        logger.error(f"[content_store]写入正文存储失败: {e}")
+        return 0
+
+
+def post_previews(doc_keys: Iterable[str], max_chars: int = DEFAULT_PREVIEW_CHARS) -> dict[str, str]:
+    """按 doc_key 批量取正文摘要；未启用或读取失败时返回空 dict，由调用方回退到其他来源。"""
+    keys = [k for k in doc_keys or [] if k]
+    if not keys or not get_content_store_config().get("enabled", True):
+        return {}
+    try:
+        return get_post_content_store().previews(keys, max_chars=max_chars)
+    except Exception as e:
+        logger.warning(f"[content_store]读取正文摘要失败: {e}")
+        return {}
+
+
+def post_texts(doc_keys: Iterable[str], max_chars: int | None = None) -> dict[str, str]:
+    """按 doc_key 批量取正文（max_chars 为 None 时取全文）；未启用或读取失败时返回空 dict。"""
+    keys = [k for k in doc_keys or [] if k]
+    if not keys or not get_content_store_config().get("enabled", True):
+        return {}
+    try:
+        return get_post_content_store().texts(keys, max_chars=max_chars)
+    except Exception as e:
+        logger.warning(f"[content_store]读取正文失败: {e}")
+        return {}
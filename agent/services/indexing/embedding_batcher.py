@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+索引服务 - 共享 embedding 批处理：多个版面并发向量化时，把各自的 embed_documents 请求合并成跨版面的大批次，
+并在全局预算内执行（同时进行的 embedding 调用不超过 max_concurrency）。
+
+- 合批：调度线程最多等待 max_wait_ms 凑满 batch_size 条文本，单个请求可被拆到多个批次；
+- 预算：在途批次数受信号量限制，负载高时请求在队列中积累，批次自然变大；
+- 调用方阻塞等待自己那部分向量，顺序与输入一致；批次失败时该批涉及的请求都抛出异常。
+
+参数见 config/vector_store/dynamic.json 的 embedding_batch_size / embedding_max_concurrency / embedding_max_wait_ms。
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from utils.config_handler import load_json_config
+from utils.logger_handler import logger
+
+DYNAMIC_STORE_CONFIG = "config/vector_store/dynamic.json"
+DEFAULT_BATCH_SIZE = 64
+DEFAULT_MAX_CONCURRENCY = 2
+DEFAULT_MAX_WAIT_MS = 50
+
+
+class _Request:
+    __slots__ = ("texts", "results", "remaining", "done", "error")
+
+    def __init__(self, texts: list[str]):
+        self.texts = texts
+        self.results: list[Any] = [None] * len(texts)
+        self.remaining = len(texts)
+        self.done = threading.Event()
+        self.error: BaseException | None = None
+
+
+class SharedEmbedder:
+    """线程安全的跨调用方 embedding 合批器。"""
+
+    def __init__(
+        self,
+        embed_documents: Callable[[list[str]], list[list[float]]],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+    ):
+        self._embed_documents = embed_documents
+        self.batch_size = max(int(batch_size), 1)
+        self.max_concurrency = max(int(max_concurrency), 1)
+        self.max_wait = max(float(max_wait_ms), 0.0) / 1000.0
+        self._pending: deque[list] = deque()  # [request, 下一个待处理下标]
+        self._pending_texts = 0
+        self._cond = threading.Condition()
+        self._slots = threading.Semaphore(self.max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="embed")
+        self._dispatcher: threading.Thread | None = None
+        self._batches = 0
+        self._texts = 0
+        self._busy = 0.0
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        """提交一组文本并等待其向量（与输入顺序一致）。"""
+        if not texts:
+            return []
+        request = _Request(list(texts))
+        with self._cond:
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._dispatch_loop, name="embed-batcher", daemon=True)
+                self._dispatcher.start()
+            self._pending.append([request, 0])
+            self._pending_texts += len(texts)
+            self._cond.notify_all()
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.results
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                # 等待凑满一批，最多 max_wait
+                deadline = time.monotonic() + self.max_wait
+                while self._pending_texts < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                segments = self._take_batch()
+            self._slots.acquire()
+            self._executor.submit(self._run_batch, segments)
+
+    def _take_batch(self) -> list[tuple[_Request, int, int]]:
+        """在持锁状态下从队首切出最多 batch_size 条文本：[(请求, 起, 止)]。"""
+        segments: list[tuple[_Request, int, int]] = []
+        budget = self.batch_size
+        while self._pending and budget > 0:
+            entry = self._pending[0]
+            request, start = entry
+            end = min(len(request.texts), start + budget)
+            segments.append((request, start, end))
+            budget -= end - start
+            self._pending_texts -= end - start
+            if end >= len(request.texts):
+                self._pending.popleft()
+            else:
+                entry[1] = end
+        return segments
+
+    def _run_batch(self, segments: list[tuple[_Request, int, int]]) -> None:
+        texts = [t for request, start, end in segments for t in request.texts[start:end]]
+        t0 = time.monotonic()
+        try:
+            vectors = self._embed_documents(texts)
+            offset = 0
+            for request, start, end in segments:
+                request.results[start:end] = vectors[offset:offset + end - start]
+                offset += end - start
+        except Exception as e:
+            logger.error(f"[embedding_batcher]embedding 批次失败（{len(texts)} 条）: {e}")
+            for request, _, _ in segments:
+                request.error = e
+        finally:
+            self._slots.release()
+            with self._cond:
+                self._batches += 1
+                self._texts += len(texts)
+                self._busy += time.monotonic() - t0
+            for request, start, end in segments:
+                with self._cond:
+                    request.remaining -= end - start
+                    finished = request.remaining <= 0 or request.error is not None
+                if finished:
+                    request.done.set()
+
+    def stats(self) -> dict:
+        """累计批次数、文本数、平均批大小与 embedding 耗时。"""
+        with self._cond:
+            return {
+                "batches": self._batches,
+                "texts": self._texts,
+                "avg_batch_size": round(self._texts / self._batches, 1) if self._batches else 0.0,
+                "embed_seconds": round(self._busy, 3),
+                "pending_texts": self._pending_texts,
+            }
+
+
+_embedders: dict[int, SharedEmbedder] = {}
+_embedders_lock = threading.Lock()
+
+
+def get_shared_embedder(embeddings: Any) -> SharedEmbedder:
+    """为给定 Embeddings 实例获取进程内共享合批器（参数取 dynamic.json）。"""
+    with _embedders_lock:
+        embedder = _embedders.get(id(embeddings))
+        if embedder is None:
+            cfg = load_json_config(default_path=DYNAMIC_STORE_CONFIG)
+            embedder = SharedEmbedder(
+                embeddings.embed_documents,
+                batch_size=cfg.get("embedding_batch_size", DEFAULT_BATCH_SIZE),
+                max_concurrency=cfg.get("embedding_max_concurrency", DEFAULT_MAX_CONCURRENCY),
+                max_wait_ms=cfg.get("embedding_max_wait_ms", DEFAULT_MAX_WAIT_MS),
+            )
+            _embedders[id(embeddings)] = embedder
+        return embedder
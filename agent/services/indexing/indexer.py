@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+索引服务 - 帖子侧索引统一入口：一次读取帖子记录，同时写入词法索引、元数据侧存储、段文件存储与正文存储。
+由 agent/tools/search/clean.clean_post_files 在帖子清理写回后调用。
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+from pathlib import Path
+
+from utils.logger_handler import logger
+
+from agent.services.indexing.content_store import update_post_content_store
+from agent.services.indexing.lexical_index import get_lexical_index
+from agent.services.indexing.post_meta_store import update_post_meta_store
+from agent.services.indexing.post_records import iter_post_record_batches
+from agent.services.indexing.segment_store import update_segment_store
+
+
+def index_post_records(records: list[dict]) -> int:
+    """
+    将帖子记录写入词法索引、元数据侧存储、段文件存储与正文存储，任一失败只记录日志。
+    :return: 读到的帖子记录数
+    """
+    if not records:
+        return 0
+    try:
+        get_lexical_index().upsert(records)
+    except Exception as e:
+        logger.error(f"[indexer]词法索引更新失败: {e}")
+    update_post_meta_store(records)
+    update_segment_store(records)
+    update_post_content_store(records)
+    return len(records)
+
+
+def index_post_files(file_paths: list[str] | list[Path]) -> int:
+    """流式读取给定帖子文件并按批写入各侧索引，返回帖子记录数。"""
+    if not file_paths:
+        return 0
+    return sum(index_post_records(batch) for batch in iter_post_record_batches(file_paths))
@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+"""
+索引服务 - 词法倒排索引：对动态帖子建立「中文字二元组 + 英文数字词」倒排索引，按 BM25 打分。
+
+索引保存在 SQLite（默认 vector_db/dynamic/lexical_index.sqlite3，见 config/vector_store/dynamic.json 的 lexical_index_path），
+由 clean_post_files 写入帖子后增量更新；检索不调用 embedding，适合课程号、楼名、用户名等精确词查询。
+docs 表同时按 (section, board, ts) 建索引，作为按版面、按发布时间排序的日期索引，供「最近帖子」类查询直接读取。
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+import math
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Iterable
+
+from utils.config_handler import load_json_config
+from utils.logger_handler import logger
+from utils.sqlite_handler import sqlite_session
+
+from agent.services.indexing.post_records import iter_files_post_records
+
+DYNAMIC_STORE_CONFIG = "config/vector_store/dynamic.json"
+DEFAULT_LEXICAL_INDEX_PATH = "vector_db/dynamic/lexical_index.sqlite3"
+PREVIEW_CHARS = 200
+
+_TOKEN_PATTERN = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff]+|[a-z0-9_]+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    doc_key TEXT PRIMARY KEY,
+    source_file TEXT NOT NULL,
+    section TEXT,
+    board TEXT,
+    title TEXT,
+    author TEXT,
+    url TEXT,
+    date TEXT,
+    time TEXT,
+    reply_count INTEGER DEFAULT 0,
+    length INTEGER NOT NULL,
+    preview TEXT,
+    ts REAL
+);
+CREATE INDEX IF NOT EXISTS idx_docs_board ON docs(section, board);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    doc_key TEXT NOT NULL,
+    tf INTEGER NOT NULL,
+    PRIMARY KEY (term, doc_key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_postings_doc ON postings(doc_key);
+CREATE TABLE IF NOT EXISTS stats (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def tokenize(text: str) -> list[str]:
+    """分词：连续中文取字二元组（单字则保留单字），英文/数字按整词小写。"""
+    tokens: list[str] = []
+    for run in _TOKEN_PATTERN.findall((text or "").lower()):
+        if run[0].isascii():
+            tokens.append(run)
+        elif len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def _record_text(record: dict) -> str:
+    """参与索引的文本：标题（加权两次）+ 作者 + 正文。"""
+    title = record.get("title", "")
+    return "\n".join((title, title, record.get("author", ""), record.get("content", "")))
+
+
+class LexicalIndex:
+    """基于 SQLite 的 BM25 倒排索引，支持增量 upsert 与按版面过滤检索。"""
+
+    def __init__(self, db_path: str, k1: float = 1.2, b: float = 0.75):
+        self.db_path = db_path
+        self.k1 = k1
+        self.b = b
+        with sqlite_session(self.db_path) as conn:
+            conn.executescript(_SCHEMA)
+            columns = {r["name"] for r in conn.execute("PRAGMA table_info(docs)")}
+            if "ts" not in columns:
+                conn.execute("ALTER TABLE docs ADD COLUMN ts REAL")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_docs_board_ts ON docs(section, board, ts)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_docs_ts ON docs(ts)")
+
+    @staticmethod
+    def _bump_stats(conn, doc_delta: int, length_delta: int) -> None:
+        for key, delta in (("doc_count", doc_delta), ("total_length", length_delta)):
+            conn.execute(
+                "INSERT INTO stats(key, value) VALUES(?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = value + excluded.value",
+                (key, delta),
+            )
+
+    @staticmethod
+    def _delete_doc(conn, doc_key: str) -> int:
+        """删除单个文档的倒排与元数据，返回其原长度（不存在返回 -1）。"""
+        row = conn.execute("SELECT length FROM docs WHERE doc_key = ?", (doc_key,)).fetchone()
+        if row is None:
+            return -1
+        conn.execute("DELETE FROM postings WHERE doc_key = ?", (doc_key,))
+        conn.execute("DELETE FROM docs WHERE doc_key = ?", (doc_key,))
+        return int(row["length"])
+
+    def upsert(self, records: Iterable[dict]) -> int:
+        """
+        写入或替换帖子记录（以 doc_key 为准，旧倒排先删除）。
+        :param records: post_records 产出的帖子记录
+        :return: 写入的文档数
+        """
+        count = 0
+        with sqlite_session(self.db_path) as conn:
+            for record in records:
+                doc_key = record.get("doc_key")
+                if not doc_key:
+                    continue
+                old_length = self._delete_doc(conn, doc_key)
+                if old_length >= 0:
+                    self._bump_stats(conn, -1, -old_length)
+                tf = Counter(tokenize(_record_text(record)))
+                length = sum(tf.values())
+                conn.execute(
+                    "INSERT INTO docs(doc_key, source_file, section, board, title, author, url, date, time, "
+                    "reply_count, length, preview, ts) VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        doc_key, record.get("source_file", ""), record.get("section", ""), record.get("board", ""),
+                        record.get("title", ""), record.get("author", ""), record.get("url", ""),
+                        record.get("date", ""), record.get("time", ""), record.get("reply_count", 0),
+                        length, (record.get("content") or "")[:PREVIEW_CHARS], record.get("ts"),
+                    ),
+                )
+                conn.executemany(
+                    "INSERT INTO postings(term, doc_key, tf) VALUES(?, ?, ?)",
+                    ((term, doc_key, n) for term, n in tf.items()),
+                )
+                self._bump_stats(conn, 1, length)
+                count += 1
+        return count
+
+    def remove(self, doc_keys: Iterable[str]) -> int:
+        """按 doc_key 删除文档，返回实际删除数。"""
+        removed = 0
+        with sqlite_session(self.db_path) as conn:
+            for doc_key in doc_keys:
+                old_length = self._delete_doc(conn, doc_key)
+                if old_length >= 0:
+                    self._bump_stats(conn, -1, -old_length)
+                    removed += 1
+        return removed
+
+    @staticmethod
+    def _filter_clause(
+        section: str | None,
+        board: str | None,
+        ts_from: float | None,
+        ts_to: float | None,
+    ) -> tuple[str, list]:
+        """生成 docs 表（别名 d）的版面与时间范围过滤条件。"""
+        where = ""
+        args: list = []
+        if section:
+            where += " AND d.section = ?"
+            args.append(section)
+        if board:
+            where += " AND d.board = ?"
+            args.append(board)
+        if ts_from is not None:
+            where += " AND d.ts >= ?"
+            args.append(ts_from)
+        if ts_to is not None:
+            where += " AND d.ts <= ?"
+            args.append(ts_to)
+        return where, args
+
+    def search(
+        self,
+        query: str,
+        k: int = 20,
+        section: str | None = None,
+        board: str | None = None,
+        ts_from: float | None = None,
+        ts_to: float | None = None,
+    ) -> list[tuple[dict, float]]:
+        """
+        BM25 检索。
+        :param query: 查询文本
+        :param k: 返回条数
+        :param section: 可选，限定讨论区
+        :param board: 可选，限定版面
+        :param ts_from: 可选，发布时间下限（时间戳，含）
+        :param ts_to: 可选，发布时间上限（时间戳，含）
+        :return: [(文档元数据 dict, bm25 分数)]，分数降序
+        """
+        terms = set(tokenize(query))
+        if not terms or k <= 0:
+            return []
+        where, filter_args = self._filter_clause(section, board, ts_from, ts_to)
+
+        scores: dict[str, float] = {}
+        with sqlite_session(self.db_path) as conn:
+            stats = {r["key"]: r["value"] for r in conn.execute("SELECT key, value FROM stats")}
+            n_docs = stats.get("doc_count", 0)
+            if n_docs <= 0:
+                return []
+            avgdl = max(stats.get("total_length", 0) / n_docs, 1.0)
+            for term in terms:
+                df = conn.execute("SELECT COUNT(*) FROM postings WHERE term = ?", (term,)).fetchone()[0]
+                if not df:
+                    continue
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                rows = conn.execute(
+                    "SELECT p.doc_key, p.tf, d.length FROM postings p JOIN docs d ON d.doc_key = p.doc_key "
+                    "WHERE p.term = ?" + where,
+                    (term, *filter_args),
+                )
+                for row in rows:
+                    tf = row["tf"]
+                    norm = self.k1 * (1 - self.b + self.b * row["length"] / avgdl)
+                    scores[row["doc_key"]] = scores.get(row["doc_key"], 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+            if not scores:
+                return []
+            top = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:k]
+            placeholders = ",".join("?" for _ in top)
+            docs = {
+                r["doc_key"]: dict(r)
+                for r in conn.execute(f"SELECT * FROM docs WHERE doc_key IN ({placeholders})", [d for d, _ in top])
+            }
+        return [(docs[d], s) for d, s in top if d in docs]
+
+    def recent(
+        self,
+        section: str | None = None,
+        board: str | None = None,
+        ts_from: float | None = None,
+        ts_to: float | None = None,
+        limit: int = 20,
+    ) -> list[dict]:
+        """
+        按发布时间倒序读取版面内的帖子（走 (section, board, ts) 日期索引，不做文本匹配）。
+        :return: 文档元数据 dict 列表，最新在前；无发布时间的帖子不返回
+        """
+        if limit <= 0:
+            return []
+        where, args = self._filter_clause(section, board, ts_from, ts_to)
+        with sqlite_session(self.db_path) as conn:
+            rows = conn.execute(
+                "SELECT * FROM docs d WHERE d.ts IS NOT NULL" + where + " ORDER BY d.ts DESC LIMIT ?",
+                (*args, limit),
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+
+_default_index: LexicalIndex | None = None
+
+
+def get_lexical_index() -> LexicalIndex:
+    """获取动态帖子词法索引（单例，路径取 dynamic.json 的 lexical_index_path）。"""
+    global _default_index
+    if _default_index is None:
+        cfg = load_json_config(default_path=DYNAMIC_STORE_CONFIG)
+        _default_index = LexicalIndex(cfg.get("lexical_index_path") or DEFAULT_LEXICAL_INDEX_PATH)
+    return _default_index
+
+
+def update_lexical_index(file_paths: list[str] | list[Path]) -> int:
+    """
+    将给定帖子文件增量写入词法索引（clean_post_files 写回后调用），记录逐条流式读取。
+    :return: 写入的文档数；失败时记录日志并返回 0，不影响爬取主流程
+    """
+    if not file_paths:
+        return 0
+    try:
+        return get_lexical_index().upsert(iter_files_post_records(file_paths))
+    except Exception as e:
+        logger.error(f"[lexical_index]增量更新失败: {e}")
+        return 0
+
+
+def lexical_search(
+    query: str,
+    k: int = 20,
+    section: str | None = None,
+    board: str | None = None,
+    ts_from: float | None = None,
+    ts_to: float | None = None,
+) -> list[tuple[dict, float]]:
+    """在默认词法索引上检索，异常时返回空列表。"""
+    try:
+        return get_lexical_index().search(
+            query, k=k, section=section, board=board, ts_from=ts_from, ts_to=ts_to
+        )
+    except Exception as e:
+        logger.error(f"[lexical_index]检索失败: {e}")
+        return []
+
+
+def recent_posts(
+    section: str | None = None,
+    board: str | None = None,
+    ts_from: float | None = None,
+    ts_to: float | None = None,
+    limit: int = 20,
+) -> list[dict]:
+    """从默认索引按发布时间倒序读取版面帖子，异常时返回空列表。"""
+    try:
+        return get_lexical_index().recent(section=section, board=board, ts_from=ts_from, ts_to=ts_to, limit=limit)
+    except Exception as e:
+        logger.error(f"[lexical_index]读取日期索引失败: {e}")
+        return []
@@ -0,0 +1,341 @@
+# -*- coding: utf-8 -*-
+"""
+索引服务 - 近重复帖子检测：对清理后的正文计算 64 位 SimHash，用 LSH 分段召回候选、按汉明距离聚类。
+
+- 指纹：归一化正文的字符 3-gram 加权 SimHash，引用回复、跨版转载、轻度改写的帖子指纹只差少数几位；
+- 召回：64 位等分为 hamming_threshold + 1 段，任一段完全相同即为候选（鸽笼原理保证不漏召回阈值内的对）；
+- 聚类：跨版面聚类（跨版转载归入同一簇），与候选汉明距离不超过阈值即并入其所在簇，否则自成一簇并作为簇代表；
+- 版面代表：簇在每个版面各有一个代表（该版面最先入簇的成员），检索按讨论区/版面过滤时仍能命中该簇；
+- 代表变化：簇代表或版面代表的正文改变、不再属于原簇时，由它代表的成员逐个重新归簇，找不到簇的成员成为新代表，
+  由调用方从段存储取回记录写入向量库；
+- 入库：只有版面代表写入向量库，其余成员保留在词法索引与元数据侧存储；检索结果按簇折叠（跨版面）并附带同簇成员。
+
+正文少于 min_chars 的帖子不参与聚类（短文本 SimHash 噪声大）。
+路径与参数见 config/vector_store/dynamic.json 的 near_dup_store_path 与 near_dup。
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+import hashlib
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from typing import Iterable
+
+from utils.config_handler import load_json_config
+from utils.sqlite_handler import sqlite_session
+
+from agent.services.indexing.content_dedup import normalize_post_body
+from agent.services.indexing.post_records import post_body_text
+
+DYNAMIC_STORE_CONFIG = "config/vector_store/dynamic.json"
+DEFAULT_NEAR_DUP_STORE_PATH = "vector_db/dynamic/near_dup.sqlite3"
+DEFAULT_NEAR_DUP_CONFIG = {
+    "enabled": True,
+    "hamming_threshold": 3,
+    "min_chars": 50,
+}
+
+SIMHASH_BITS = 64
+SHINGLE_SIZE = 3
+
+# SimHash 逐位累加改为大整数分道累加：64 位哈希的每一位展开到 _LANE_BITS 宽的独立分道，
+# 一次整数乘加完成全部 64 位的计数，分道宽度足以容纳任意文本的 3-gram 总数
+_LANE_BITS = 32
+_LANE_MASK = (1 << _LANE_BITS) - 1
+_BYTE_LANES = [sum(((b >> i) & 1) << (i * _LANE_BITS) for i in range(8)) for b in range(256)]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fingerprints (
+    doc_key TEXT PRIMARY KEY,
+    simhash INTEGER NOT NULL,
+    cluster_id TEXT NOT NULL,
+    scope TEXT NOT NULL DEFAULT '',
+    rep TEXT NOT NULL DEFAULT '',
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_fingerprints_cluster ON fingerprints(cluster_id);
+CREATE TABLE IF NOT EXISTS bands (
+    band INTEGER NOT NULL,
+    value INTEGER NOT NULL,
+    doc_key TEXT NOT NULL,
+    PRIMARY KEY (band, value, doc_key)
+);
+CREATE INDEX IF NOT EXISTS idx_bands_doc ON bands(doc_key);
+"""
+
+
+def _hash64(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+@lru_cache(maxsize=1 << 16)
+def _gram_lanes(gram: str) -> int:
+    """3-gram 哈希的每一位展开到各自的分道（第 i 位 -> 第 i 个 _LANE_BITS 宽分道的最低位）；常见 3-gram 跨帖子复用。"""
+    value = _hash64(gram)
+    out = 0
+    for i in range(SIMHASH_BITS // 8):
+        out |= _BYTE_LANES[(value >> (8 * i)) & 0xFF] << (8 * i * _LANE_BITS)
+    return out
+
+
+def simhash(text: str) -> int:
+    """归一化文本的字符 3-gram 加权 64 位 SimHash（无符号）：某位为 1 的 3-gram 权重和超过总权重一半时该位取 1。"""
+    text = normalize_post_body(text).replace(" ", "")
+    if not text:
+        return 0
+    grams = Counter(text[i:i + SHINGLE_SIZE] for i in range(max(len(text) - SHINGLE_SIZE + 1, 1)))
+    total = sum(grams.values())
+    packed = sum(count * _gram_lanes(gram) for gram, count in grams.items())
+    value = 0
+    for bit in range(SIMHASH_BITS):
+        if 2 * ((packed >> (bit * _LANE_BITS)) & _LANE_MASK) > total:
+            value |= 1 << bit
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin((a ^ b) & ((1 << SIMHASH_BITS) - 1)).count("1")
+
+
+def _signed(value: int) -> int:
+    """SQLite INTEGER 为有符号 64 位。"""
+    return value - (1 << SIMHASH_BITS) if value >= 1 << (SIMHASH_BITS - 1) else value
+
+
+def _unsigned(value: int) -> int:
+    return value + (1 << SIMHASH_BITS) if value < 0 else value
+
+
+def _board_scope(record: dict) -> str:
+    """版面作用域：讨论区 + 版面（每个簇在每个作用域内有一个写入向量库的版面代表）。"""
+    return f"{record.get('section', '') or ''}\x1f{record.get('board', '') or ''}"
+
+
+def _band_values(value: int, bands: int) -> list[tuple[int, int]]:
+    width = SIMHASH_BITS // bands
+    mask = (1 << width) - 1
+    return [(i, (value >> (i * width)) & mask) for i in range(bands)]
+
+
+class NearDupIndex:
+    """SimHash 指纹、LSH 分段与近重复簇的 SQLite 存储。"""
+
+    def __init__(self, db_path: str, hamming_threshold: int = 3, min_chars: int = 50):
+        self.db_path = db_path
+        self.threshold = max(int(hamming_threshold), 0)
+        self.bands = min(self.threshold + 1, SIMHASH_BITS)
+        self.min_chars = max(int(min_chars), 0)
+        self._lock = threading.Lock()
+        with sqlite_session(self.db_path) as conn:
+            conn.executescript(_SCHEMA)
+            columns = {r["name"] for r in conn.execute("PRAGMA table_info(fingerprints)")}
+            if "scope" not in columns:
+                conn.execute("ALTER TABLE fingerprints ADD COLUMN scope TEXT NOT NULL DEFAULT ''")
+            if "rep" not in columns:
+                # 早期版本按版面聚类，簇代表即版面代表
+                conn.execute("ALTER TABLE fingerprints ADD COLUMN rep TEXT NOT NULL DEFAULT ''")
+                conn.execute("UPDATE fingerprints SET rep = cluster_id WHERE rep = ''")
+
+    def assign(self, records: Iterable[dict]) -> dict[str, str]:
+        """
+        为帖子记录分配近重复簇（跨版面聚类，同批内的帖子也会互相聚类）。
+        :param records: post_records 产出的帖子记录（content 为清理后正文）
+        :return: {doc_key: 所在版面的代表 doc_key}；代表即自身时该帖子需要写入向量库。
+                 还包含因原代表正文变化而重新归簇的原成员（可能不在 records 中）
+        """
+        now = time.time()
+        result: dict[str, str] = {}
+        with self._lock, sqlite_session(self.db_path) as conn:
+            for record in records:
+                key = record.get("doc_key")
+                if not key:
+                    continue
+                scope = _board_scope(record)
+                body = normalize_post_body(post_body_text(record.get("content")))
+                old = conn.execute(
+                    "SELECT simhash, cluster_id, scope, rep FROM fingerprints WHERE doc_key = ?", (key,),
+                ).fetchone()
+                if len(body) < self.min_chars:
+                    if old is not None:
+                        orphans = self._detach_members(conn, key)
+                        conn.execute("DELETE FROM bands WHERE doc_key = ?", (key,))
+                        conn.execute("DELETE FROM fingerprints WHERE doc_key = ?", (key,))
+                        result.update(self._rehome(conn, orphans))
+                    result[key] = key
+                    continue
+                value = simhash(f"{record.get('title', '')}\n{body}")
+                if (
+                    old is not None
+                    and old["scope"] == scope
+                    and hamming_distance(_unsigned(old["simhash"]), value) <= self.threshold
+                ):
+                    result[key] = old["rep"]
+                    continue
+                orphans: list[str] = []
+                if old is not None:
+                    conn.execute("DELETE FROM bands WHERE doc_key = ?", (key,))
+                    orphans = self._detach_members(conn, key)
+                cluster = self._nearest_cluster(conn, key, value, exclude=set(orphans)) or key
+                rep = self._board_rep(conn, key, cluster, scope)
+                conn.execute(
+                    "INSERT INTO fingerprints(doc_key, simhash, cluster_id, scope, rep, updated_at) "
+                    "VALUES(?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(doc_key) DO UPDATE SET simhash = excluded.simhash, cluster_id = excluded.cluster_id, "
+                    "scope = excluded.scope, rep = excluded.rep, updated_at = excluded.updated_at",
+                    (key, _signed(value), cluster, scope, rep, now),
+                )
+                conn.executemany(
+                    "INSERT OR IGNORE INTO bands(band, value, doc_key) VALUES(?, ?, ?)",
+                    [(band, band_value, key) for band, band_value in _band_values(value, self.bands)],
+                )
+                result[key] = rep
+                result.update(self._rehome(conn, orphans))
+        return result
+
+    @staticmethod
+    def _detach_members(conn, key: str) -> list[str]:
+        """解散由 key 代表的成员（key 为簇代表时是整簇，为版面代表时是该版面的成员）：暂时各自成簇，返回它们（按加入时间）。"""
+        rows = conn.execute(
+            "SELECT doc_key FROM fingerprints WHERE (cluster_id = ? OR rep = ?) AND doc_key != ? ORDER BY updated_at",
+            (key, key, key),
+        ).fetchall()
+        conn.execute(
+            "UPDATE fingerprints SET cluster_id = doc_key, rep = doc_key WHERE (cluster_id = ? OR rep = ?) AND doc_key != ?",
+            (key, key, key),
+        )
+        return [r["doc_key"] for r in rows]
+
+    @staticmethod
+    def _board_rep(conn, key: str, cluster: str, scope: str) -> str:
+        """簇在该版面的代表；该版面还没有代表时 key 自己成为代表。"""
+        row = conn.execute(
+            "SELECT doc_key FROM fingerprints WHERE cluster_id = ? AND scope = ? AND rep = doc_key AND doc_key != ? "
+            "ORDER BY updated_at LIMIT 1",
+            (cluster, scope, key),
+        ).fetchone()
+        return row["doc_key"] if row else key
+
+    def _rehome(self, conn, orphans: list[str]) -> dict[str, str]:
+        """原簇成员逐个重新归簇（尚未处理的成员不作为候选），找不到簇的成为新代表；返回 {doc_key: 簇代表}。"""
+        pending = set(orphans)
+        out: dict[str, str] = {}
+        for key in orphans:
+            pending.discard(key)
+            row = conn.execute("SELECT simhash, scope FROM fingerprints WHERE doc_key = ?", (key,)).fetchone()
+            if row is None:
+                continue
+            cluster = self._nearest_cluster(conn, key, _unsigned(row["simhash"]), exclude=pending) or key
+            rep = self._board_rep(conn, key, cluster, row["scope"])
+            conn.execute("UPDATE fingerprints SET cluster_id = ?, rep = ? WHERE doc_key = ?", (cluster, rep, key))
+            out[key] = rep
+        return out
+
+    def _nearest_cluster(
+        self,
+        conn,
+        key: str,
+        value: int,
+        exclude: set[str] | None = None,
+    ) -> str | None:
+        """LSH 召回候选（不限版面，跳过 exclude），返回汉明距离最近（且不超过阈值）的候选所在簇。"""
+        skip = {key, *(exclude or ())}
+        candidates: set[str] = set()
+        for band, band_value in _band_values(value, self.bands):
+            rows = conn.execute("SELECT doc_key FROM bands WHERE band = ? AND value = ?", (band, band_value)).fetchall()
+            candidates.update(r["doc_key"] for r in rows if r["doc_key"] not in skip)
+        best: tuple[int, str] | None = None
+        candidate_keys = list(candidates)
+        for i in range(0, len(candidate_keys), 500):
+            chunk = candidate_keys[i:i + 500]
+            rows = conn.execute(
+                f"SELECT simhash, cluster_id FROM fingerprints WHERE doc_key IN ({','.join('?' for _ in chunk)})",
+                chunk,
+            ).fetchall()
+            for r in rows:
+                distance = hamming_distance(_unsigned(r["simhash"]), value)
+                if distance <= self.threshold and (best is None or distance < best[0]):
+                    best = (distance, r["cluster_id"])
+        return best[1] if best else None
+
+    def representatives(self, doc_keys: Iterable[str]) -> dict[str, str]:
+        """批量查询所属簇代表，返回 {doc_key: 代表 doc_key}（未登记的帖子不在结果中）。"""
+        keys = list(dict.fromkeys(k for k in doc_keys if k))
+        found: dict[str, str] = {}
+        with sqlite_session(self.db_path) as conn:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                rows = conn.execute(
+                    f"SELECT doc_key, cluster_id FROM fingerprints WHERE doc_key IN ({','.join('?' for _ in chunk)})",
+                    chunk,
+                ).fetchall()
+                found.update((r["doc_key"], r["cluster_id"]) for r in rows)
+        return found
+
+    def members(self, cluster_ids: Iterable[str]) -> dict[str, list[str]]:
+        """批量查询簇成员（含代表自身），返回 {簇代表: [doc_key, ...]}。"""
+        ids = list(dict.fromkeys(c for c in cluster_ids if c))
+        found: dict[str, list[str]] = {c: [] for c in ids}
+        with sqlite_session(self.db_path) as conn:
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                rows = conn.execute(
+                    f"SELECT doc_key, cluster_id FROM fingerprints WHERE cluster_id IN ({','.join('?' for _ in chunk)}) "
+                    "ORDER BY updated_at",
+                    chunk,
+                ).fetchall()
+                for r in rows:
+                    found[r["cluster_id"]].append(r["doc_key"])
+        return found
+
+
+def get_near_dup_config() -> dict:
+    """读取 dynamic.json 的 near_dup 配置（缺省项取默认值）。"""
+    cfg = load_json_config(default_path=DYNAMIC_STORE_CONFIG)
+    return {**DEFAULT_NEAR_DUP_CONFIG, **(cfg.get("near_dup") or {})}
+
+
+_default_index: NearDupIndex | None = None
+
+
+def get_near_dup_index() -> NearDupIndex:
+    """获取近重复索引（单例，路径取 dynamic.json 的 near_dup_store_path）。"""
+    global _default_index
+    if _default_index is None:
+        cfg = load_json_config(default_path=DYNAMIC_STORE_CONFIG)
+        near_dup = get_near_dup_config()
+        _default_index = NearDupIndex(
+            cfg.get("near_dup_store_path") or DEFAULT_NEAR_DUP_STORE_PATH,
+            hamming_threshold=near_dup["hamming_threshold"],
+            min_chars=near_dup["min_chars"],
+        )
+    return _default_index
+
+
+def collapse_near_duplicates(items: list[dict], key_field: str = "url") -> list[dict]:
+    """
+    检索结果按近重复簇折叠（跨版面）：同簇只保留排名最前的一条，附 duplicates（同簇其他帖子的 key 列表，含其他版面的转载）。
+    近重复索引不可用时原样返回。
+    """
+    try:
+        index = get_near_dup_index()
+        reps = index.representatives(item.get(key_field, "") for item in items)
+        members = index.members(set(reps.values()))
+    except Exception:
+        return items
+    out: list[dict] = []
+    seen: set[str] = set()
+    for item in items:
+        key = item.get(key_field, "")
+        cluster = reps.get(key, key)
+        if cluster and cluster in seen:
+            continue
+        if cluster:
+            seen.add(cluster)
+        others = [m for m in members.get(cluster, []) if m != key]
+        out.append(dict(item, duplicates=others) if others else item)
+    return out
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+索引服务 - 帖子清理引擎：把上游 knowledge.processing.clean 的 clean_json_files 按文件分批放进进程池并行执行。
+
+- 分块规则与写回都由上游 clean_json_files 完成，引擎只负责分批与并行，输出与单进程逐个文件清理一致；
+- 文件按 chunk_size 分批交给进程池（spawn），多核并行清理；文件数少于 min_parallel_files 或在守护进程中时在本进程执行，
+  进程池出错时改为在本进程执行；
+- 每次清理返回并记录吞吐（文件数、耗时、files/s）。
+
+参数见 config/data/processed/webdata_cleaned.json 的 clean_engine；enabled 为 false 时 clean_post_files 直接在调用线程执行
+clean_json_files。
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable
+
+from knowledge.processing.clean import clean_json_files
+from utils.config_handler import load_json_config
+from utils.logger_handler import logger
+
+from agent.services.indexing.post_records import normalize_source_path
+
+WEBDATA_CLEANED_CONFIG = "config/data/processed/webdata_cleaned.json"
+
+DEFAULT_CLEAN_ENGINE_CONFIG = {
+    "enabled": True,
+    "workers": 0,
+    "chunk_size": 64,
+    "min_parallel_files": 16,
+}
+
+
+def _clean_chunk(paths: list[str]) -> int:
+    """进程池任务：用上游 clean_json_files 清理一批文件，返回成功处理的文件数。"""
+    return int(clean_json_files(paths) or 0)
+
+
+def get_clean_engine_config() -> dict:
+    """读取 webdata_cleaned.json 的 clean_engine 配置（缺省项取默认值）。"""
+    cfg = load_json_config(default_path=WEBDATA_CLEANED_CONFIG).get("clean_engine") or {}
+    return {**DEFAULT_CLEAN_ENGINE_CONFIG, **cfg}
+
+
+class CleanEngine:
+    """帖子清理引擎：进程池分批并行清理，进程池在首次需要时创建并复用。"""
+
+    def __init__(self, workers: int = 0, chunk_size: int = 64, min_parallel_files: int = 16):
+        self.workers = int(workers) or os.cpu_count() or 1
+        self.chunk_size = max(int(chunk_size), 1)
+        self.min_parallel_files = max(int(min_parallel_files), 1)
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _parallel(self, n_files: int) -> bool:
+        # 守护进程（如 multiprocessing.Pool 的 worker）不能再创建子进程
+        return self.workers > 1 and n_files >= self.min_parallel_files and not multiprocessing.current_process().daemon
+
+    def clean_files(self, file_paths: Iterable[str | Path]) -> dict:
+        """
+        清理给定的帖子 JSON 文件并写回（分批调用 clean_json_files）。
+        :return: {"files": 成功处理的文件数, "seconds", "files_per_sec", "workers"}
+        """
+        paths = list(dict.fromkeys(normalize_source_path(str(p)) for p in file_paths or []))
+        t0 = time.perf_counter()
+        files = 0
+        workers = 1
+        if self._parallel(len(paths)):
+            chunks = [paths[i:i + self.chunk_size] for i in range(0, len(paths), self.chunk_size)]
+            try:
+                files = sum(self._pool().map(_clean_chunk, chunks))
+                workers = min(self.workers, len(chunks))
+            except Exception as e:
+                # 上游按文件写回，重跑已清理的文件只会跳过已分块的帖子
+                logger.warning(f"[post_cleaner]进程池清理失败，改为本进程清理: {e}")
+                self.shutdown()
+                files = _clean_chunk(paths)
+        elif paths:
+            files = _clean_chunk(paths)
+        seconds = time.perf_counter() - t0
+        stats = {
+            "files": files,
+            "seconds": round(seconds, 3),
+            "files_per_sec": round(files / seconds, 1) if seconds > 0 else None,
+            "workers": workers,
+        }
+        if paths:
+            logger.info(
+                f"[post_cleaner]清理 {files}/{len(paths)} 个文件，耗时 {stats['seconds']}s，"
+                f"{stats['files_per_sec']} files/s（{workers} 进程）"
+            )
+        return stats
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+_default_engine: CleanEngine | None = None
+
+
+def get_clean_engine() -> CleanEngine:
+    """获取帖子清理引擎（单例，参数取 webdata_cleaned.json 的 clean_engine）。"""
+    global _default_engine
+    if _default_engine is None:
+        cfg = get_clean_engine_config()
+        _default_engine = CleanEngine(
+            workers=cfg["workers"],
+            chunk_size=cfg["chunk_size"],
+            min_parallel_files=cfg["min_parallel_files"],
+        )
+    return _default_engine
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+索引服务 - 帖子元数据侧存储：把爬取帖子的 title/author/url/date/reply_count/source_file 写入带索引的 SQLite，
+按 url 去重（同一帖子多次爬取只保留最新一条），支持按版面、作者、日期、回复数过滤与字段投影。
+
+路径见 config/vector_store/dynamic.json 的 post_meta_store_path（默认 vector_db/dynamic/post_meta.sqlite3），
+由清理流程写入；「本周某版面回复最多的帖子」这类结构化问题可直接在此查询，无需向量检索。
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+import time
+from typing import Iterable
+
+from utils.config_handler import load_json_config
+from utils.logger_handler import logger
+from utils.sqlite_handler import sqlite_session
+
+DYNAMIC_STORE_CONFIG = "config/vector_store/dynamic.json"
+DEFAULT_POST_META_STORE_PATH = "vector_db/dynamic/post_meta.sqlite3"
+
+# 可投影/可排序的字段白名单（防止拼接任意 SQL）
+POST_META_FIELDS = (
+    "doc_key", "url", "title", "author", "section", "board",
+    "date", "time", "ts", "reply_count", "source_file", "updated_at",
+)
+ORDERABLE_FIELDS = ("ts", "reply_count", "updated_at")
+DEFAULT_FIELDS = ("title", "author", "url", "date", "reply_count", "source_file")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    doc_key TEXT PRIMARY KEY,
+    url TEXT,
+    title TEXT,
+    author TEXT,
+    section TEXT,
+    board TEXT,
+    date TEXT,
+    time TEXT,
+    ts REAL,
+    reply_count INTEGER DEFAULT 0,
+    source_file TEXT,
+    updated_at REAL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_posts_url ON posts(url) WHERE url != '';
+CREATE INDEX IF NOT EXISTS idx_posts_board_ts ON posts(section, board, ts);
+CREATE INDEX IF NOT EXISTS idx_posts_board_replies ON posts(section, board, reply_count);
+CREATE INDEX IF NOT EXISTS idx_posts_author ON posts(author, ts);
+CREATE INDEX IF NOT EXISTS idx_posts_ts ON posts(ts);
+CREATE INDEX IF NOT EXISTS idx_posts_source ON posts(source_file);
+"""
+
+
+class PostMetaStore:
+    """帖子元数据 SQLite 侧存储。"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        with sqlite_session(self.db_path) as conn:
+            conn.executescript(_SCHEMA)
+
+    def upsert(self, records: Iterable[dict]) -> int:
+        """
+        写入或更新帖子元数据；doc_key（有 url 时即 url）相同视为同一帖子，后写覆盖先写。
+        :param records: post_records 产出的帖子记录
+        :return: 写入条数
+        """
+        now = time.time()
+        rows = [
+            (
+                r["doc_key"], r.get("url", ""), r.get("title", ""), r.get("author", ""),
+                r.get("section", ""), r.get("board", ""), r.get("date", ""), r.get("time", ""),
+                r.get("ts"), r.get("reply_count", 0), r.get("source_file", ""), now,
+            )
+            for r in records
+            if r.get("doc_key")
+        ]
+        if not rows:
+            return 0
+        with sqlite_session(self.db_path) as conn:
+            conn.executemany(
+                "INSERT INTO posts(doc_key, url, title, author, section, board, date, time, ts, reply_count, "
+                "source_file, updated_at) VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(doc_key) DO UPDATE SET url = excluded.url, title = excluded.title, "
+                "author = excluded.author, section = excluded.section, board = excluded.board, "
+                "date = excluded.date, time = excluded.time, ts = excluded.ts, "
+                "reply_count = excluded.reply_count, source_file = excluded.source_file, "
+                "updated_at = excluded.updated_at",
+                rows,
+            )
+        return len(rows)
+
+    def query(
+        self,
+        section: str | None = None,
+        board: str | None = None,
+        author: str | None = None,
+        ts_from: float | None = None,
+        ts_to: float | None = None,
+        min_reply_count: int | None = None,
+        order_by: str = "ts",
+        descending: bool = True,
+        limit: int = 20,
+        fields: Iterable[str] | None = None,
+    ) -> list[dict]:
+        """
+        结构化查询帖子元数据。
+        :param section: 讨论区
+        :param board: 版面
+        :param author: 作者
+        :param ts_from: 发布时间下限（时间戳，含）
+        :param ts_to: 发布时间上限（时间戳，含）
+        :param min_reply_count: 最少回复数
+        :param order_by: 排序字段（ts / reply_count / updated_at）
+        :param descending: 是否降序
+        :param limit: 返回条数
+        :param fields: 需要返回的字段（白名单内），None 时返回 DEFAULT_FIELDS
+        :return: 只含所选字段的 dict 列表
+        """
+        columns = [f for f in (fields or DEFAULT_FIELDS) if f in POST_META_FIELDS] or list(DEFAULT_FIELDS)
+        if order_by not in ORDERABLE_FIELDS:
+            order_by = "ts"
+        where = ["1 = 1"]
+        args: list = []
+        for column, value in (("section", section), ("board", board), ("author", author)):
+            if value:
+                where.append(f"{column} = ?")
+                args.append(value)
+        if ts_from is not None:
+            where.append("ts >= ?")
+            args.append(ts_from)
+        if ts_to is not None:
+            where.append("ts <= ?")
+            args.append(ts_to)
+        if min_reply_count is not None:
+            where.append("reply_count >= ?")
+            args.append(min_reply_count)
+        sql = (
+            f"SELECT {', '.join(columns)} FROM posts WHERE {' AND '.join(where)} "
+            f"ORDER BY {order_by} {'DESC' if descending else 'ASC'} LIMIT ?"
+        )
+        with sqlite_session(self.db_path) as conn:
+            rows = conn.execute(sql, (*args, max(limit, 0))).fetchall()
+        return [dict(r) for r in rows]
+
+    def get(self, doc_keys: Iterable[str], fields: Iterable[str] | None = None) -> dict[str, dict]:
+        """按 doc_key 批量读取元数据，返回 {doc_key: dict}。"""
+        keys = list(doc_keys)
+        if not keys:
+            return {}
+        columns = [f for f in (fields or DEFAULT_FIELDS) if f in POST_META_FIELDS and f != "doc_key"]
+        placeholders = ",".join("?" for _ in keys)
+        with sqlite_session(self.db_path) as conn:
+            rows = conn.execute(
+                f"SELECT doc_key, {', '.join(columns) or 'url'} FROM posts WHERE doc_key IN ({placeholders})", keys
+            ).fetchall()
+        return {r["doc_key"]: dict(r) for r in rows}
+
+    def remove_source_files(self, source_files: Iterable[str]) -> int:
+        """删除来自指定文件的帖子元数据，返回删除条数。"""
+        removed = 0
+        with sqlite_session(self.db_path) as conn:
+            for path in source_files:
+                removed += conn.execute("DELETE FROM posts WHERE source_file = ?", (path,)).rowcount
+        return removed
+
+
+_default_store: PostMetaStore | None = None
+
+
+def get_post_meta_store() -> PostMetaStore:
+    """获取动态帖子元数据侧存储（单例，路径取 dynamic.json 的 post_meta_store_path）。"""
+    global _default_store
+    if _default_store is None:
+        cfg = load_json_config(default_path=DYNAMIC_STORE_CONFIG)
+        _default_store = PostMetaStore(cfg.get("post_meta_store_path") or DEFAULT_POST_META_STORE_PATH)
+    return _default_store
+
+
+def update_post_meta_store(records: Iterable[dict]) -> int:
+    """将帖子记录写入元数据侧存储；失败时记录日志并返回 0，不影响爬取主流程。"""
+    try:
+        return get_post_meta_store().upsert(records)
+    except Exception as e:
+        logger.error(f"[post_meta_store]写入失败: {e}")
+        return 0
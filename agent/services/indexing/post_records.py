@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+索引服务 - 帖子记录：把爬取保存的帖子 JSON 统一解析为扁平记录，供词法索引等侧存储使用。
+
+兼容两种文件形态：
+- 单帖 JSON（data/dynamic/<讨论区>/<版面>/xxx.json，含 title/author/url/content 等）；
+- 版面-日期 JSON（含 section_name、board_name、date、posts 列表，与 json_loader 一致）。
+content 既可为原始字符串，也可为清理后的分块 dict（取「正文」块）。
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+from datetime import datetime
+from typing import Any, Iterable, Iterator
+
+from utils.file_handler import JsonPostStream
+from utils.logger_handler import logger
+from utils.path_tool import get_abs_path
+
+BODY_BLOCK_KEYS = ("正文", "body", "content")
+DEFAULT_RECORD_BATCH_SIZE = 500
+
+# 帖子日期/时间的常见写法（按顺序尝试）
+_DATETIME_FORMATS = (
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y/%m/%d %H:%M:%S",
+    "%Y/%m/%d %H:%M",
+    "%Y-%m-%d",
+    "%Y/%m/%d",
+    "%Y%m%d",
+)
+
+
+def normalize_source_path(path: str) -> str:
+    """统一文件路径写法（相对路径按项目根解析 + 规范分隔符），用于跨存储比对 source_file。"""
+    if not path:
+        return ""
+    return os.path.normpath(path if os.path.isabs(path) else get_abs_path(path))
+
+
+def post_body_text(content: Any) -> str:
+    """取帖子正文文本：字符串原样返回；清理后的分块 dict 优先取「正文」块。"""
+    if content is None:
+        return ""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, dict):
+        for key in BODY_BLOCK_KEYS:
+            value = content.get(key)
+            if isinstance(value, str) and value.strip():
+                return value
+        return "\n".join(str(v) for v in content.values() if isinstance(v, str))
+    if isinstance(content, list):
+        return "\n".join(post_body_text(c) for c in content)
+    return str(content)
+
+
+def parse_datetime(value: str) -> float | None:
+    """解析日期/日期时间字符串为时间戳（秒），无法解析返回 None。"""
+    value = (value or "").strip()
+    if not value:
+        return None
+    for fmt in _DATETIME_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).timestamp()
+        except ValueError:
+            continue
+    return None
+
+
+def post_timestamp(date: str, time_str: str) -> float | None:
+    """
+    帖子发布时间戳：time 为完整日期时间时直接解析；仅含时分秒时与 date 拼接；都不可用时退回 date。
+    """
+    ts = parse_datetime(time_str)
+    if ts is not None:
+        return ts
+    if date and time_str:
+        ts = parse_datetime(f"{date} {time_str}")
+        if ts is not None:
+            return ts
+    return parse_datetime(date)
+
+
+def post_doc_key(record: dict) -> str:
+    """帖子稳定标识：优先 url，其次 source_file（版面-日期文件内再加序号）。"""
+    url = (record.get("url") or "").strip()
+    if url:
+        return url
+    source = record.get("source_file", "")
+    index = record.get("post_index")
+    return f"{source}#{index}" if index is not None else source
+
+
+def _board_from_path(path: str) -> tuple[str, str]:
+    """从 data/dynamic/<讨论区>/<版面>/xxx.json 推断 (section, board)。"""
+    parent = os.path.dirname(path)
+    return os.path.basename(os.path.dirname(parent)), os.path.basename(parent)
+
+
+def _to_int(value: Any) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _make_record(post: dict, source_file: str, section: str, board: str, date: str, index: int | None) -> dict:
+    record = {
+        "source_file": source_file,
+        "post_index": index,
+        "section": post.get("section_name") or post.get("section") or section,
+        "board": post.get("board_name") or post.get("board") or board,
+        "title": post.get("title", "") or "",
+        "author": post.get("author", "") or "",
+        "url": post.get("url", "") or "",
+        "date": post.get("date") or date or "",
+        "time": post.get("time", "") or "",
+        "reply_count": _to_int(post.get("reply_count", 0)),
+        "content": post_body_text(post.get("content")),
+    }
+    record["doc_key"] = post_doc_key(record)
+    record["ts"] = post_timestamp(record["date"], record["time"])
+    return record
+
+
+def iter_post_records(filepath: str, errors: set[str] | None = None) -> Iterator[dict]:
+    """
+    逐条产出帖子记录（dict：doc_key, source_file, section, board, title, author, url, date, time, ts, reply_count, content）。
+    posts 数组经 JsonPostStream 流式解析，不把整个文件读入内存。
+    :param filepath: 帖子 JSON 文件路径
+    :param errors: 读取或解析失败时把规范化后的路径加入该集合（此前已产出的记录仍有效，但文件不完整）
+    """
+    source_file = normalize_source_path(str(filepath))
+    path_section, path_board = _board_from_path(source_file)
+    stream = JsonPostStream(source_file)
+    try:
+        for i, post in enumerate(stream):
+            header = stream.header
+            yield _make_record(
+                post,
+                source_file,
+                header.get("section_name") or path_section,
+                header.get("board_name") or path_board,
+                header.get("date", ""),
+                i,
+            )
+    except Exception as e:
+        logger.error(f"[post_records]读取 {source_file} 失败: {e}")
+        if errors is not None:
+            errors.add(source_file)
+        return
+    data = stream.header
+    if stream.has_posts or not data:
+        return
+    # 单帖子文件（没有 posts 键）：顶层即帖子本身；posts 为 null 或非数组的文件不产出记录
+    yield _make_record(
+        data,
+        source_file,
+        data.get("section_name") or path_section,
+        data.get("board_name") or path_board,
+        data.get("date", ""),
+        None,
+    )
+
+
+def iter_files_post_records(file_paths: Iterable, errors: set[str] | None = None) -> Iterator[dict]:
+    """依次流式产出多个帖子文件的记录（errors 含义同 iter_post_records）。"""
+    for path in file_paths or []:
+        yield from iter_post_records(str(path), errors)
+
+
+def iter_post_record_batches(
+    file_paths: Iterable,
+    batch_size: int = DEFAULT_RECORD_BATCH_SIZE,
+    errors: set[str] | None = None,
+) -> Iterator[list[dict]]:
+    """把多个帖子文件的记录按 batch_size 分批产出，峰值内存与文件总大小无关。"""
+    step = max(int(batch_size), 1)
+    batch: list[dict] = []
+    for record in iter_files_post_records(file_paths, errors):
+        batch.append(record)
+        if len(batch) >= step:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def load_post_records(file_paths) -> list[dict]:
+    """批量读取多个帖子文件的记录（一次性放入列表；大批量请用 iter_post_record_batches）。"""
+    return list(iter_files_post_records(file_paths))
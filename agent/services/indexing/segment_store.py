@@ -0,0 +1,475 @@
+# -*- coding: utf-8 -*-
+"""
+索引服务 - 帖子段文件存储：每个版面一组追加写的 JSONL 段文件，替代逐个打开版面-日期 JSON 的读取方式。
+
+- 布局：<root>/<讨论区>/<版面>/seg-000001.jsonl，每行一条帖子记录（与 post_records 的记录结构一致）；
+- 偏移索引：SQLite 记录 doc_key -> (段号, 字节偏移, 长度, 内容哈希)，按 doc_key 经 mmap 随机读取单条帖子；
+- 追加：同一帖子内容未变（哈希一致）时不重复写；内容变化时追加新行，旧行成为垃圾；
+  活跃段超过 max_segment_bytes 后滚动到新段，写入与索引更新在同一个 BEGIN IMMEDIATE 事务内，多进程安全；
+- 顺序读取：按 (段号, 偏移) 顺序遍历版面的有效记录，供向量库初始化、索引重建按段顺序读取；
+- 压缩：垃圾字节占比超过 compact_garbage_ratio 且不少于 compact_min_bytes 时，把有效记录重写到新段并删除旧段；
+  段号单调递增不复用，其他进程已映射的旧段在删除后仍可读完。
+
+默认关闭（segment_store.enabled）：版面-日期 JSON 仍是爬取写入与清理的目标，段存储只是其副本；
+开启后由 indexer 在帖子清理写回后增量写入，压缩由热门版面刷新循环周期执行，
+已有数据用 agent/tools/initialize/post_stores.py 导入。参数见 config/vector_store/dynamic.json 的 segment_store。
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+import hashlib
+import json
+import mmap
+import re
+import threading
+import time
+from typing import Iterable, Iterator
+
+from knowledge.ingestion.utils_tools import sanitize_dir
+from utils.config_handler import load_json_config
+from utils.logger_handler import logger
+from utils.path_tool import get_abs_path
+from utils.sqlite_handler import sqlite_session
+
+from agent.services.indexing.post_records import DEFAULT_RECORD_BATCH_SIZE, iter_post_record_batches
+
+DYNAMIC_STORE_CONFIG = "config/vector_store/dynamic.json"
+
+DEFAULT_SEGMENT_STORE_CONFIG = {
+    "enabled": False,
+    "root": "data/segments",
+    "index_path": "data/segments/index.sqlite3",
+    "max_segment_bytes": 32 * 1024 * 1024,
+    "compact_garbage_ratio": 0.3,
+    "compact_min_bytes": 1024 * 1024,
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    doc_key TEXT PRIMARY KEY,
+    section TEXT NOT NULL,
+    board TEXT NOT NULL,
+    segment INTEGER NOT NULL,
+    pos INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    ts REAL,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_board ON entries(section, board, segment, pos);
+CREATE TABLE IF NOT EXISTS boards (
+    section TEXT NOT NULL,
+    board TEXT NOT NULL,
+    active_segment INTEGER NOT NULL,
+    next_segment INTEGER NOT NULL,
+    PRIMARY KEY (section, board)
+);
+"""
+
+
+def get_segment_store_config() -> dict:
+    """读取 dynamic.json 的 segment_store 配置（缺省项取默认值）。"""
+    cfg = load_json_config(default_path=DYNAMIC_STORE_CONFIG).get("segment_store") or {}
+    return {**DEFAULT_SEGMENT_STORE_CONFIG, **cfg}
+
+
+def _sync_close(f) -> None:
+    f.flush()
+    os.fsync(f.fileno())
+    f.close()
+
+
+class SegmentStore:
+    """
+    按版面分段的帖子记录存储：JSONL 段文件 + SQLite 偏移索引 + mmap 随机读取。
+    子类可覆盖 FILE_PREFIX/FILE_SUFFIX 与 encode/decode，以其他编码存放每条帖子（如 content_store 存正文原文）。
+    """
+
+    FILE_PREFIX = "seg"
+    FILE_SUFFIX = ".jsonl"
+
+    def __init__(
+        self,
+        root: str,
+        index_path: str,
+        max_segment_bytes: int = DEFAULT_SEGMENT_STORE_CONFIG["max_segment_bytes"],
+        compact_garbage_ratio: float = DEFAULT_SEGMENT_STORE_CONFIG["compact_garbage_ratio"],
+        compact_min_bytes: int = DEFAULT_SEGMENT_STORE_CONFIG["compact_min_bytes"],
+    ):
+        self.root = root if os.path.isabs(root) else get_abs_path(root)
+        self.index_path = index_path
+        self.max_segment_bytes = max(int(max_segment_bytes), 1)
+        self.compact_garbage_ratio = float(compact_garbage_ratio)
+        self.compact_min_bytes = max(int(compact_min_bytes), 0)
+        self._maps: dict[str, tuple[mmap.mmap, int]] = {}
+        self._lock = threading.Lock()
+        with sqlite_session(self.index_path) as conn:
+            conn.executescript(_SCHEMA)
+
+    def board_dir(self, section: str, board: str) -> str:
+        return os.path.join(self.root, sanitize_dir(section), sanitize_dir(board))
+
+    def segment_name(self, segment: int) -> str:
+        return f"{self.FILE_PREFIX}-{segment:06d}{self.FILE_SUFFIX}"
+
+    def segment_path(self, section: str, board: str, segment: int) -> str:
+        return os.path.join(self.board_dir(section, board), self.segment_name(segment))
+
+    def encode(self, record: dict) -> bytes | None:
+        """一条记录的存储字节；返回 None 时不写入。"""
+        return json.dumps(record, ensure_ascii=False, sort_keys=True).encode("utf-8")
+
+    def decode(self, data: bytes):
+        return json.loads(data)
+
+    # ---------- mmap ----------
+
+    def _map(self, path: str, end: int) -> mmap.mmap:
+        """取段文件的只读映射；活跃段追加后长度不足时重新映射。"""
+        with self._lock:
+            cached = self._maps.get(path)
+            if cached is not None and cached[1] >= end:
+                return cached[0]
+            with open(path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if size < end:
+                    raise ValueError(f"段文件 {path} 长度 {size} 小于索引偏移 {end}")
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if cached is not None:
+                cached[0].close()
+            self._maps[path] = (mm, size)
+            return mm
+
+    def _unmap(self, paths: Iterable[str]) -> None:
+        with self._lock:
+            for path in paths:
+                cached = self._maps.pop(path, None)
+                if cached is not None:
+                    cached[0].close()
+
+    def _read(self, path: str, offset: int, length: int) -> dict:
+        return self.decode(self._map(path, offset + length)[offset:offset + length])
+
+    def close(self) -> None:
+        """关闭全部段文件映射。"""
+        with self._lock:
+            for mm, _ in self._maps.values():
+                mm.close()
+            self._maps.clear()
+
+    # ---------- 写入 ----------
+
+    def _board_state(self, conn, section: str, board: str) -> tuple[int, int]:
+        row = conn.execute(
+            "SELECT active_segment, next_segment FROM boards WHERE section = ? AND board = ?", (section, board)
+        ).fetchone()
+        if row is None:
+            conn.execute(
+                "INSERT INTO boards (section, board, active_segment, next_segment) VALUES (?, ?, 1, 2)",
+                (section, board),
+            )
+            return 1, 2
+        return int(row["active_segment"]), int(row["next_segment"])
+
+    def _write_lines(self, conn, section: str, board: str, lines: Iterable[tuple[str, bytes]]) -> list[tuple]:
+        """把编码好的记录依次追加到活跃段（超过上限时滚动到新段），返回 [(doc_key, 段号, 偏移, 长度)]。"""
+        active, next_segment = self._board_state(conn, section, board)
+        os.makedirs(self.board_dir(section, board), exist_ok=True)
+        placed = []
+        f = None
+        offset = 0
+        try:
+            for doc_key, line in lines:
+                if f is None or offset >= self.max_segment_bytes:
+                    if f is not None:
+                        _sync_close(f)
+                        active, next_segment = next_segment, next_segment + 1
+                    path = self.segment_path(section, board, active)
+                    offset = os.path.getsize(path) if os.path.exists(path) else 0
+                    if offset >= self.max_segment_bytes:
+                        active, next_segment = next_segment, next_segment + 1
+                        path = self.segment_path(section, board, active)
+                        offset = os.path.getsize(path) if os.path.exists(path) else 0
+                    f = open(path, "ab")
+                f.write(line + b"\n")
+                placed.append((doc_key, active, offset, len(line)))
+                offset += len(line) + 1
+        finally:
+            if f is not None:
+                _sync_close(f)
+        conn.execute(
+            "UPDATE boards SET active_segment = ?, next_segment = ? WHERE section = ? AND board = ?",
+            (active, next_segment, section, board),
+        )
+        return placed
+
+    def append(self, records: Iterable[dict]) -> int:
+        """
+        追加帖子记录（post_records 结构，含 doc_key/section/board），内容未变的记录跳过。
+        :return: 实际写入的记录数
+        """
+        groups: dict[tuple[str, str], dict[str, dict]] = {}
+        for record in records or []:
+            doc_key = record.get("doc_key")
+            if doc_key:
+                groups.setdefault((record.get("section", ""), record.get("board", "")), {})[doc_key] = record
+        if not groups:
+            return 0
+        written = 0
+        now = time.time()
+        with sqlite_session(self.index_path) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for (section, board), by_key in groups.items():
+                keys = list(by_key)
+                known: dict[str, str] = {}
+                for i in range(0, len(keys), 500):
+                    chunk = keys[i:i + 500]
+                    rows = conn.execute(
+                        f"SELECT doc_key, hash FROM entries WHERE doc_key IN ({','.join('?' * len(chunk))})", chunk
+                    ).fetchall()
+                    known.update((r["doc_key"], r["hash"]) for r in rows)
+                lines = []
+                hashes = {}
+                for doc_key, record in by_key.items():
+                    line = self.encode(record)
+                    if line is None:
+                        continue
+                    digest = hashlib.sha1(line).hexdigest()
+                    if known.get(doc_key) != digest:
+                        lines.append((doc_key, line))
+                        hashes[doc_key] = digest
+                if not lines:
+                    continue
+                placed = self._write_lines(conn, section, board, lines)
+                conn.executemany(
+                    """
+                    INSERT INTO entries (doc_key, section, board, segment, pos, length, hash, ts, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(doc_key) DO UPDATE SET
+                        section = excluded.section, board = excluded.board, segment = excluded.segment,
+                        pos = excluded.pos, length = excluded.length, hash = excluded.hash,
+                        ts = excluded.ts, updated_at = excluded.updated_at
+                    """,
+                    [
+                        (key, section, board, seg, off, length, hashes[key], by_key[key].get("ts"), now)
+                        for key, seg, off, length in placed
+                    ],
+                )
+                written += len(placed)
+        return written
+
+    def import_files(self, file_paths: Iterable[str], batch_size: int = DEFAULT_RECORD_BATCH_SIZE) -> int:
+        """把已有的版面-日期 JSON 文件流式读取、按 batch_size 条分批导入段存储（首次启用时回填），返回写入记录数。"""
+        written = 0
+        for batch in iter_post_record_batches(file_paths, batch_size):
+            written += self.append(batch)
+        return written
+
+    # ---------- 读取 ----------
+
+    def get(self, doc_key: str) -> dict | None:
+        """按 doc_key（帖子 url 等）经 mmap 读取单条记录，不存在时返回 None。"""
+        found = self.get_many([doc_key])
+        return found.get(doc_key)
+
+    def get_many(self, doc_keys: Iterable[str], max_bytes: int | None = None) -> dict[str, dict]:
+        """
+        批量按 doc_key 读取记录，按 (段, 偏移) 顺序访问映射。
+        :param max_bytes: 只读取每条记录的前 max_bytes 字节（仅适用于可截断解码的子类，如正文存储的摘要）
+        """
+        keys = list(dict.fromkeys(k for k in doc_keys or [] if k))
+        out: dict[str, dict] = {}
+        for attempt in range(2):
+            rows = []
+            with sqlite_session(self.index_path) as conn:
+                for i in range(0, len(keys), 500):
+                    chunk = keys[i:i + 500]
+                    rows.extend(conn.execute(
+                        f"SELECT doc_key, section, board, segment, pos, length FROM entries "
+                        f"WHERE doc_key IN ({','.join('?' * len(chunk))})",
+                        chunk,
+                    ).fetchall())
+            missing = []
+            for r in sorted(rows, key=lambda r: (r["section"], r["board"], r["segment"], r["pos"])):
+                path = self.segment_path(r["section"], r["board"], r["segment"])
+                try:
+                    length = r["length"] if max_bytes is None else min(r["length"], max_bytes)
+                    out[r["doc_key"]] = self._read(path, r["pos"], length)
+                except (OSError, ValueError) as e:
+                    # 读取期间版面被压缩（旧段已删除），重新查一次索引
+                    if attempt:
+                        logger.error(f"[segment_store]读取 {r['doc_key']} 失败: {e}")
+                    missing.append(r["doc_key"])
+            if not missing:
+                break
+            keys = missing
+        return out
+
+    def iter_board(self, section: str, board: str) -> Iterator[dict]:
+        """按 (段号, 偏移) 顺序产出版面的全部有效记录。"""
+        with sqlite_session(self.index_path) as conn:
+            rows = conn.execute(
+                "SELECT segment, pos, length FROM entries WHERE section = ? AND board = ? ORDER BY segment, pos",
+                (section, board),
+            ).fetchall()
+        ends: dict[int, int] = {}
+        for r in rows:
+            ends[r["segment"]] = max(ends.get(r["segment"], 0), r["pos"] + r["length"])
+        mms: dict[int, mmap.mmap | None] = {}
+        for r in rows:
+            segment = r["segment"]
+            if segment not in mms:
+                path = self.segment_path(section, board, segment)
+                try:
+                    mms[segment] = self._map(path, ends[segment])
+                except (OSError, ValueError) as e:
+                    logger.error(f"[segment_store]打开段 {path} 失败: {e}")
+                    mms[segment] = None
+            mm = mms[segment]
+            if mm is None:
+                continue
+            try:
+                yield self.decode(mm[r["pos"]:r["pos"] + r["length"]])
+            except ValueError as e:
+                logger.error(f"[segment_store]解析 {section}/{board} 段 {segment} 偏移 {r['pos']} 失败: {e}")
+
+    def boards(self) -> list[tuple[str, str]]:
+        """段存储中已有的 (讨论区, 版面)。"""
+        with sqlite_session(self.index_path) as conn:
+            rows = conn.execute("SELECT section, board FROM boards ORDER BY section, board").fetchall()
+        return [(r["section"], r["board"]) for r in rows]
+
+    def iter_records(self, boards: Iterable[tuple[str, str]] | None = None) -> Iterator[dict]:
+        """按版面依次顺序读取记录；boards 为 None 时遍历全部版面。"""
+        for section, board in (boards if boards is not None else self.boards()):
+            yield from self.iter_board(section, board)
+
+    # ---------- 压缩 ----------
+
+    def _segment_files(self, section: str, board: str) -> dict[int, str]:
+        folder = self.board_dir(section, board)
+        if not os.path.isdir(folder):
+            return {}
+        pattern = re.compile(rf"^{re.escape(self.FILE_PREFIX)}-(\d{{6,}}){re.escape(self.FILE_SUFFIX)}$")
+        files = {}
+        for name in os.listdir(folder):
+            m = pattern.match(name)
+            if m:
+                files[int(m.group(1))] = os.path.join(folder, name)
+        return files
+
+    def board_stats(self, section: str, board: str) -> dict:
+        """{"segments": 段文件数, "bytes": 段文件总字节, "live_bytes": 有效记录字节, "garbage_bytes", "records"}"""
+        files = self._segment_files(section, board)
+        total = sum(os.path.getsize(p) for p in files.values())
+        with sqlite_session(self.index_path) as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) AS n, COALESCE(SUM(length + 1), 0) AS live FROM entries WHERE section = ? AND board = ?",
+                (section, board),
+            ).fetchone()
+        return {
+            "segments": len(files),
+            "bytes": total,
+            "live_bytes": int(row["live"]),
+            "garbage_bytes": max(total - int(row["live"]), 0),
+            "records": int(row["n"]),
+        }
+
+    def _should_compact(self, stats: dict) -> bool:
+        garbage = stats["garbage_bytes"]
+        return garbage >= self.compact_min_bytes and garbage >= stats["bytes"] * self.compact_garbage_ratio
+
+    def compact(self, section: str, board: str, force: bool = False) -> dict:
+        """
+        压缩版面：有效记录按原顺序重写到新段，更新索引后删除旧段。
+        :param force: 为 True 时不检查垃圾占比
+        :return: board_stats 的结果 + {"compacted": bool, "reclaimed_bytes": int}
+        """
+        stats = self.board_stats(section, board)
+        if not force and not self._should_compact(stats):
+            return {**stats, "compacted": False, "reclaimed_bytes": 0}
+        with sqlite_session(self.index_path) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            old_files = self._segment_files(section, board)
+            rows = conn.execute(
+                "SELECT doc_key, segment, pos, length FROM entries WHERE section = ? AND board = ? "
+                "ORDER BY segment, pos",
+                (section, board),
+            ).fetchall()
+            _, next_segment = self._board_state(conn, section, board)
+            first = next_segment
+            conn.execute(
+                "UPDATE boards SET active_segment = ?, next_segment = ? WHERE section = ? AND board = ?",
+                (first, first + 1, section, board),
+            )
+            lines = (
+                (r["doc_key"], self._map(
+                    self.segment_path(section, board, r["segment"]), r["pos"] + r["length"],
+                )[r["pos"]:r["pos"] + r["length"]])
+                for r in rows
+            )
+            placed = self._write_lines(conn, section, board, lines)
+            conn.executemany(
+                "UPDATE entries SET segment = ?, pos = ? WHERE doc_key = ?",
+                [(seg, off, key) for key, seg, off, _ in placed],
+            )
+            new_segments = {seg for _, seg, _, _ in placed}
+        stale = [p for seg, p in old_files.items() if seg not in new_segments]
+        self._unmap(stale)
+        for path in stale:
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"[segment_store]删除旧段 {path} 失败: {e}")
+        after = self.board_stats(section, board)
+        logger.info(
+            f"[segment_store]压缩 {section}/{board}: {stats['segments']} -> {after['segments']} 段，"
+            f"回收 {stats['bytes'] - after['bytes']} 字节"
+        )
+        return {**after, "compacted": True, "reclaimed_bytes": max(stats["bytes"] - after["bytes"], 0)}
+
+    def compact_all(self, force: bool = False) -> dict:
+        """检查全部版面并压缩达到阈值的版面，返回 {"boards": 压缩的版面数, "reclaimed_bytes": 回收字节数}。"""
+        compacted = reclaimed = 0
+        for section, board in self.boards():
+            try:
+                result = self.compact(section, board, force=force)
+            except Exception as e:
+                logger.error(f"[segment_store]压缩 {section}/{board} 失败: {e}")
+                continue
+            compacted += result["compacted"]
+            reclaimed += result["reclaimed_bytes"]
+        return {"boards": compacted, "reclaimed_bytes": reclaimed}
+
+
+_default_store: SegmentStore | None = None
+
+
+def get_segment_store() -> SegmentStore:
+    """获取段存储（单例，参数取 dynamic.json 的 segment_store）。"""
+    global _default_store
+    if _default_store is None:
+        cfg = get_segment_store_config()
+        _default_store = SegmentStore(
+            root=cfg["root"],
+            index_path=cfg["index_path"],
+            max_segment_bytes=cfg["max_segment_bytes"],
+            compact_garbage_ratio=cfg["compact_garbage_ratio"],
+            compact_min_bytes=cfg["compact_min_bytes"],
+        )
+    return _default_store
+
+
+def update_segment_store(records: list[dict]) -> int:
+    """把帖子记录追加到段存储；未启用或失败时只记录日志，返回写入记录数。"""
+    if not records or not get_segment_store_config().get("enabled"):
+        return 0
+    try:
+        return get_segment_store().append(records)
+    except Exception as e:
+        logger.error(f"[segment_store]写入段存储失败: {e}")
+        return 0
+
@@ -0,0 +1,397 @@
+# -*- coding: utf-8 -*-
+"""
+索引服务 - 动态向量库增量 upsert：只对爬取本次返回的 saved_paths 切分、embedding 并写入，
+不再重新扫描整个版面目录。
+
+- 稳定 id：每个分片 id 为 sha1(doc_key)#序号，同一帖子再次写入时覆盖而不是追加；
+- 内容未变跳过：分片元数据带 content_hash，库中同一帖子的哈希一致时不重新 embedding；
+- 元数据原地更新：正文哈希 body_hash（标题 + 归一化正文）一致、只有回复数等元数据变化时，
+  直接更新已有分片的元数据，不重新切分与 embedding（分片文本中的元信息行保持首次写入时的值）；
+- 近重复折叠：帖子经 near_dup 聚类，每个簇在每个版面只有一个代表写入向量库，其余成员的已有分片被删除；
+  原代表正文变化后重新成为代表的原成员从段存储取回记录一并写入；
+- 旧向量清理：帖子内容变化时先删除其全部旧分片（包括早期整目录导入、按 source 记录的分片）再写入；
+- md5 记录：写入后把文件 md5 追加到 dynamic.json 的 md5_hex_store，整目录导入时会跳过这些文件；
+- 共享 embedding：多个版面并发 upsert 时，分片向量经 embedding_batcher 跨版面合批、在全局预算内计算；
+- 段存储初始化：upsert_segment_records 按段顺序读取 segment_store 中的帖子，分批写入，不逐个打开 JSON 文件。
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Iterable
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from utils.config_handler import load_json_config
+from utils.file_handler import get_file_md5_hex
+from utils.logger_handler import logger
+from utils.path_tool import get_abs_path
+
+from agent.services.indexing.content_dedup import body_hash
+from agent.services.indexing.embedding_batcher import get_shared_embedder
+from agent.services.indexing.near_dup import get_near_dup_config, get_near_dup_index
+from agent.services.indexing.post_meta_store import get_post_meta_store
+from agent.services.indexing.post_records import (
+    iter_files_post_records,
+    iter_post_record_batches,
+    normalize_source_path,
+)
+from agent.services.indexing.segment_store import get_segment_store, get_segment_store_config
+
+DYNAMIC_STORE_CONFIG = "config/vector_store/dynamic.json"
+DEFAULT_UPSERT_BATCH_SIZE = 64
+DEFAULT_SEGMENT_BATCH_POSTS = 256
+
+_md5_lock = threading.Lock()
+
+
+def _store_config() -> dict:
+    return load_json_config(default_path=DYNAMIC_STORE_CONFIG)
+
+
+def _splitter(cfg: dict) -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
+        chunk_size=cfg.get("chunk_size", 500),
+        chunk_overlap=cfg.get("chunk_overlap", 50),
+        separators=cfg.get("separators") or None,
+    )
+
+
+def _post_text(record: dict) -> str:
+    """帖子入库文本：与 json_loader 一致的元信息行 + 正文。"""
+    header = (
+        f"版面：{record['section']} {record['board']} 日期：{record['date']} "
+        f"标题：{record['title']} 作者：{record['author']} 时间：{record['time']} "
+        f"回复数：{record['reply_count']} 链接：{record['url']}"
+    )
+    body = (record.get("content") or "").strip()
+    return f"{header}\n{body}" if body else header
+
+
+def _content_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def chunk_id(doc_key: str, index: int) -> str:
+    """分片稳定 id：sha1(doc_key)#序号。"""
+    return f"{hashlib.sha1(doc_key.encode('utf-8')).hexdigest()}#{index}"
+
+
+def build_post_documents(records: Iterable[dict], cfg: dict | None = None) -> list[tuple[dict, list[Document], list[str]]]:
+    """
+    把帖子记录切分为 Document，返回 [(记录, 分片 Document 列表, 分片 id 列表)]。
+    元数据含 source/source_file/section/board/date/title/reply_count/url/doc_key/ts/content_hash/body_hash。
+    """
+    cfg = cfg if cfg is not None else _store_config()
+    splitter = _splitter(cfg)
+    out = []
+    for record in records:
+        text = _post_text(record)
+        content_hash = _content_hash(text)
+        metadata = {
+            "source": record["source_file"],
+            "source_file": record["source_file"],
+            "section": record["section"],
+            "board": record["board"],
+            "date": record["date"],
+            "title": record["title"],
+            "reply_count": record["reply_count"],
+            "url": record["url"],
+            "doc_key": record["doc_key"],
+            "content_hash": content_hash,
+            "body_hash": body_hash(record["title"], record.get("content")),
+        }
+        if record.get("ts") is not None:
+            metadata["ts"] = record["ts"]
+        chunks = splitter.split_text(text) or [text]
+        docs = [Document(page_content=chunk, metadata=dict(metadata, chunk_index=i)) for i, chunk in enumerate(chunks)]
+        out.append((record, docs, [chunk_id(record["doc_key"], i) for i in range(len(docs))]))
+    return out
+
+
+def _existing_chunks(vector_store: Any, doc_keys: list[str]) -> dict[str, list[tuple[str, dict]]]:
+    """库中各帖子已有的分片 [(id, 元数据)]。"""
+    found: dict[str, list[tuple[str, dict]]] = {}
+    for i in range(0, len(doc_keys), 200):
+        chunk = doc_keys[i:i + 200]
+        got = vector_store.get(where={"doc_key": {"$in": chunk}}, include=["metadatas"])
+        for id_, meta in zip(got.get("ids") or [], got.get("metadatas") or []):
+            meta = meta or {}
+            found.setdefault(meta.get("doc_key", ""), []).append((id_, meta))
+    return found
+
+
+def _update_metadata(collection: Any, updates: list[tuple[list[tuple[str, dict]], dict]], batch_size: int) -> int:
+    """只更新已有分片的元数据（保留各分片的 chunk_index），返回更新的分片数。"""
+    ids: list[str] = []
+    metadatas: list[dict] = []
+    for chunks, metadata in updates:
+        for id_, old in chunks:
+            ids.append(id_)
+            metadatas.append(dict(metadata, chunk_index=old.get("chunk_index", 0)))
+    step = max(batch_size, 1)
+    for i in range(0, len(ids), step):
+        collection.update(ids=ids[i:i + step], metadatas=metadatas[i:i + step])
+    return len(ids)
+
+
+def _delete_ids(vector_store: Any, ids: list[str] | None) -> int:
+    if ids:
+        vector_store.delete(ids=list(ids))
+    return len(ids or [])
+
+
+def _delete_doc_keys(vector_store: Any, keys: list[str]) -> int:
+    deleted = 0
+    for i in range(0, len(keys), 200):
+        deleted += _delete_ids(
+            vector_store, vector_store.get(where={"doc_key": {"$in": keys[i:i + 200]}}, include=[]).get("ids")
+        )
+    return deleted
+
+
+def _near_duplicate_keys(records: list[dict]) -> tuple[set[str], list[str]]:
+    """
+    按近重复簇分配后返回 (非版面代表的帖子 doc_key, 不在本批中、因原代表变化而成为新代表的帖子 doc_key)；
+    未开启或失败时均为空。
+    """
+    if not get_near_dup_config().get("enabled"):
+        return set(), []
+    try:
+        reps = get_near_dup_index().assign(records)
+    except Exception as e:
+        logger.warning(f"[vector_upsert]近重复聚类失败，全部写入: {e}")
+        return set(), []
+    keys = {r["doc_key"] for r in records}
+    promoted = [key for key, rep in reps.items() if rep == key and key not in keys]
+    return {key for key, rep in reps.items() if rep != key}, promoted
+
+
+def _records_from_source_files(doc_keys: list[str]) -> dict[str, dict]:
+    """按元数据侧存储记录的 source_file 重新解析帖子文件，取回指定 doc_key 的记录。"""
+    wanted = set(doc_keys)
+    metas = get_post_meta_store().get(doc_keys, fields=["source_file"])
+    files = sorted({m["source_file"] for m in metas.values() if m.get("source_file")})
+    return {r["doc_key"]: r for r in iter_files_post_records(files) if r["doc_key"] in wanted}
+
+
+def _promoted_records(doc_keys: list[str]) -> list[dict]:
+    """
+    取回新成为版面代表的帖子记录（此前作为近重复未写入向量库）：
+    段存储开启时按 doc_key 随机读取，否则从帖子所在的版面-日期 JSON 重新解析。
+    """
+    try:
+        if get_segment_store_config().get("enabled"):
+            found = get_segment_store().get_many(doc_keys)
+        else:
+            found = _records_from_source_files(doc_keys)
+    except Exception as e:
+        logger.warning(f"[vector_upsert]读取新版面代表失败，{len(doc_keys)} 个帖子未写入: {e}")
+        return []
+    if len(found) < len(doc_keys):
+        logger.warning(f"[vector_upsert]{len(doc_keys) - len(found)} 个新版面代表未找到，未写入向量库")
+    return list(found.values())
+
+
+def _delete_legacy_chunks(vector_store: Any, paths: list[str]) -> int:
+    """删除这些文件在早期整目录导入时写入的分片（按 source 记录、没有 doc_key）。"""
+    sources = list(dict.fromkeys(s for p in paths for s in (p, normalize_source_path(p))))
+    got = vector_store.get(where={"source": {"$in": sources}}, include=["metadatas"])
+    legacy = [
+        id_ for id_, meta in zip(got.get("ids") or [], got.get("metadatas") or [])
+        if not (meta or {}).get("doc_key")
+    ]
+    return _delete_ids(vector_store, legacy)
+
+
+def _record_md5(paths: Iterable[str], md5_store: str) -> None:
+    """把文件 md5 追加到 md5 记录文件（已存在的不重复写）。"""
+    md5_path = md5_store if os.path.isabs(md5_store) else get_abs_path(md5_store)
+    with _md5_lock:
+        existing: set[str] = set()
+        if os.path.exists(md5_path):
+            with open(md5_path, "r", encoding="utf-8") as f:
+                existing = {line.strip() for line in f if line.strip()}
+        new = [m for m in (get_file_md5_hex(p) for p in paths) if m and m not in existing]
+        if not new:
+            return
+        os.makedirs(os.path.dirname(md5_path), exist_ok=True)
+        with open(md5_path, "a", encoding="utf-8") as f:
+            f.writelines(f"{m}\n" for m in dict.fromkeys(new))
+
+
+def _write_chunks(
+    vector_store: Any,
+    docs: list[Document],
+    ids: list[str],
+    batch_size: int,
+    shared_embedding: bool,
+) -> None:
+    """
+    写入分片：可用时先经共享合批器计算向量，再按 id upsert 到底层 collection；
+    否则交给 vector_store.add_documents 自行 embedding。
+    """
+    step = max(batch_size, 1)
+    collection = getattr(vector_store, "_collection", None)
+    embeddings = getattr(vector_store, "embeddings", None)
+    if shared_embedding and collection is not None and embeddings is not None:
+        embedder = get_shared_embedder(embeddings)
+        for i in range(0, len(docs), step):
+            batch = docs[i:i + step]
+            texts = [d.page_content for d in batch]
+            collection.upsert(
+                ids=ids[i:i + step],
+                embeddings=embedder.embed(texts),
+                metadatas=[d.metadata for d in batch],
+                documents=texts,
+            )
+        return
+    for i in range(0, len(docs), step):
+        vector_store.add_documents(docs[i:i + step], ids=ids[i:i + step])
+
+
+def _empty_result() -> dict:
+    return {
+        "ok": True, "posts": 0, "upserted": 0, "unchanged": 0, "metadata_updated": 0,
+        "near_duplicates": 0, "chunks": 0, "deleted": 0,
+    }
+
+
+def _upsert_records(
+    vector_store: Any,
+    records: list[dict],
+    cfg: dict,
+    batch_size: int,
+    shared_embedding: bool,
+    result: dict,
+    source_paths: list[str] | None = None,
+) -> None:
+    """
+    按稳定 id 写入一批帖子记录，统计累加到 result；异常向上抛出。
+    :param source_paths: 需要清理早期整目录导入分片的文件，None 时取内容变化帖子的 source_file
+    """
+    # 同一帖子出现多次时只保留最后一次，避免同批写入重复 id
+    records = list({r["doc_key"]: r for r in records}.values())
+    result["posts"] += len(records)
+    duplicates, promoted = _near_duplicate_keys(records)
+    if duplicates:
+        result["deleted"] += _delete_doc_keys(vector_store, sorted(duplicates))
+        result["near_duplicates"] += len(duplicates)
+        records = [r for r in records if r["doc_key"] not in duplicates]
+    if promoted:
+        records.extend(_promoted_records(promoted))
+    built = build_post_documents(records, cfg)
+    existing = _existing_chunks(vector_store, [record["doc_key"] for record, _, _ in built])
+    collection = getattr(vector_store, "_collection", None)
+
+    changed = []
+    meta_only: list[tuple[list[tuple[str, dict]], dict]] = []
+    for record, docs, ids in built:
+        chunks = existing.get(record["doc_key"]) or []
+        metadata = {k: v for k, v in docs[0].metadata.items() if k != "chunk_index"}
+        if chunks and {m.get("content_hash") for _, m in chunks} == {metadata["content_hash"]}:
+            result["unchanged"] += 1
+        elif chunks and collection is not None and {m.get("body_hash") for _, m in chunks} == {metadata["body_hash"]}:
+            meta_only.append((chunks, metadata))
+        else:
+            changed.append((record, docs, ids))
+
+    if meta_only:
+        _update_metadata(collection, meta_only, batch_size)
+        result["metadata_updated"] += len(meta_only)
+
+    if changed:
+        keys = list(dict.fromkeys(record["doc_key"] for record, _, _ in changed))
+        result["deleted"] += _delete_doc_keys(vector_store, keys)
+        if source_paths is None:
+            source_paths = list(dict.fromkeys(r["source_file"] for r, _, _ in changed if r.get("source_file")))
+        result["deleted"] += _delete_legacy_chunks(vector_store, source_paths)
+
+        docs = [d for _, ds, _ in changed for d in ds]
+        ids = [i for _, _, ids_ in changed for i in ids_]
+        _write_chunks(vector_store, docs, ids, batch_size, shared_embedding)
+        result["upserted"] += len(changed)
+        result["chunks"] += len(docs)
+
+
+def _dynamic_vector_store(vector_store: Any) -> Any:
+    if vector_store is not None:
+        return vector_store
+    from knowledge.retrieval.hybrid_retriever import get_dynamic_vector_store_instance
+
+    return get_dynamic_vector_store_instance()
+
+
+def upsert_post_files(
+    file_paths: list[str] | list[Path],
+    vector_store: Any = None,
+    batch_size: int = DEFAULT_UPSERT_BATCH_SIZE,
+    shared_embedding: bool = True,
+) -> dict:
+    """
+    只把给定的帖子文件增量写入动态向量库。
+    :param file_paths: 爬取返回的 saved_paths（清理后）
+    :param vector_store: 动态库 Chroma 实例，None 时取 knowledge.retrieval 的动态库单例
+    :param batch_size: 每批写入的分片数
+    :param shared_embedding: 是否经进程内共享合批器计算向量（多版面并发时跨版面合批）
+    :return: {"ok": bool, "posts": 帖子数, "upserted": 写入帖子数, "unchanged": 跳过帖子数,
+              "metadata_updated": 仅更新元数据的帖子数, "near_duplicates": 作为近重复未写入的帖子数,
+              "chunks": 写入分片数, "deleted": 删除旧分片数}
+    """
+    result = _empty_result()
+    paths = [str(p) for p in file_paths or []]
+    if not paths:
+        return result
+    cfg = _store_config()
+    try:
+        vector_store = _dynamic_vector_store(vector_store)
+        errors: set[str] = set()
+        for records in iter_post_record_batches(paths, errors=errors):
+            _upsert_records(vector_store, records, cfg, batch_size, shared_embedding, result, paths)
+        # 解析失败的文件只写入了部分帖子，不记 md5，下次全量导入时仍会重新处理
+        complete = [p for p in paths if normalize_source_path(p) not in errors]
+        _record_md5(complete, cfg.get("md5_hex_store") or "vector_db/dynamic/md5.txt")
+    except Exception as e:
+        logger.error(f"[vector_upsert]写入动态向量库失败: {e}")
+        result["ok"] = False
+    return result
+
+
+def upsert_segment_records(
+    boards: Iterable[tuple[str, str]] | None = None,
+    vector_store: Any = None,
+    batch_posts: int = DEFAULT_SEGMENT_BATCH_POSTS,
+    batch_size: int = DEFAULT_UPSERT_BATCH_SIZE,
+    shared_embedding: bool = True,
+) -> dict:
+    """
+    从段存储按段顺序读取帖子记录，每 batch_posts 条一批写入动态向量库（整库初始化/重建用），
+    不逐个打开版面-日期 JSON；已入库且内容未变的帖子跳过。段存储未启用时不写入（见 segment_store.enabled）。
+    :param boards: [(讨论区, 版面)]，None 时为段存储中的全部版面
+    :return: 与 upsert_post_files 相同的统计
+    """
+    result = _empty_result()
+    if not get_segment_store_config().get("enabled"):
+        logger.warning("[vector_upsert]段存储未启用，跳过从段存储写入；请改用 upsert_post_files")
+        return result
+    cfg = _store_config()
+    try:
+        vector_store = _dynamic_vector_store(vector_store)
+        batch: list[dict] = []
+        for record in get_segment_store().iter_records(boards):
+            batch.append(record)
+            if len(batch) >= batch_posts:
+                _upsert_records(vector_store, batch, cfg, batch_size, shared_embedding, result)
+                batch = []
+        if batch:
+            _upsert_records(vector_store, batch, cfg, batch_size, shared_embedding, result)
+    except Exception as e:
+        logger.error(f"[vector_upsert]从段存储写入动态向量库失败: {e}")
+        result["ok"] = False
+    return result
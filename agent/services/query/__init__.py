@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""
+查询服务：版面参数解析、按文件分组检索、游标分页、检索结果融合、时效加权等查询侧编排，供 agent/tools/query 调用。
+"""
+from .boards import parse_board
+from .fusion import reciprocal_rank_fusion
+from .grouped_search import (
+    grouped_similarity_search,
+    normalize_where,
+)
+from .pagination import (
+    PageState,
+    decode_cursor,
+    encode_cursor,
+)
+from .recency import (
+    in_date_range,
+    parse_date_bound,
+    recency_weight,
+)
+
+__all__ = [
+    "parse_board",
+    "reciprocal_rank_fusion",
+    "grouped_similarity_search",
+    "normalize_where",
+    "PageState",
+    "encode_cursor",
+    "decode_cursor",
+    "in_date_range",
+    "parse_date_bound",
+    "recency_weight",
+]
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+"""
+查询服务 - 版面参数：统一解析查询工具的版面入参（section + board 或 board_path），供帖子检索与元数据查询共用。
+"""
+
+
+def parse_board(section: str | None, board: str | None, board_path: str | None) -> tuple[str, str]:
+    """
+    解析版面：支持 (section, board) 或 board_path（如 "生活时尚/创意生活"）。
+    :return: (section, board)，缺省项为空串
+    """
+    if section is not None and board is not None:
+        return (section or "").strip(), (board or "").strip()
+    if board_path:
+        parts = [p.strip() for p in (board_path or "").replace("\\", "/").strip("/").split("/") if p.strip()]
+        if len(parts) >= 2:
+            return parts[0], parts[-1]
+        if len(parts) == 1:
+            return "", parts[0]
+    return "", ""
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""
+查询服务 - 排名融合：将向量检索与词法检索等多路排名结果用倒数排名融合（RRF）合并。
+"""
+from typing import Hashable, Sequence
+
+DEFAULT_RRF_K = 60
+
+
+def reciprocal_rank_fusion(
+    ranked_lists: Sequence[Sequence[Hashable]],
+    k: int = DEFAULT_RRF_K,
+    weights: Sequence[float] | None = None,
+) -> list[tuple[Hashable, float]]:
+    """
+    倒数排名融合：score(d) = Σ w_i / (k + rank_i(d))，rank 从 1 开始。
+    :param ranked_lists: 多路排名（每路为按相关度降序的 key 列表，重复 key 只取首次名次）
+    :param k: 平滑常数，越大越弱化头部名次差异
+    :param weights: 各路权重，默认均为 1
+    :return: [(key, 融合分数)]，分数降序
+    """
+    weights = list(weights) if weights is not None else [1.0] * len(ranked_lists)
+    scores: dict[Hashable, float] = {}
+    for ranking, weight in zip(ranked_lists, weights):
+        seen: set = set()
+        rank = 0
+        for key in ranking:
+            if key in seen:
+                continue
+            seen.add(key)
+            rank += 1
+            scores[key] = scores.get(key, 0.0) + weight / (k + rank)
+    return sorted(scores.items(), key=lambda x: x[1], reverse=True)
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+查询服务 - 按文件分组的 top-k 检索：直接返回 k 个不同文件（source_file）的最佳分片。
+
+查询向量只计算一次；每轮用 where 条件排除已命中的文件（$nin），只为「尚缺的文件数」取分片，
+直到凑满 k 个文件或库中已无更多候选，避免 k*2 过取后在 Python 里去重导致结果不足 k 个。
+with_documents=False 时直接查询底层 collection，只取回 id、元数据与距离，不传回分片文本（正文由 content_store 按需读取）。
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+from typing import Any, Callable, Iterable
+
+from langchain_core.documents import Document
+
+from utils.logger_handler import logger
+
+GROUP_FIELDS = ("source_file", "source")
+DEFAULT_CHUNKS_PER_GROUP = 2
+DEFAULT_MAX_ROUNDS = 6
+
+
+def normalize_where(filter_dict: dict | None) -> dict | None:
+    """Chroma 的 where 条件多字段时需用 $and 组合；单字段或已含操作符时原样返回。"""
+    if not filter_dict:
+        return None
+    if len(filter_dict) == 1 or any(key.startswith("$") for key in filter_dict):
+        return dict(filter_dict)
+    return {"$and": [{key: value} for key, value in filter_dict.items()]}
+
+
+def _and_where(base: dict | None, extra: dict | None) -> dict | None:
+    base, extra = normalize_where(base), normalize_where(extra)
+    if not base:
+        return extra
+    if not extra:
+        return base
+    clauses = base["$and"] if "$and" in base else [base]
+    return {"$and": [*clauses, extra]}
+
+
+def group_key_of(metadata: dict | None) -> tuple[str, str]:
+    """返回 (分组字段名, 分组值)，依次取 source_file、source。"""
+    meta = metadata or {}
+    for field in GROUP_FIELDS:
+        value = meta.get(field)
+        if value:
+            return field, str(value)
+    return "", ""
+
+
+def grouped_similarity_search(
+    vector_store: Any,
+    query: str,
+    k: int,
+    filter: dict | None = None,
+    offset: int = 0,
+    chunks_per_group: int = DEFAULT_CHUNKS_PER_GROUP,
+    max_rounds: int = DEFAULT_MAX_ROUNDS,
+    exclude: dict[str, Iterable[str]] | None = None,
+    embedding: list[float] | None = None,
+    with_documents: bool = True,
+) -> list[tuple[Any, float]]:
+    """
+    分组 top-k：返回按相关度排序的 [(该文件最佳分片 Document, 距离分数)]，文件互不重复。
+    :param vector_store: LangChain Chroma 实例
+    :param query: 查询文本
+    :param k: 需要的文件数
+    :param filter: 元数据过滤条件（如 {"section": ..., "board": ...}）
+    :param offset: 跳过前 offset 个文件（分页用）
+    :param chunks_per_group: 每缺一个文件预取的分片数
+    :param max_rounds: 最多查询轮数
+    :param exclude: 已返回过的文件 {分组字段: 值集合}，这些文件直接在存储层排除（游标分页用，见 pagination.PageState）
+    :param embedding: 已计算好的查询向量，流式翻页时复用以免重复调用 embedding
+    :param with_documents: 为 False 时返回的 Document 只有 metadata（page_content 为空，metadata 含 id）
+    """
+    need = offset + k
+    if need <= 0:
+        return []
+    try:
+        if embedding is None:
+            embedding = vector_store.embeddings.embed_query(query)
+        search_by_vector = (
+            vector_store.similarity_search_by_vector_with_relevance_scores
+            if with_documents else _metadata_search(vector_store)
+        )
+    except Exception as e:
+        logger.warning(f"[grouped_search]无法按向量检索，回退为文本检索: {e}")
+        return _grouped_by_text(vector_store, query, need, filter, chunks_per_group, max_rounds, exclude)[offset:]
+
+    groups: list[tuple[Any, float]] = []
+    seen: dict[str, set[str]] = {field: set(values) for field, values in (exclude or {}).items()}
+    for _ in range(max_rounds):
+        missing = need - len(groups)
+        fetch_k = missing * chunks_per_group
+        pairs = search_by_vector(embedding, k=fetch_k, filter=_exclude_where(filter, seen))
+        for doc, score in pairs:
+            field, value = group_key_of(doc.metadata)
+            if not value or value in seen.get(field, set()):
+                continue
+            seen.setdefault(field, set()).add(value)
+            groups.append((doc, score))
+        if len(groups) >= need or len(pairs) < fetch_k:
+            break
+    # 每轮只会取到比前几轮更不相关的分片，按轮次追加即为相关度顺序
+    return groups[offset:need]
+
+
+def _exclude_where(filter: dict | None, seen: dict[str, set[str]] | None) -> dict | None:
+    """在 filter 上追加「不在已见文件中」的 $nin 条件。"""
+    where = filter
+    for field, values in (seen or {}).items():
+        if values:
+            where = _and_where(where, {field: {"$nin": sorted(values)}})
+    return normalize_where(where)
+
+
+def _metadata_search(vector_store: Any) -> Callable[..., list[tuple[Document, float]]]:
+    """按向量查询底层 collection，只取回 id、元数据与距离；没有 collection 时退回带文本的检索。"""
+    collection = getattr(vector_store, "_collection", None)
+    if collection is None:
+        return vector_store.similarity_search_by_vector_with_relevance_scores
+
+    def search(embedding: list[float], k: int, filter: dict | None = None) -> list[tuple[Document, float]]:
+        got = collection.query(
+            query_embeddings=[embedding], n_results=k, where=filter, include=["metadatas", "distances"],
+        )
+        ids = (got.get("ids") or [[]])[0]
+        metadatas = (got.get("metadatas") or [[]])[0]
+        distances = (got.get("distances") or [[]])[0]
+        return [
+            (Document(page_content="", metadata=dict(meta or {}, id=id_)), float(dist))
+            for id_, meta, dist in zip(ids, metadatas, distances)
+        ]
+
+    return search
+
+
+def _grouped_by_text(
+    vector_store: Any,
+    query: str,
+    need: int,
+    filter: dict | None,
+    chunks_per_group: int,
+    max_rounds: int,
+    exclude: dict[str, Iterable[str]] | None = None,
+) -> list[tuple[Any, float]]:
+    """回退实现：逐轮加倍文本检索的取数，直到凑满 need 个文件；exclude 中的文件同样在存储层排除。"""
+    excluded = {field: set(values) for field, values in (exclude or {}).items()}
+    where = _exclude_where(filter, excluded)
+    fetch_k = need * chunks_per_group
+    groups: list[tuple[Any, float]] = []
+    for _ in range(max_rounds):
+        pairs = vector_store.similarity_search_with_score(query, k=fetch_k, filter=where)
+        groups, seen = [], set()
+        for doc, score in pairs:
+            field, value = group_key_of(doc.metadata)
+            if value and value not in seen and value not in excluded.get(field, set()):
+                seen.add(value)
+                groups.append((doc, score))
+        if len(groups) >= need or len(pairs) < fetch_k:
+            break
+        fetch_k *= 2
+    return groups[:need]
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+查询服务 - 游标分页：游标分页（query_user_data_page）与流式迭代（iter_user_data）共用同一种翻页状态 PageState。
+
+- 最近返回的文件（最多 max_exclude 个）在存储层用 $nin 排除，每页只取本页所需的 k 个文件；
+- 超出上限时最早返回的文件移出排除集、计入偏移量：它们比之后的结果都更相关，下一页按偏移量跳过即可，
+  排除条件与游标大小都有上限，不随翻页深度增长；
+- 游标是翻页状态的不透明编码，绑定 query（哈希校验），换 query 后旧游标失效。
+"""
+import base64
+import hashlib
+import json
+from collections import deque
+
+CURSOR_VERSION = 3
+DEFAULT_MAX_EXCLUDE = 50
+
+
+class PageState:
+    """翻页状态：偏移量 + 最近返回过的文件（分组字段, 值），成员判断用 set。"""
+
+    def __init__(self, offset: int = 0, returned=(), max_exclude: int = DEFAULT_MAX_EXCLUDE):
+        self.offset = int(offset)
+        self.max_exclude = max(int(max_exclude), 0)
+        self._returned: deque[tuple[str, str]] = deque()
+        self._members: dict[str, set[str]] = {}
+        for field, value in returned:
+            self.add(field, value)
+
+    def __contains__(self, item: tuple[str, str]) -> bool:
+        field, value = item
+        return value in self._members.get(field, ())
+
+    def add(self, field: str, value: str) -> None:
+        """记录一个已返回的文件；排除集超出上限时最早的文件移出并计入偏移量。"""
+        if (field, value) in self:
+            return
+        self._returned.append((field, value))
+        self._members.setdefault(field, set()).add(value)
+        while len(self._returned) > self.max_exclude:
+            old_field, old_value = self._returned.popleft()
+            self._members[old_field].discard(old_value)
+            self.offset += 1
+
+    @property
+    def exclude(self) -> dict[str, set[str]]:
+        """存储层排除条件 {分组字段: {值, ...}}。"""
+        return {field: set(values) for field, values in self._members.items() if values}
+
+    @property
+    def returned(self) -> list[tuple[str, str]]:
+        """排除集中的文件，按返回顺序。"""
+        return list(self._returned)
+
+
+def _query_digest(query: str) -> str:
+    return hashlib.sha1((query or "").encode("utf-8")).hexdigest()[:16]
+
+
+def encode_cursor(query: str, state: PageState) -> str:
+    """编码游标：翻页状态（偏移量 + 排除集）+ query 摘要。"""
+    payload = {
+        "v": CURSOR_VERSION,
+        "q": _query_digest(query),
+        "o": state.offset,
+        "x": [list(pair) for pair in state.returned],
+    }
+    raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str, query: str, max_exclude: int = DEFAULT_MAX_EXCLUDE) -> PageState:
+    """
+    解码游标为翻页状态。
+    :raises ValueError: 游标格式错误、版本不符或与 query 不匹配
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8"))
+    except Exception as e:
+        raise ValueError(f"无效游标: {e}") from e
+    if not isinstance(payload, dict) or payload.get("v") != CURSOR_VERSION:
+        raise ValueError("游标版本不符")
+    if payload.get("q") != _query_digest(query):
+        raise ValueError("游标与 query 不匹配")
+    offset = payload.get("o")
+    if not isinstance(offset, int) or offset < 0:
+        raise ValueError("无效游标: 偏移量错误")
+    returned = payload.get("x")
+    if not isinstance(returned, list) or not all(
+        isinstance(pair, list) and len(pair) == 2 and all(isinstance(v, str) for v in pair) for pair in returned
+    ):
+        raise ValueError("无效游标: 排除集错误")
+    return PageState(offset, [tuple(pair) for pair in returned], max_exclude=max_exclude)
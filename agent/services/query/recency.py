@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+查询服务 - 时效性：日期范围解析与按发布时间的指数衰减加权，供帖子检索做「最近帖子」排序与过滤。
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+import time
+
+from agent.services.indexing.post_records import parse_datetime
+
+SECONDS_PER_DAY = 86400.0
+
+
+def parse_date_bound(value: str | None, end: bool = False) -> float | None:
+    """
+    解析日期范围边界为时间戳。仅给出日期（如 2026-03-05）时，作为上界取当天 23:59:59。
+    :param value: 日期或日期时间字符串，None/空串表示不限
+    :param end: 是否为上界
+    """
+    if not (value or "").strip():
+        return None
+    ts = parse_datetime(value)
+    if ts is None:
+        return None
+    if end and len(value.strip()) <= 10:
+        ts += SECONDS_PER_DAY - 1
+    return ts
+
+
+def in_date_range(ts: float | None, ts_from: float | None, ts_to: float | None) -> bool:
+    """发布时间是否在范围内；未设置范围时恒为 True，设置了范围但帖子无时间时为 False。"""
+    if ts_from is None and ts_to is None:
+        return True
+    if ts is None:
+        return False
+    if ts_from is not None and ts < ts_from:
+        return False
+    if ts_to is not None and ts > ts_to:
+        return False
+    return True
+
+
+def recency_weight(ts: float | None, half_life_days: float, now: float | None = None) -> float:
+    """
+    指数衰减权重：每过 half_life_days 天权重减半。无发布时间的帖子按「恰好一个半衰期」计（0.5）。
+    """
+    if half_life_days <= 0:
+        return 1.0
+    if ts is None:
+        return 0.5
+    now = time.time() if now is None else now
+    age_days = max(now - ts, 0.0) / SECONDS_PER_DAY
+    return 0.5 ** (age_days / half_life_days)
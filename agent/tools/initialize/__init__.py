@@ -10,6 +10,7 @@ from .initialize import (
 from .forum_init import run_forum_init
 from .board_init import run_board_init
 from .tag_init import run_tag_init
+from .post_stores import import_post_stores, compact_post_stores
 
 __all__ = [
     "is_already_initialized",
@@ -18,4 +19,6 @@ __all__ = [
     "run_forum_init",
     "run_board_init",
     "run_tag_init",
+    "import_post_stores",
+    "compact_post_stores",
 ]
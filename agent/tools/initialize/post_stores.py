@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+帖子段文件维护工具：把已有的帖子 JSON 导入段存储（segment_store）与正文存储（content_store），或压缩段文件。
+只处理 config/vector_store/dynamic.json 中已启用的存储（segment_store 默认关闭）。
+
+用法：python agent/tools/initialize/post_stores.py [--import data/dynamic] [--compact [--force]]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+from utils.file_handler import list_allowed_files_recursive
+from utils.logger_handler import logger
+from utils.path_tool import get_abs_path
+
+from agent.services.indexing.content_store import get_content_store_config, get_post_content_store
+from agent.services.indexing.segment_store import get_segment_store, get_segment_store_config
+
+
+def _enabled_stores() -> dict:
+    stores = {}
+    for name, store_config, get_store in (
+        ("segments", get_segment_store_config, get_segment_store),
+        ("content", get_content_store_config, get_post_content_store),
+    ):
+        if store_config().get("enabled"):
+            stores[name] = get_store()
+        else:
+            logger.info(f"[post_stores]{name} 未启用，跳过")
+    return stores
+
+
+def import_post_stores(data_root: str = "data/dynamic") -> dict[str, int]:
+    """把 data_root 下已有的帖子 JSON 导入已启用的段存储，返回 {存储名: 导入记录数}。"""
+    root = data_root if os.path.isabs(data_root) else get_abs_path(data_root)
+    paths = sorted(list_allowed_files_recursive(root, (".json",)))
+    return {name: store.import_files(paths) for name, store in _enabled_stores().items()}
+
+
+def compact_post_stores(force: bool = False) -> dict[str, dict]:
+    """压缩已启用的段存储中达到阈值（force 时为全部）的版面，返回 {存储名: 压缩统计}。"""
+    return {name: store.compact_all(force=force) for name, store in _enabled_stores().items()}
+
+
+def main() -> None:
+    """命令行入口。"""
+    parser = argparse.ArgumentParser(description="帖子段文件存储维护")
+    parser.add_argument("--import", dest="import_root", default=None, help="把该目录下已有的帖子 JSON 导入段存储与正文存储")
+    parser.add_argument("--compact", action="store_true", help="压缩达到阈值的版面")
+    parser.add_argument("--force", action="store_true", help="与 --compact 一起使用：压缩全部版面")
+    args = parser.parse_args()
+    if args.import_root:
+        for name, count in import_post_stores(args.import_root).items():
+            print(f"{name}: 导入 {count} 条记录")
+    if args.compact:
+        for name, stats in compact_post_stores(force=args.force).items():
+            print(f"{name}: {stats}")
+
+
+if __name__ == "__main__":
+    main()
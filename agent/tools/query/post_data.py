@@ -4,6 +4,8 @@
 
 入参：query — 查询文本；版面（section + board 或 board_path）。
 回参：该版面下与 query 相关的帖子信息文件列表（source_file 等）。
+内容摘要按 doc_key 从正文存储（content_store）读取正文开头，向量检索只取回元数据与分数，不传回分片文本；
+正文存储中没有的帖子再按分片 id 从向量库取回最佳分片文本作为摘要。摘要只为折叠后最终返回的帖子读取。
 """
 import sys
 import os
@@ -11,27 +13,99 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(
     os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
 
-from knowledge.retrieval.hybrid_retriever import (
-    dynamic_similarity_search_with_score,
-    get_dynamic_vector_store_instance,
-)
+from knowledge.retrieval.hybrid_retriever import get_dynamic_vector_store_instance
 from utils.path_tool import get_abs_path
 
+from agent.services.indexing.content_store import get_content_store_config, post_previews
+from agent.services.indexing.lexical_index import lexical_search, recent_posts
+from agent.services.indexing.near_dup import collapse_near_duplicates
+from agent.services.indexing.post_meta_store import get_post_meta_store
+from agent.services.indexing.post_records import normalize_source_path, post_timestamp
+from agent.services.query.boards import parse_board
+from agent.services.query.fusion import reciprocal_rank_fusion
+from agent.services.query.grouped_search import grouped_similarity_search
+from agent.services.query.recency import in_date_range, parse_date_bound, recency_weight
 
-def _parse_board(section: str | None, board: str | None, board_path: str | None) -> tuple[str, str]:
+
+def _preview(text: str) -> str:
+    """内容摘要：前 200 字。"""
+    return (text[:200] + "…") if len(text) > 200 else text
+
+
+def _index_item(meta: dict, include_content_preview: bool) -> dict:
+    """由词法/日期索引中的文档元数据构造结果项。"""
+    item = {
+        "file": meta.get("source_file", ""),
+        "title": meta.get("title", ""),
+        "author": meta.get("author", ""),
+        "url": meta.get("url", ""),
+        "date": meta.get("date", ""),
+        "reply_count": meta.get("reply_count", 0),
+    }
+    if include_content_preview and meta.get("preview"):
+        item["content_preview"] = _preview(meta["preview"])
+    return item
+
+
+def _chunk_texts(vector_store, ids: list[str]) -> dict[str, str]:
+    """按分片 id 从向量库取回分片文本，失败时返回空 dict。"""
+    try:
+        got = vector_store.get(ids=ids, include=["documents"])
+    except Exception:
+        return {}
+    return {id_: text for id_, text in zip(got.get("ids") or [], got.get("documents") or []) if text}
+
+
+def _fill_previews(results: list[dict], doc_keys: dict[str, str], chunk_ids: dict[str, str], vector_store) -> None:
+    """
+    为最终结果填充 content_preview：优先取正文存储中的正文摘要；存储中没有且尚无摘要的帖子，
+    按分片 id 从向量库取回最佳分片文本。都取不到时保留原有摘要。
+    """
+    keys = [normalize_source_path(item.get("file", "")) for item in results]
+    previews = post_previews(doc_keys[key] for key in keys if key in doc_keys)
+    pending: dict[str, dict] = {}
+    for item, key in zip(results, keys):
+        doc_key = doc_keys.get(key)
+        if doc_key in previews:
+            item["content_preview"] = previews[doc_key]
+        elif not item.get("content_preview") and key in chunk_ids:
+            pending[chunk_ids[key]] = item
+    if pending and vector_store is not None:
+        for id_, text in _chunk_texts(vector_store, list(pending)).items():
+            pending[id_]["content_preview"] = _preview(text)
+
+
+def _order_by_field(
+    results: list[dict],
+    order_by: str,
+    doc_keys: dict[str, str],
+    timestamps: dict[str, float | None],
+) -> list[dict]:
     """
-    解析版面：支持 (section, board) 或 board_path（如 "生活时尚/创意生活"）。
-    :return: (section, board)
+    把与 query 相关的候选按 reply_count 或 ts 降序重排（同值保持相关度顺序）；
+    回复数与发布时间优先取元数据侧存储中的最新值。
     """
-    if section is not None and board is not None:
-        return (section or "").strip(), (board or "").strip()
-    if board_path:
-        parts = [p.strip() for p in (board_path or "").replace("\\", "/").strip("/").split("/") if p.strip()]
-        if len(parts) >= 2:
-            return parts[0], parts[-1]
-        if len(parts) == 1:
-            return "", parts[0]
-    return "", ""
+    keys = [normalize_source_path(item.get("file", "")) for item in results]
+    try:
+        known = get_post_meta_store().get(
+            [doc_keys[key] for key in keys if key in doc_keys], fields=("reply_count", "ts"),
+        )
+    except Exception:
+        known = {}
+
+    def value(pair: tuple[dict, str]) -> float:
+        item, key = pair
+        meta = known.get(doc_keys.get(key, ""), {})
+        if order_by == "reply_count":
+            return float(meta.get("reply_count") if meta.get("reply_count") is not None else item.get("reply_count") or 0)
+        ts = meta.get("ts") if meta.get("ts") is not None else timestamps.get(key)
+        return float(ts) if ts is not None else float("-inf")
+
+    for item, key in zip(results, keys):
+        meta = known.get(doc_keys.get(key, ""), {})
+        if meta.get("reply_count") is not None:
+            item["reply_count"] = meta["reply_count"]
+    return [item for item, _ in sorted(zip(results, keys), key=value, reverse=True)]
 
 
 def query_post_data(
@@ -41,6 +115,11 @@ def query_post_data(
     board_path: str | None = None,
     k: int = 20,
     include_content_preview: bool = False,
+    hybrid: bool = True,
+    date_from: str | None = None,
+    date_to: str | None = None,
+    recency_half_life_days: float | None = None,
+    order_by: str | None = None,
 ) -> list[dict]:
     """
     根据 query 与版面检索历史爬取的帖子，返回该版面下与 query 相关的帖子信息文件列表。
@@ -51,9 +130,43 @@ def query_post_data(
     :param board_path: 版面路径，如 "生活时尚/创意生活"（会解析为 section=生活时尚, board=创意生活）。
     :param k: 最多返回的帖子条数。
     :param include_content_preview: 是否在结果中包含内容摘要（前 200 字）。
-    :return: 列表，每项含 file（source_file）、title、author、url、date、content_preview（可选）等，按相关度排序，文件去重。
+    :param hybrid: 是否融合词法索引（BM25）结果；课程号、楼名、用户名等精确词更易命中。
+    :param date_from: 发布日期下限（如 "2026-03-01"），None 表示不限。
+    :param date_to: 发布日期上限（含当天），None 表示不限。
+    :param recency_half_life_days: 时效衰减半衰期（天）；设置后越新的帖子排名越靠前，并从版面日期索引补充最近帖子。
+    :param order_by: 为 "reply_count" 或 "ts" 时按该字段降序排序（结构化问题）：query 为空时直接从元数据侧存储返回版面内的帖子，
+        不做向量检索；否则在与 query 相关的候选中按该字段重排。
+    :return: 列表，每项含 file（存储中记录的 source_file 原值）、title、author、url、date、content_preview（可选）等，
+        按相关度排序，文件按规范化路径去重；
+        近重复帖子（引用、转载、轻度改写）折叠为排名最前的一条，duplicates 为同簇其他帖子的 url。
     """
-    sec, bd = _parse_board(section, board, board_path)
+    sec, bd = parse_board(section, board, board_path)
+    ts_from = parse_date_bound(date_from)
+    ts_to = parse_date_bound(date_to, end=True)
+    time_aware = ts_from is not None or ts_to is not None or bool(recency_half_life_days)
+    structured = order_by in ("reply_count", "ts")
+    if structured and not (query or "").strip():
+        rows = get_post_meta_store().query(
+            section=sec or None,
+            board=bd or None,
+            ts_from=ts_from,
+            ts_to=ts_to,
+            order_by=order_by,
+            limit=k,
+            fields=("title", "author", "url", "date", "reply_count", "source_file"),
+        )
+        return [
+            {
+                "file": r["source_file"] or "",
+                "title": r["title"],
+                "author": r["author"],
+                "url": r["url"],
+                "date": r["date"],
+                "reply_count": r["reply_count"],
+            }
+            for r in rows
+        ]
+
     vs = get_dynamic_vector_store_instance()
     filter_dict: dict = {}
     if sec or bd:
@@ -61,22 +174,32 @@ def query_post_data(
             filter_dict["section"] = sec
         if bd:
             filter_dict["board"] = bd
+    # 日期范围在向量结果上后过滤、按字段排序时在相关候选中重排，多取一些候选文件
+    fetch_k = k * 2 if time_aware or structured else k
+    # 摘要可从正文存储读取时，向量检索不取回分片文本
+    with_documents = include_content_preview and not get_content_store_config().get("enabled", True)
     try:
-        if filter_dict:
-            pairs = vs.similarity_search_with_score(query, k=k * 2, filter=filter_dict)
-        else:
-            pairs = vs.similarity_search_with_score(query, k=k * 2)
+        pairs = grouped_similarity_search(
+            vs, query, k=fetch_k, filter=filter_dict or None, with_documents=with_documents,
+        )
     except Exception:
         pairs = []
 
-    seen_files: set[str] = set()
-    result: list[dict] = []
+    # 向量路：存储层已按文件分组，每个文件只返回最相关的分片
+    items: dict[str, dict] = {}
+    timestamps: dict[str, float | None] = {}
+    doc_keys: dict[str, str] = {}
+    chunk_ids: dict[str, str] = {}
+    vector_rank: list[str] = []
     for doc, score in pairs:
         meta = doc.metadata or {}
         path = meta.get("source_file") or meta.get("source") or ""
-        if not path or path in seen_files:
+        key = normalize_source_path(path)
+        if not key or key in items:
+            continue
+        ts = post_timestamp(meta.get("date", ""), meta.get("time", ""))
+        if not in_date_range(ts, ts_from, ts_to):
             continue
-        seen_files.add(path)
         item: dict = {
             "file": path,
             "title": meta.get("title", ""),
@@ -87,11 +210,76 @@ def query_post_data(
             "score": float(score),
         }
         if include_content_preview and doc.page_content:
-            item["content_preview"] = (doc.page_content[:200] + "…") if len(doc.page_content) > 200 else doc.page_content
-        result.append(item)
-        if len(result) >= k:
-            break
+            item["content_preview"] = _preview(doc.page_content)
+        items[key] = item
+        timestamps[key] = ts
+        if meta.get("doc_key"):
+            doc_keys[key] = meta["doc_key"]
+        if meta.get("id"):
+            chunk_ids[key] = meta["id"]
+        vector_rank.append(key)
+
+    if not hybrid and not recency_half_life_days:
+        result = collapse_near_duplicates([items[key] for key in vector_rank])
+        if structured:
+            result = _order_by_field(result, order_by, doc_keys, timestamps)
+        result = result[:k]
+        if include_content_preview:
+            _fill_previews(result, doc_keys, chunk_ids, vs)
+        return result
 
+    rankings = [vector_rank]
+    if hybrid:
+        # 词法路：BM25 命中，不调用 embedding
+        lexical_rank: list[str] = []
+        lexical_seen: set[str] = set()
+        for meta, bm25 in lexical_search(
+            query, k=fetch_k, section=sec or None, board=bd or None, ts_from=ts_from, ts_to=ts_to
+        ):
+            key = normalize_source_path(meta.get("source_file", ""))
+            if not key or key in lexical_seen:
+                continue
+            lexical_seen.add(key)
+            items.setdefault(key, _index_item(meta, include_content_preview))["bm25"] = float(bm25)
+            timestamps.setdefault(key, meta.get("ts"))
+            if meta.get("doc_key"):
+                doc_keys.setdefault(key, meta["doc_key"])
+            lexical_rank.append(key)
+        rankings.append(lexical_rank)
+        if time_aware:
+            # 日期路：从版面日期索引补充时间范围内最新的帖子，无需爬取
+            recent_rank: list[str] = []
+            recent_seen: set[str] = set()
+            for meta in recent_posts(section=sec or None, board=bd or None, ts_from=ts_from, ts_to=ts_to, limit=fetch_k):
+                key = normalize_source_path(meta.get("source_file", ""))
+                if not key or key in recent_seen:
+                    continue
+                recent_seen.add(key)
+                items.setdefault(key, _index_item(meta, include_content_preview))
+                timestamps.setdefault(key, meta.get("ts"))
+                if meta.get("doc_key"):
+                    doc_keys.setdefault(key, meta["doc_key"])
+                recent_rank.append(key)
+            rankings.append(recent_rank)
+
+    fused = reciprocal_rank_fusion(rankings)
+    if recency_half_life_days:
+        fused = sorted(
+            ((key, score * recency_weight(timestamps.get(key), recency_half_life_days)) for key, score in fused),
+            key=lambda x: x[1],
+            reverse=True,
+        )
+    result: list[dict] = []
+    for key, score in fused:
+        item = dict(items[key])
+        item["fused_score"] = score
+        result.append(item)
+    result = collapse_near_duplicates(result)
+    if structured:
+        result = _order_by_field(result, order_by, doc_keys, timestamps)
+    result = result[:k]
+    if include_content_preview:
+        _fill_previews(result, doc_keys, chunk_ids, vs)
     return result
 
 
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+查询工具 - 帖子元数据：按版面、作者、日期、回复数从 SQLite 元数据侧存储做结构化查询，不做向量检索。
+
+入参：版面（section + board 或 board_path）、作者、日期范围、最少回复数、排序字段、返回字段。
+回参：帖子元数据列表（仅含所需字段），如「本周某版面回复最多的帖子」。
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+from agent.services.indexing.post_meta_store import get_post_meta_store
+from agent.services.query.boards import parse_board
+from agent.services.query.recency import parse_date_bound
+
+
+def query_post_meta(
+    query: str = "",
+    section: str | None = None,
+    board: str | None = None,
+    board_path: str | None = None,
+    author: str | None = None,
+    date_from: str | None = None,
+    date_to: str | None = None,
+    min_reply_count: int | None = None,
+    order_by: str = "ts",
+    k: int = 20,
+    fields: list[str] | None = None,
+) -> list[dict]:
+    """
+    结构化查询帖子元数据。
+
+    :param query: 保留参数（与其他查询工具签名一致），不参与过滤。
+    :param section: 讨论区名称。
+    :param board: 版面名称。
+    :param board_path: 版面路径，如 "生活时尚/创意生活"。
+    :param author: 作者。
+    :param date_from: 发布日期下限（如 "2026-03-01"）。
+    :param date_to: 发布日期上限（含当天）。
+    :param min_reply_count: 最少回复数。
+    :param order_by: 排序字段：ts（发布时间）或 reply_count（回复数），均为降序。
+    :param k: 返回条数。
+    :param fields: 返回字段，默认 title、author、url、date、reply_count、source_file。
+    :return: 帖子元数据 dict 列表。
+    """
+    sec, bd = parse_board(section, board, board_path)
+    return get_post_meta_store().query(
+        section=sec or None,
+        board=bd or None,
+        author=author or None,
+        ts_from=parse_date_bound(date_from),
+        ts_to=parse_date_bound(date_to, end=True),
+        min_reply_count=min_reply_count,
+        order_by=order_by,
+        limit=k,
+        fields=fields,
+    )
+
+
+if __name__ == "__main__":
+    # 调试：查询某版面回复最多的帖子
+    board_path = "生活时尚/悄悄话"
+    items = query_post_meta(board_path=board_path, order_by="reply_count", k=5)
+    print(f"[帖子元数据] {board_path} 回复最多的 {len(items)} 条:")
+    for i, x in enumerate(items, 1):
+        print(f"  [{i}] {x}")
@@ -4,47 +4,137 @@
 
 入参：query — 查询文本。
 回参：与 query 相关的用户数据文件列表（含路径及可选摘要）。
+
+大量上传文档时可用 query_user_data_page 按游标分页，或 iter_user_data 按需流式取后续页；
+两者共用 PageState 翻页状态：最近返回的文件在存储层排除，每页只取本页所需的分片（见 services/query/pagination）。
 """
 import sys
 import os
+from typing import Iterator
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(
     os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
 
-from knowledge.retrieval.memory_retriever import get_relevant_documents
+from knowledge.stores.usr_store import get_usr_vector_store_vector_store
+from utils.logger_handler import logger
 from utils.path_tool import get_abs_path
 
+from agent.services.query.grouped_search import group_key_of, grouped_similarity_search
+from agent.services.query.pagination import PageState, decode_cursor, encode_cursor
+
+PREVIEW_CHARS = 200
+
+
+def _to_item(doc, include_content_preview: bool) -> dict:
+    meta = doc.metadata or {}
+    item: dict = {"file": meta.get("source_file") or meta.get("source") or ""}
+    if include_content_preview and doc.page_content:
+        text = doc.page_content
+        item["content_preview"] = (text[:PREVIEW_CHARS] + "…") if len(text) > PREVIEW_CHARS else text
+    return item
+
 
 def query_user_data(query: str, k: int = 10, include_content_preview: bool = False) -> list[dict]:
     """
     根据 query 检索用户上传/记忆数据，返回对应的文件列表。
 
     :param query: 查询文本。
-    :param k: 最多返回的文档条数（每条可能来自同一文件的不同分片）。
+    :param k: 最多返回的文件数（存储层按文件分组，每个文件取最相关的分片）。
     :param include_content_preview: 是否在结果中包含内容摘要（前 200 字）。
     :return: 列表，每项为 {"file": 相对或绝对路径, "content_preview": 可选}，按相关度排序，文件去重。
     """
-    docs = get_relevant_documents(query)
-    if not docs:
+    try:
+        pairs = grouped_similarity_search(get_usr_vector_store_vector_store(), query, k=k)
+    except Exception:
+        pairs = []
+    if not pairs:
         return []
 
-    # 按 source / source_file 去重，保留首次出现顺序（即更相关的在前）
-    seen_files: set[str] = set()
-    result: list[dict] = []
-    for doc in docs[: k * 2]:  # 多取一些以便去重后仍有 k 个文件
-        meta = doc.metadata or {}
-        path = meta.get("source_file") or meta.get("source") or ""
-        if not path or path in seen_files:
+    # 存储层已按 source / source_file 分组，顺序即相关度顺序
+    return [_to_item(doc, include_content_preview) for doc, _score in pairs]
+
+
+def _fetch_page(
+    vector_store,
+    query: str,
+    k: int,
+    state: PageState,
+    embedding: list[float] | None = None,
+) -> list:
+    """按翻页状态取下一页 k 个文件的最佳分片，只返回此前未返回过的文件，并把它们记入 state。"""
+    pairs = grouped_similarity_search(
+        vector_store, query, k=k, offset=state.offset, exclude=state.exclude, embedding=embedding,
+    )
+    fresh = []
+    for doc, score in pairs:
+        field, value = group_key_of(doc.metadata)
+        if not value or (field, value) in state:
             continue
-        seen_files.add(path)
-        item: dict = {"file": path}
-        if include_content_preview and doc.page_content:
-            item["content_preview"] = (doc.page_content[:200] + "…") if len(doc.page_content) > 200 else doc.page_content
-        result.append(item)
-        if len(result) >= k:
-            break
+        state.add(field, value)
+        fresh.append((doc, score))
+    return fresh
+
+
+def query_user_data_page(
+    query: str,
+    k: int = 10,
+    cursor: str | None = None,
+    include_content_preview: bool = False,
+) -> dict:
+    """
+    按游标分页检索用户数据：每页返回 k 个此前未返回过的文件。
 
-    return result
+    :param query: 查询文本。
+    :param k: 本页文件数。
+    :param cursor: 上一页返回的 next_cursor；None 表示第一页。游标与 query 绑定。
+    :param include_content_preview: 是否在结果中包含内容摘要（前 200 字）。
+    :return: {"items": [...同 query_user_data...], "next_cursor": 下一页游标，无更多结果时为 None}
+    :raises ValueError: 游标无效或与 query 不匹配
+    """
+    state = decode_cursor(cursor, query) if cursor else PageState()
+    try:
+        pairs = _fetch_page(get_usr_vector_store_vector_store(), query, k, state)
+    except Exception as e:
+        logger.error(f"[query_user_data]分页检索失败: {e}")
+        pairs = []
+    items = [_to_item(doc, include_content_preview) for doc, _score in pairs]
+    next_cursor = encode_cursor(query, state) if len(items) >= k > 0 else None
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def iter_user_data(
+    query: str,
+    page_size: int = 10,
+    max_items: int | None = None,
+    include_content_preview: bool = False,
+) -> Iterator[dict]:
+    """
+    流式检索用户数据：按相关度逐个产出文件，调用方停止迭代时不再向存储层取后续页。
+    查询向量只计算一次，各页复用。
+
+    :param query: 查询文本。
+    :param page_size: 每次向存储层取的文件数。
+    :param max_items: 最多产出的文件数，None 表示直到没有更多结果。
+    :param include_content_preview: 是否在结果中包含内容摘要（前 200 字）。
+    """
+    if page_size <= 0:
+        return
+    vector_store = get_usr_vector_store_vector_store()
+    try:
+        embedding = vector_store.embeddings.embed_query(query)
+    except Exception:
+        embedding = None
+    state = PageState()
+    produced = 0
+    while max_items is None or produced < max_items:
+        want = page_size if max_items is None else min(page_size, max_items - produced)
+        pairs = _fetch_page(vector_store, query, want, state, embedding=embedding)
+        for doc, _score in pairs:
+            yield _to_item(doc, include_content_preview)
+        produced += len(pairs)
+        # 本页没有新文件（或不足一页）即已取尽，避免存储层未能排除已见文件时反复取同一页
+        if len(pairs) < want:
+            break
 
 
 def query_user_data_files(query: str, k: int = 10, absolute_path: bool = False) -> list[str]:
@@ -77,3 +167,8 @@ if __name__ == "__main__":
             print(f"     摘要: {x['content_preview'][:80]}...")
     files_only = query_user_data_files(query, k=5)
     print(f"  仅路径: {files_only}")
+    page = query_user_data_page(query, k=3)
+    print(f"  第 1 页: {[x['file'] for x in page['items']]}")
+    if page["next_cursor"]:
+        page = query_user_data_page(query, k=3, cursor=page["next_cursor"])
+        print(f"  第 2 页: {[x['file'] for x in page['items']]}")
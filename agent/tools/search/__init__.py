@@ -6,6 +6,8 @@
 from .crawler import (
     get_board_info,
     crawl_board_and_save,
+    crawl_board_incremental,
+    fetch_board_posts,
     run_crawl_board_and_save,
 )
 from .clean import (
@@ -18,10 +20,25 @@ from .search import (
     run_crawl_clean_and_vectorize,
     crawl_board_recent_posts,
 )
+from .ingest_jobs import (
+    enqueue_board_ingest,
+    run_board_ingest_job,
+    drain_jobs,
+    submit_board_ingest,
+    wait_board_ingest,
+    ingest_via_workers,
+    run_workers,
+)
+from .refresh import (
+    refresh_hot_boards,
+    run_refresh_loop,
+)
 
 __all__ = [
     "get_board_info",
     "crawl_board_and_save",
+    "crawl_board_incremental",
+    "fetch_board_posts",
     "run_crawl_board_and_save",
     "get_board_data_paths",
     "clean_board_posts",
@@ -29,4 +46,13 @@ __all__ = [
     "crawl_clean_and_vectorize",
     "run_crawl_clean_and_vectorize",
     "crawl_board_recent_posts",
+    "enqueue_board_ingest",
+    "run_board_ingest_job",
+    "drain_jobs",
+    "submit_board_ingest",
+    "wait_board_ingest",
+    "ingest_via_workers",
+    "run_workers",
+    "refresh_hot_boards",
+    "run_refresh_loop",
 ]
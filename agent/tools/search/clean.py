@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
 """
 搜索工具 - 数据清理封装：对指定版面（或 分类/版面）下的帖子 JSON 做 content 分块清理并写回。
-调用 knowledge.processing.clean，不实例化任何浏览器。
+不实例化任何浏览器。分块由 knowledge.processing.clean 完成；clean_engine.enabled 为 true（默认）时
+经清理引擎（agent/services/indexing/post_cleaner）按文件分批在进程池中并行执行，否则在调用线程逐个文件执行。
+正文（归一化后）已清理过的帖子直接复用清理结果，只有含未见过正文的文件才交给清理流程。
 """
 import sys
 import os
@@ -14,16 +16,46 @@ from pathlib import Path
 from knowledge.processing.clean import clean_board as _clean_board
 from knowledge.processing.clean import clean_json_files as _clean_json_files
 from knowledge.processing.clean import get_board_json_paths
+from utils.logger_handler import logger
 from utils.path_tool import get_abs_path
 
+from agent.services.indexing.content_dedup import get_content_hash_index
+from agent.services.indexing.indexer import index_post_files
+from agent.services.indexing.post_cleaner import get_clean_engine, get_clean_engine_config
+
+
+def _clean_files(file_paths: list[str] | list[Path]) -> int:
+    """分块清理并写回，返回成功处理的文件数；引擎关闭或出错时在调用线程执行 clean_json_files。"""
+    if get_clean_engine_config().get("enabled"):
+        try:
+            return get_clean_engine().clean_files(file_paths)["files"]
+        except Exception as e:
+            logger.warning(f"[clean]清理引擎失败，改用 clean_json_files: {e}")
+    return _clean_json_files(file_paths)
+
 
 def clean_post_files(file_paths: list[str] | list[Path]) -> int:
     """
-    仅对给定的帖子 JSON 文件做 content 分块清理并写回，不处理版面下其他旧文件。
+    仅对给定的帖子 JSON 文件做 content 分块清理并写回，不处理版面下其他旧文件；
+    正文哈希命中的帖子直接填回已清理的 content，只更新元数据；全部命中的文件不再调用清理。
+    写回后将这些帖子增量写入词法索引（BM25）与元数据侧存储（SQLite），供混合检索与结构化查询使用。
     :param file_paths: 本次新保存的 JSON 文件路径列表（str 或 Path）
     :return: 成功处理并写回的文件数量
     """
-    return _clean_json_files(file_paths)
+    try:
+        index = get_content_hash_index()
+        pending_paths, pending, reused_files = index.reuse_cleaned(file_paths)
+    except Exception as e:
+        logger.warning(f"[clean]正文哈希复用失败，全部重新清理: {e}")
+        index, pending_paths, pending, reused_files = None, list(file_paths), {}, 0
+    cleaned_count = _clean_files(pending_paths) if pending_paths else 0
+    if index is not None and pending:
+        try:
+            index.remember_cleaned(pending)
+        except Exception as e:
+            logger.warning(f"[clean]记录正文哈希失败: {e}")
+    index_post_files(file_paths)
+    return cleaned_count + reused_files
 
 
 def get_board_data_paths(
@@ -53,4 +85,6 @@ def clean_board_posts(
     """
     if data_root is None:
         data_root = get_abs_path("data/dynamic")
+    if get_clean_engine_config().get("enabled"):
+        return _clean_files(get_board_json_paths(Path(data_root), board))
     return _clean_board(board=board, data_root=data_root)
@@ -2,6 +2,13 @@
 """
 搜索工具 - 版面爬取封装：根据 forum/board/二级 board 调用 forum_updater 爬取并保存帖子 JSON。
 不实例化浏览器，仅提供函数，由调用方传入 browser。
+
+增量模式（config/crawler/crawler.json 的 incremental）：先只爬首页到暂存目录，按版面游标判断是否已追上
+上次爬取，未追上才按 max_pages 补爬；结果按内容指纹合并进输出目录，内容未变的文件不重写、不返回。
+
+抓取方式（crawler.json 的 fetch_mode）：browser（默认）只走浏览器；auto 先走 HTTP 抓取（复用浏览器登录 cookies），
+失败回退到浏览器爬取；http 只走 HTTP。增量模式下回复数未变的已知帖子不再抓详情页；HTTP 抓取经原始页面缓存
+做条件请求，未变的页面不解析、不落盘，首轮列表页全部未变即视为已追上。
 """
 import sys
 import os
@@ -10,15 +17,22 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(
     os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
 
 import asyncio
+import shutil
+import tempfile
 from typing import Any
 
-from knowledge.ingestion.forum_updater import (
-    load_forum_structure,
-    get_board_by_section_subsection_and_name,
-    update_board_posts,
-)
+from knowledge.ingestion.forum_updater import update_board_posts
+from utils.logger_handler import logger
 from utils.path_tool import get_abs_path
 
+from agent.services.crawler.board_cursor import get_board_cursor_store
+from agent.services.crawler.browser_pool import get_browser_pool
+from agent.services.crawler.http_fetcher import LoginRequiredError, crawl_board_http, get_http_fetcher
+from agent.services.crawler.incremental import get_crawler_config, is_caught_up, promote_staged_files
+from agent.services.crawler.structure_index import resolve_board
+from agent.services.indexing.post_meta_store import get_post_meta_store
+from agent.services.indexing.post_records import post_timestamp
+
 
 def get_board_info(
     forum: str,
@@ -28,18 +42,18 @@ def get_board_info(
 ) -> dict | None:
     """
     根据讨论区、版面及可选的二级目录名称，从结构文件中解析出版面信息。
+    结构文件只在首次使用或 mtime 变化时读取，版面查找走进程内索引。
     :param forum: 讨论区名称（如「北邮校园」「生活时尚」）
     :param board: 版面名称（如「北邮图书馆」「悄悄话」）
     :param sub_board: 二级目录名称（可选，如「院系校区」「社团组织」）
     :param structure_path: 论坛结构 JSON 路径，None 时使用默认 data/web_structure/forum_structure.json
     :return: 版面 dict（含 id, name, url 等），未找到返回 None
     """
-    structure = load_forum_structure(structure_path=structure_path)
-    return get_board_by_section_subsection_and_name(
-        structure,
-        section_name=forum,
-        board_name=board,
-        sub_section_name=sub_board,
+    return resolve_board(
+        forum=forum,
+        board=board,
+        sub_board=sub_board,
+        structure_path=structure_path,
     )
 
 
@@ -53,6 +67,7 @@ async def crawl_board_and_save(
     concurrency: int = 32,
     output_root: str | None = None,
     structure_path: str | None = None,
+    incremental: bool | None = None,
 ) -> list[str]:
     """
     爬取指定版面多页帖子并保存为 JSON。不创建浏览器，由调用方传入 browser。
@@ -65,7 +80,8 @@ async def crawl_board_and_save(
     :param concurrency: 并发线程数
     :param output_root: 输出根目录，None 时使用 data/dynamic
     :param structure_path: 论坛结构 JSON 路径，None 时使用默认
-    :return: 已保存的文件路径列表
+    :param incremental: 是否增量爬取，None 时取 crawler.json 的 incremental
+    :return: 已保存的文件路径列表（增量模式下仅含新写入或内容有变化的文件）
     """
     board_info = get_board_info(
         forum=forum,
@@ -79,7 +95,119 @@ async def crawl_board_and_save(
     if output_root is None:
         output_root = get_abs_path("data/dynamic")
 
-    return await update_board_posts(
+    config = get_crawler_config()
+    if incremental is None:
+        incremental = bool(config.get("incremental"))
+    if incremental:
+        return await crawl_board_incremental(
+            browser=browser,
+            base_url=base_url,
+            forum=forum,
+            board_info=board_info,
+            max_pages=max_pages,
+            concurrency=concurrency,
+            output_root=output_root,
+            config=config,
+        )
+
+    fetched = await fetch_board_posts(
+        browser=browser,
+        base_url=base_url,
+        forum=forum,
+        board_info=board_info,
+        output_root=output_root,
+        max_pages=max_pages,
+        concurrency=concurrency,
+        config=config,
+    )
+    return fetched["saved_paths"]
+
+
+async def _browser_cookies(browser: Any, force_login: bool = False) -> list[dict]:
+    """取调用方浏览器的登录 cookies；需要重新登录或取不到时交给浏览器池。"""
+    context = getattr(browser, "context", None)
+    if context is not None and not force_login:
+        try:
+            return list(await context.cookies())
+        except Exception as e:
+            logger.warning(f"[crawler]读取浏览器 cookies 失败，改用浏览器池: {e}")
+    return await asyncio.to_thread(get_browser_pool().export_cookies, force_login)
+
+
+def _unchanged_posts(rows: list[dict]) -> set[str]:
+    """列表行中回复数与元数据侧存储一致的已知帖子 url（详情页无需重抓）。"""
+    urls = [r["url"] for r in rows if r.get("url")]
+    try:
+        known = get_post_meta_store().get(urls, fields=["reply_count"])
+    except Exception as e:
+        logger.warning(f"[crawler]读取帖子元数据失败，全部抓取详情: {e}")
+        return set()
+    return {
+        r["url"] for r in rows
+        if r.get("url") in known and known[r["url"]].get("reply_count") == r.get("reply_count")
+    }
+
+
+async def fetch_board_posts(
+    browser: Any,
+    base_url: str,
+    forum: str,
+    board_info: dict,
+    output_root: str,
+    max_pages: int,
+    concurrency: int,
+    config: dict | None = None,
+    skip_unchanged: bool = False,
+    cache_scope: str | None = None,
+    defer_cache: bool = False,
+    start_page: int = 1,
+) -> dict:
+    """
+    按 fetch_mode 爬取一个版面并写入 output_root：browser（默认）只走浏览器；auto 时 HTTP 抓取优先，失败回退到浏览器爬取。
+    :param skip_unchanged: 是否跳过回复数未变的已知帖子的详情页（仅 HTTP 抓取生效）
+    :param cache_scope: 页面缓存作用域（最终输出目录），None 时取 output_root
+    :param defer_cache: 是否由调用方在落盘后提交页面缓存（见 crawl_board_http）
+    :param start_page: 从第几页开始抓（仅 HTTP 抓取生效，浏览器爬取总是从第 1 页抓到 max_pages）
+    :return: {"saved_paths": 已保存文件, "skipped": 未重新解析详情的列表行, "unchanged_pages": 未变的列表页数,
+              "cache_pending": 尚未提交的页面缓存项}
+    """
+    config = config or get_crawler_config()
+    mode = str(config.get("fetch_mode") or "browser").lower()
+    board_name = board_info.get("name", "")
+    if mode != "browser":
+        fetcher = get_http_fetcher(base_url, config.get("http"))
+        for attempt in range(2):
+            try:
+                if attempt or not fetcher.has_cookies:
+                    fetcher.load_cookies(await _browser_cookies(browser, force_login=attempt > 0))
+                result = await crawl_board_http(
+                    fetcher,
+                    section_name=forum,
+                    board_info=board_info,
+                    output_root=output_root,
+                    max_pages=max_pages,
+                    concurrency=concurrency,
+                    select_unchanged=_unchanged_posts if skip_unchanged else None,
+                    cache_scope=cache_scope,
+                    defer_cache=defer_cache,
+                    start_page=start_page,
+                )
+                logger.info(
+                    f"[crawler]HTTP 抓取 {forum}/{board_name} {result['pages']} 页：详情 {result['posts']}，"
+                    f"跳过未变 {len(result['skipped'])}，未变列表页 {result['unchanged_pages']}"
+                )
+                return result
+            except LoginRequiredError as e:
+                logger.warning(f"[crawler]HTTP 抓取 {forum}/{board_name} 需要登录（第 {attempt + 1} 次）: {e}")
+                if mode == "http" and attempt:
+                    raise
+            except Exception as e:
+                if mode == "http":
+                    raise
+                logger.warning(f"[crawler]HTTP 抓取 {forum}/{board_name} 失败，回退浏览器爬取: {e}")
+                break
+
+    saved = await update_board_posts(
         browser=browser,
         base_url=base_url,
         section_name=forum,
@@ -88,6 +216,84 @@ async def crawl_board_and_save(
         max_pages=max_pages,
         concurrency=concurrency,
     )
+    return {"saved_paths": saved, "skipped": [], "unchanged_pages": 0, "cache_pending": []}
+
+
+async def crawl_board_incremental(
+    browser: Any,
+    base_url: str,
+    forum: str,
+    board_info: dict,
+    max_pages: int,
+    concurrency: int,
+    output_root: str,
+    config: dict | None = None,
+) -> list[str]:
+    """
+    增量爬取单个版面：已爬过的版面先只爬 first_pass_pages 页，首页已出现近期已知帖子即停止；
+    否则从第 first_pass_pages + 1 页继续爬到 max_pages（首次爬取直接爬 1..max_pages）。
+    结果经暂存目录按内容指纹合并进 output_root。
+    :param board_info: get_board_info 返回的版面 dict
+    :return: 新写入或内容有变化的文件路径列表
+    """
+    config = config or get_crawler_config()
+    store = get_board_cursor_store()
+    board_name = board_info.get("name", "")
+    cursor = store.get_cursor(forum, board_name)
+    first_pages = min(max(int(config.get("first_pass_pages") or 1), 1), max_pages)
+    # 每轮 (起始页, 结束页)：第二轮从探测页之后继续，不重复抓取前 first_pages 页
+    page_ranges = [(1, first_pages)] if cursor else [(1, max_pages)]
+    if cursor and first_pages < max_pages:
+        page_ranges.append((first_pages + 1, max_pages))
+
+    staging_root = config.get("staging_root") or "data/staging"
+    staging_root = staging_root if os.path.isabs(staging_root) else get_abs_path(staging_root)
+    os.makedirs(staging_root, exist_ok=True)
+
+    saved: list[str] = []
+    newest_ts, newest_key, pages_done = None, "", 0
+    for i, (start, pages) in enumerate(page_ranges):
+        staging_dir = tempfile.mkdtemp(prefix="crawl_", dir=staging_root)
+        try:
+            fetched = await fetch_board_posts(
+                browser=browser,
+                base_url=base_url,
+                forum=forum,
+                board_info=board_info,
+                output_root=staging_dir,
+                max_pages=pages,
+                concurrency=concurrency,
+                config=config,
+                skip_unchanged=bool(cursor),
+                cache_scope=output_root,
+                defer_cache=True,
+                start_page=start,
+            )
+            promoted = promote_staged_files(fetched["saved_paths"], staging_dir, output_root, store)
+            # 合并进正式目录后再记录页面校验头，中途失败时下次仍会重新抓取这些页面
+            if fetched["cache_pending"]:
+                get_http_fetcher(base_url, config.get("http")).commit_pages(fetched["cache_pending"])
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+        # 未抓详情的已知帖子同样说明已追上上次爬取
+        promoted["known_posts"].extend(
+            (row["url"], post_timestamp(row.get("date", ""), row.get("time", ""))) for row in fetched["skipped"]
+        )
+        saved.extend(p for p in promoted["saved_paths"] if p not in saved)
+        pages_done = pages
+        if promoted["newest_ts"] is not None and (newest_ts is None or promoted["newest_ts"] > newest_ts):
+            newest_ts, newest_key = promoted["newest_ts"], promoted["newest_key"]
+        logger.info(
+            f"[crawler]增量爬取 {forum}/{board_name} 第 {start}-{pages} 页：帖子 {promoted['posts']}，"
+            f"新增 {promoted['new_posts']}，变化 {promoted['changed_posts']}，"
+            f"写入 {len(promoted['saved_paths'])}，未变 {len(promoted['skipped_paths'])}"
+        )
+        all_pages_unchanged = fetched["unchanged_pages"] >= pages - start + 1
+        if i == 0 and cursor and (all_pages_unchanged or is_caught_up(promoted, cursor, config)):
+            break
+
+    store.advance_cursor(forum, board_name, newest_ts, newest_key, pages_done)
+    return saved
 
 
 def run_crawl_board_and_save(
@@ -100,6 +306,7 @@ def run_crawl_board_and_save(
     concurrency: int = 32,
     output_root: str | None = None,
     structure_path: str | None = None,
+    incremental: bool | None = None,
 ) -> list[str]:
     """
     同步包装：在已有事件循环或新事件循环中执行 crawl_board_and_save。
@@ -112,6 +319,7 @@ def run_crawl_board_and_save(
     :param concurrency: 并发数
     :param output_root: 输出根目录
     :param structure_path: 论坛结构路径
+    :param incremental: 是否增量爬取，None 时取 crawler.json 配置
     :return: 已保存的文件路径列表
     """
     return asyncio.run(
@@ -125,5 +333,6 @@ def run_crawl_board_and_save(
             concurrency=concurrency,
             output_root=output_root,
             structure_path=structure_path,
+            incremental=incremental,
         )
     )
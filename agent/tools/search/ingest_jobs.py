@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+"""
+搜索工具 - 版面任务执行：从持久化任务队列认领「版面爬取 -> 清理 -> 向量化」任务并执行。
+
+每完成一个阶段写入检查点，worker 崩溃后任务在租约过期时由其他 worker 接手，已完成的阶段直接复用产出；
+多个进程可同时调用 drain_jobs 消费同一个队列（SQLite 事务保证同一任务只被一个 worker 持有）。
+爬取阶段从进程内浏览器池借用浏览器，清理与向量化在调用线程执行。
+
+worker 模式：python agent/tools/search/ingest_jobs.py --processes N 启动 N 个独立进程消费队列（默认降低优先级），
+浏览器、清理与 embedding 不再占用 Agent 进程的 CPU；Agent 侧经 ingest_via_workers（agent/services/crawler/board_jobs）入队并等待结果，
+无在线 worker 时（ingest_mode=auto）仍在本进程执行。参数见 config/crawler/crawler.json 的 workers。
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+import argparse
+import multiprocessing
+import threading
+import time
+from typing import Any
+
+from utils.config_handler import load_config
+from utils.env_handler import load_env
+from utils.logger_handler import logger
+from utils.path_tool import get_abs_path
+
+from agent.services.crawler.board_jobs import (
+    BOARD_INGEST_JOB,
+    BoardSpec,
+    enqueue_board_ingest,
+    get_worker_config,
+    ingest_via_workers,
+)
+from agent.services.crawler.job_queue import JobQueue, get_job_queue, make_worker_id
+from agent.tools.search.clean import clean_post_files
+from agent.tools.search.search import (
+    CRAWL_STARTED_STAGE,
+    crawl_with_browser_pool,
+    reconcile_saved_paths,
+    vectorize_saved_paths,
+)
+
+class _Heartbeat(threading.Thread):
+    """后台心跳：定期刷新 worker 登记并为当前任务续约，长时间的爬取/向量化阶段不会因租约过期被他人接手。"""
+
+    def __init__(self, queue: JobQueue, worker_id: str, interval: float):
+        super().__init__(daemon=True, name=f"ingest-heartbeat-{worker_id}")
+        self.queue = queue
+        self.worker_id = worker_id
+        self.interval = max(float(interval), 1.0)
+        self.job_id: int | None = None
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.beat()
+            except Exception as e:
+                logger.warning(f"[ingest_jobs]心跳失败: {e}")
+
+    def beat(self) -> None:
+        job_id = self.job_id
+        self.queue.touch_worker(self.worker_id, job_id)
+        if job_id is not None:
+            self.queue.heartbeat(job_id, self.worker_id)
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+
+def _base_url() -> str:
+    load_env()
+    return (load_config().get("BBS_Url") or "").strip().rstrip("/")
+
+
+def run_board_ingest_job(
+    job: dict,
+    queue: JobQueue,
+    worker_id: str,
+    concurrency: int = 16,
+    vector_store_workers: int = 4,
+) -> dict | None:
+    """
+    执行一个已认领的版面任务，跳过检查点中已完成的阶段。
+    :return: 任务结果 {"saved_paths", "cleaned_count", "ok"}；租约丢失时返回 None（任务已由他人接手）
+    """
+    payload = job["payload"]
+    stages: dict[str, Any] = job.get("stages") or {}
+    forum, board = payload["forum"], payload["board"]
+    output_root = payload.get("output_root") or get_abs_path("data/dynamic")
+    data_root = payload.get("data_root") or output_root
+
+    if "crawl" in stages:
+        saved_paths = stages["crawl"].get("saved_paths", [])
+    else:
+        base_url = _base_url()
+        if not base_url:
+            raise RuntimeError("未配置 BBS_Url")
+        started = stages.get(CRAWL_STARTED_STAGE)
+        if started is None and not queue.checkpoint(job["id"], worker_id, CRAWL_STARTED_STAGE, {"started_at": time.time()}):
+            return None
+        saved_paths = crawl_with_browser_pool(
+            base_url=base_url,
+            forum=forum,
+            board=board,
+            sub_board=payload.get("sub_board"),
+            max_pages=int(payload.get("max_pages") or 1),
+            concurrency=concurrency,
+            output_root=output_root,
+            structure_path=get_abs_path("data/web_structure/forum_structure.json"),
+            flow="worker",
+        )
+        if started is not None:
+            saved_paths = reconcile_saved_paths(saved_paths, output_root, forum, board, started.get("started_at"))
+        if not queue.checkpoint(job["id"], worker_id, "crawl", {"saved_paths": saved_paths}):
+            return None
+
+    if "clean" in stages:
+        cleaned_count = stages["clean"].get("cleaned_count", 0)
+    else:
+        cleaned_count = clean_post_files(saved_paths)
+        if not queue.checkpoint(job["id"], worker_id, "clean", {"cleaned_count": cleaned_count}):
+            return None
+
+    ok = vectorize_saved_paths(
+        saved_paths=saved_paths,
+        forum=forum,
+        board=board,
+        data_root=data_root,
+        vector_store_workers=vector_store_workers,
+    )
+    if not ok:
+        raise RuntimeError("向量化失败")
+    return {"saved_paths": saved_paths, "cleaned_count": cleaned_count, "ok": True}
+
+
+def drain_jobs(
+    queue: JobQueue | None = None,
+    worker_id: str | None = None,
+    max_jobs: int | None = None,
+    idle_timeout: float | None = 0.0,
+    poll_interval: float = 2.0,
+    concurrency: int = 16,
+    job_ids: list[int] | None = None,
+) -> dict:
+    """
+    循环认领并执行版面任务，直到队列空闲超过 idle_timeout 秒或已执行 max_jobs 个任务。
+    执行期间后台心跳刷新 worker 登记并为当前任务续约。
+    :param idle_timeout: 队列持续为空多少秒后退出，None 表示一直运行
+    :param job_ids: 只依次认领这些任务（已结束或被其他 worker 持有的跳过），全部尝试后退出
+    :return: {"worker_id", "succeeded", "failed", "lost"}
+    """
+    queue = queue or get_job_queue()
+    worker_id = worker_id or make_worker_id()
+    stats = {"worker_id": worker_id, "succeeded": 0, "failed": 0, "lost": 0}
+    heartbeat = _Heartbeat(queue, worker_id, get_worker_config()["heartbeat_seconds"])
+    heartbeat.beat()
+    heartbeat.start()
+    idle_since = time.monotonic()
+    remaining = list(dict.fromkeys(job_ids)) if job_ids is not None else None
+    try:
+        while max_jobs is None or stats["succeeded"] + stats["failed"] + stats["lost"] < max_jobs:
+            if remaining is not None:
+                job = None
+                while remaining and job is None:
+                    job = queue.claim_job(remaining.pop(0), worker_id)
+                if job is None:
+                    break
+            else:
+                job = queue.claim(worker_id, kinds=[BOARD_INGEST_JOB])
+            if job is None:
+                if idle_timeout is not None and time.monotonic() - idle_since >= idle_timeout:
+                    break
+                time.sleep(poll_interval)
+                continue
+            heartbeat.job_id = job["id"]
+            payload = job["payload"]
+            label = f"{payload.get('forum')}/{payload.get('board')}"
+            try:
+                result = run_board_ingest_job(job, queue, worker_id, concurrency=concurrency)
+            except Exception as e:
+                state = queue.fail(job["id"], worker_id, str(e))
+                logger.error(f"[ingest_jobs]任务 {job['id']} {label} 失败（第 {job['attempts']} 次，转为 {state}）: {e}")
+                stats["failed"] += 1
+            else:
+                if result is not None and queue.complete(job["id"], worker_id, result):
+                    logger.info(f"[ingest_jobs]任务 {job['id']} {label} 完成：保存 {len(result['saved_paths'])} 个文件")
+                    stats["succeeded"] += 1
+                else:
+                    logger.warning(f"[ingest_jobs]任务 {job['id']} {label} 租约已丢失，结果未提交")
+                    stats["lost"] += 1
+            finally:
+                heartbeat.job_id = None
+            idle_since = time.monotonic()
+    finally:
+        heartbeat.stop()
+        queue.remove_worker(worker_id)
+    return stats
+
+
+def submit_board_ingest(
+    board_specs: list[BoardSpec],
+    max_pages: int = 1,
+    priority: int = 0,
+    queue: JobQueue | None = None,
+) -> list[dict]:
+    """批量入队版面任务（按幂等键去重），返回各版面对应的任务 dict，顺序与 board_specs 一致。"""
+    queue = queue or get_job_queue()
+    return [
+        enqueue_board_ingest(
+            forum=spec["forum"],
+            board=spec["board"],
+            sub_board=spec.get("sub_board"),
+            max_pages=max_pages,
+            priority=priority,
+            queue=queue,
+        )
+        for spec in board_specs
+    ]
+
+
+def wait_board_ingest(
+    job_ids: list[int],
+    timeout: float | None = None,
+    queue: JobQueue | None = None,
+) -> dict[int, dict]:
+    """等待版面任务结束（成功或 dead），超时返回当前状态。"""
+    queue = queue or get_job_queue()
+    return queue.wait(job_ids, timeout=timeout, poll_interval=get_worker_config()["poll_interval_seconds"])
+
+
+def _worker_process(idle_timeout: float | None, max_jobs: int | None, nice: int) -> None:
+    if nice and hasattr(os, "nice"):
+        try:
+            os.nice(nice)
+        except OSError:
+            pass
+    stats = drain_jobs(
+        max_jobs=max_jobs,
+        idle_timeout=idle_timeout,
+        poll_interval=get_worker_config()["poll_interval_seconds"],
+    )
+    logger.info(f"[ingest_jobs]worker 退出: {stats}")
+
+
+def run_workers(
+    processes: int | None = None,
+    idle_timeout: float | None = None,
+    max_jobs: int | None = None,
+    nice: int | None = None,
+) -> None:
+    """启动 processes 个独立 worker 进程消费任务队列，阻塞到全部退出。"""
+    cfg = get_worker_config()
+    processes = max(int(processes or cfg["processes"]), 1)
+    nice = cfg["nice"] if nice is None else nice
+    ctx = multiprocessing.get_context("spawn")
+    workers = [
+        ctx.Process(target=_worker_process, args=(idle_timeout, max_jobs, nice), name=f"ingest-worker-{i}")
+        for i in range(processes)
+    ]
+    for w in workers:
+        w.start()
+    logger.info(f"[ingest_jobs]已启动 {processes} 个 worker，队列 {get_job_queue().db_path}")
+    try:
+        for w in workers:
+            w.join()
+    except KeyboardInterrupt:
+        for w in workers:
+            w.terminate()
+
+
+def main() -> None:
+    """worker 入口：python agent/tools/search/ingest_jobs.py --processes 4"""
+    parser = argparse.ArgumentParser(description="版面爬取/清理/向量化 worker")
+    parser.add_argument("--processes", type=int, default=None, help="worker 进程数，默认取 crawler.json 的 workers.processes")
+    parser.add_argument("--idle-timeout", type=float, default=None, help="队列空闲多少秒后退出，默认一直运行")
+    parser.add_argument("--max-jobs", type=int, default=None, help="每个进程最多执行的任务数")
+    parser.add_argument("--nice", type=int, default=None, help="worker 进程的 nice 增量，默认取配置")
+    args = parser.parse_args()
+    run_workers(processes=args.processes, idle_timeout=args.idle_timeout, max_jobs=args.max_jobs, nice=args.nice)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+搜索工具 - 热门版面后台刷新：按 Agent 记录的版面需求 × 陈旧度，在爬取预算内把最热门的版面提前入队刷新，
+常见问题在请求内很少需要再临时爬取。
+
+刷新任务以低优先级（refresh.priority）进入持久化任务队列，由 ingest worker 执行，Agent 请求内的任务优先；
+无在线 worker 时本进程只执行本轮入队的任务。与请求内爬取使用相同幂等键，排队或执行中的同一版面不会重复爬取；
+是否该刷新由 plan_refresh 的 min_refresh_interval_seconds 决定，入队时不再受 dedupe_window_seconds 限制。
+每轮结束后压缩垃圾占比超过阈值的帖子段文件（segment_store）与正文存储（content_store）。
+refresh.enabled 默认 false：需显式开启，关闭时循环只做段文件压缩，Agent 也不记录版面需求。
+用法：python agent/tools/search/refresh.py [--once] [--interval 秒]
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+import argparse
+import time
+
+from utils.logger_handler import logger
+
+from agent.services.crawler.board_demand import get_board_demand_store, get_refresh_config, plan_refresh
+from agent.services.crawler.board_jobs import enqueue_board_ingest, get_worker_config
+from agent.services.crawler.job_queue import JobQueue, get_job_queue
+from agent.services.indexing.content_store import get_content_store_config, get_post_content_store
+from agent.services.indexing.segment_store import get_segment_store, get_segment_store_config
+from agent.tools.search.ingest_jobs import drain_jobs
+
+
+def refresh_hot_boards(queue: JobQueue | None = None, config: dict | None = None) -> dict:
+    """
+    执行一轮刷新规划：挑选「需求 × 陈旧度」最高的版面并入队。
+    :return: {"planned": [{"board_path", "score", "job_id", "state"}], "inline": 本进程执行的统计或 None}
+    """
+    cfg = config or get_refresh_config()
+    queue = queue or get_job_queue()
+    planned = []
+    for cand in plan_refresh(get_board_demand_store(), config=cfg):
+        spec = cand["spec"]
+        job = enqueue_board_ingest(
+            forum=spec["forum"],
+            board=spec["board"],
+            sub_board=spec["sub_board"],
+            max_pages=cand["max_pages"],
+            priority=int(cfg["priority"]),
+            queue=queue,
+            dedupe=False,
+        )
+        planned.append({
+            "board_path": cand["board_path"],
+            "score": round(cand["score"], 3),
+            "job_id": job["id"],
+            "state": job["state"],
+        })
+    inline = None
+    if planned and not queue.active_workers(get_worker_config()["worker_stale_seconds"]):
+        inline = drain_jobs(queue=queue, job_ids=[p["job_id"] for p in planned], idle_timeout=0.0)
+    if planned:
+        logger.info(f"[refresh]本轮刷新 {len(planned)} 个版面: {[p['board_path'] for p in planned]}")
+    return {"planned": planned, "inline": inline}
+
+
+def run_refresh_loop(interval_seconds: float | None = None, once: bool = False) -> None:
+    """按 refresh.interval_seconds 周期刷新热门版面，直到进程退出。"""
+    while True:
+        cfg = get_refresh_config()
+        if cfg.get("enabled"):
+            try:
+                refresh_hot_boards(config=cfg)
+                get_board_demand_store().prune()
+            except Exception as e:
+                logger.error(f"[refresh]刷新失败: {e}")
+        for store_config, get_store in (
+            (get_segment_store_config, get_segment_store),
+            (get_content_store_config, get_post_content_store),
+        ):
+            if store_config().get("enabled"):
+                try:
+                    get_store().compact_all()
+                except Exception as e:
+                    logger.error(f"[refresh]段文件压缩失败: {e}")
+        if once:
+            return
+        time.sleep(float(interval_seconds or cfg["interval_seconds"]))
+
+
+def main() -> None:
+    """后台刷新入口：python agent/tools/search/refresh.py"""
+    parser = argparse.ArgumentParser(description="热门版面后台刷新")
+    parser.add_argument("--once", action="store_true", help="只执行一轮")
+    parser.add_argument("--interval", type=float, default=None, help="刷新间隔秒数，默认取 crawler.json 的 refresh.interval_seconds")
+    args = parser.parse_args()
+    run_refresh_loop(interval_seconds=args.interval, once=args.once)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,9 @@
 """
 搜索工具 - 主流程：爬取版面 -> 数据清理 -> 向量化存储。
 支持单版面与异步批量多版面爬取。在 main 中实例化浏览器并调用本流程进行测试，入参全部具体写出。
+所有版面爬取都经过全局爬取调度器（agent/services/crawler/scheduler），共享页面并发上限与按主机的限速。
+批量流程中每个版面对应持久化任务队列（agent/services/crawler/job_queue）中的一个任务，进程中断后重跑同一批次会跳过
+已完成的阶段；爬取开始前记录 crawl_started 检查点，中断后重爬时补回上次已合并进正式目录、但未记入检查点的文件。
 """
 import sys
 import os
@@ -10,22 +13,83 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(
     os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
 
 import asyncio
+import time
 
-from typing import Any, TypedDict
+from typing import Any
 
 from knowledge.ingestion.utils_tools import sanitize_dir
 from knowledge.stores.dynamic_store import init_dynamic_store
+from utils.logger_handler import logger
 from utils.path_tool import get_abs_path
 
+from agent.services.crawler.board_demand import board_spec_from_path
+from agent.services.crawler.board_jobs import BOARD_INGEST_JOB, BoardSpec, board_ingest_payload, ingest_via_workers
+from agent.services.crawler.browser_pool import get_browser_pool
+from agent.services.crawler.job_queue import STATE_SUCCEEDED, get_job_queue, make_worker_id
+from agent.services.indexing.vector_upsert import upsert_post_files
+from agent.services.crawler.scheduler import get_crawl_scheduler, get_crawler_scheduler_config, host_of
+from agent.services.crawler.streaming import Stage, get_pipeline_config, run_stages
 from agent.tools.search.crawler import crawl_board_and_save
 from agent.tools.search.clean import clean_post_files
 
+CRAWL_STARTED_STAGE = "crawl_started"
 
-class BoardSpec(TypedDict):
-    """单个版面配置：讨论区、版面名、可选二级目录。"""
-    forum: str
-    board: str
-    sub_board: str | None
+
+def reconcile_saved_paths(
+    saved_paths: list[str],
+    output_root: str,
+    forum: str,
+    board: str,
+    since: float | None,
+) -> list[str]:
+    """
+    补回中断前已合并进正式目录、但未记入 crawl 检查点的文件：版面目录下 since 之后写入的 JSON。
+    增量爬取已记录这些文件的指纹，重爬时它们不会再出现在 saved_paths 中，不补回就不会被清理与向量化。
+    :param since: 上次爬取开始时间（crawl_started 检查点），None 时原样返回
+    """
+    if since is None:
+        return list(saved_paths)
+    merged = list(saved_paths)
+    seen = set(merged)
+    folder = os.path.join(output_root, sanitize_dir(forum), sanitize_dir(board))
+    if os.path.isdir(folder):
+        for name in sorted(os.listdir(folder)):
+            path = os.path.join(folder, name)
+            if name.endswith(".json") and path not in seen and os.path.getmtime(path) >= since:
+                merged.append(path)
+                seen.add(path)
+    if len(merged) > len(saved_paths):
+        logger.info(f"[search]{forum}/{board} 补回上次中断前已写入的 {len(merged) - len(saved_paths)} 个文件")
+    return merged
+
+
+async def _scheduled_crawl(
+    browser: Any,
+    base_url: str,
+    forum: str,
+    board: str,
+    sub_board: str | None,
+    max_pages: int,
+    concurrency: int,
+    output_root: str | None,
+    structure_path: str | None,
+    flow: str,
+) -> list[str]:
+    """在全局调度器中排队占用页面槽位后爬取单个版面；版面内并发为实际分配到的槽位数。"""
+    board_concurrency = int(get_crawler_scheduler_config()["board_concurrency"])
+    slots = min(max(concurrency, 1), max(board_concurrency, 1))
+    async with get_crawl_scheduler().slot(host_of(base_url), flow=flow, slots=slots) as granted:
+        return await crawl_board_and_save(
+            browser=browser,
+            base_url=base_url,
+            forum=forum,
+            board=board,
+            sub_board=sub_board,
+            max_pages=max_pages,
+            concurrency=granted,
+            output_root=output_root,
+            structure_path=structure_path,
+        )
 
 
 async def crawl_boards_batch(
@@ -36,22 +100,25 @@ async def crawl_boards_batch(
     concurrency: int = 32,
     output_root: str | None = None,
     structure_path: str | None = None,
+    flow: str = "batch",
 ) -> list[str]:
     """
-    异步批量爬取多个版面，并发执行多个 crawl_board_and_save，合并返回所有已保存文件路径。
+    异步批量爬取多个版面，合并返回所有已保存文件路径。
+    各版面经全局调度器排队：页面并发之和受 max_concurrent_pages 限制，同时在途的版面任务受 max_pending_jobs 限制。
     :param browser: GlobalBrowser 实例
     :param base_url: BBS 根 URL
     :param board_specs: 版面配置列表，每项含 forum、board、可选 sub_board
     :param max_pages: 每个版面爬取页数
-    :param concurrency: 每个版面内部并发数
+    :param concurrency: 每个版面内部并发数上限（另受 scheduler.board_concurrency 限制）
     :param output_root: 爬取输出根目录
     :param structure_path: 论坛结构 JSON 路径
+    :param flow: 调度公平队列的分组名（同一请求方的版面共用一个 flow）
     :return: 所有版面已保存的文件路径列表（合并）
     """
     if not board_specs:
         return []
-    tasks = [
-        crawl_board_and_save(
+    factories = [
+        lambda spec=spec: _scheduled_crawl(
             browser=browser,
             base_url=base_url,
             forum=spec["forum"],
@@ -61,10 +128,11 @@ async def crawl_boards_batch(
             concurrency=concurrency,
             output_root=output_root,
             structure_path=structure_path,
+            flow=flow,
         )
         for spec in board_specs
     ]
-    results = await asyncio.gather(*tasks)
+    results = await get_crawl_scheduler().run_bounded(factories)
     saved_paths: list[str] = []
     for paths in results:
         saved_paths.extend(paths)
@@ -85,7 +153,7 @@ async def crawl_clean_and_vectorize(
     vector_store_workers: int = 4,
 ) -> dict:
     """
-    爬取指定版面 -> 清理帖子 JSON -> 将对应目录向量化写入动态库。
+    爬取指定版面 -> 清理帖子 JSON -> 将本次保存的帖子增量写入动态库。
     不创建浏览器，由调用方传入 browser。
     :param browser: GlobalBrowser 实例
     :param base_url: BBS 根 URL
@@ -97,7 +165,7 @@ async def crawl_clean_and_vectorize(
     :param output_root: 爬取输出根目录，None 时使用 data/dynamic
     :param structure_path: 论坛结构 JSON 路径
     :param data_root: 清理与向量化使用的数据根目录，None 时与 output_root 一致
-    :param vector_store_workers: 向量化加载线程数
+    :param vector_store_workers: 增量 upsert 失败回退为整目录导入时的加载线程数
     :return: {"saved_paths": list[str], "cleaned_count": int, "vector_store_ok": bool}
     """
     if output_root is None:
@@ -105,7 +173,7 @@ async def crawl_clean_and_vectorize(
     if data_root is None:
         data_root = output_root
 
-    saved_paths = await crawl_board_and_save(
+    saved_paths = await _scheduled_crawl(
         browser=browser,
         base_url=base_url,
         forum=forum,
@@ -115,17 +183,63 @@ async def crawl_clean_and_vectorize(
         concurrency=concurrency,
         output_root=output_root,
         structure_path=structure_path,
+        flow="single",
     )
 
-    # 仅清理本次新保存的文件，不处理版面下已有旧文件
-    cleaned_count = clean_post_files(saved_paths)
+    # 清理与向量化在线程中执行，不阻塞事件循环上的其他爬取
+    return await asyncio.to_thread(
+        clean_and_vectorize,
+        saved_paths=saved_paths,
+        forum=forum,
+        board=board,
+        data_root=data_root,
+        vector_store_workers=vector_store_workers,
+    )
 
+
+def vectorize_saved_paths(
+    saved_paths: list[str],
+    forum: str,
+    board: str,
+    data_root: str,
+    vector_store_workers: int = 4,
+) -> bool:
+    """
+    按稳定 id 增量 upsert 本次保存的帖子文件，向量化成本只与新内容相关；
+    upsert 失败时回退为整版面目录导入（按 md5 跳过已导入文件）。
+    """
+    if not saved_paths:
+        return True
+    if upsert_post_files(saved_paths)["ok"]:
+        return True
     folder_for_vector = os.path.join(data_root, sanitize_dir(forum), sanitize_dir(board))
-    vector_store_ok = init_dynamic_store(
+    return init_dynamic_store(
         folder_path=folder_for_vector,
         max_workers=vector_store_workers,
     )
 
+
+def clean_and_vectorize(
+    saved_paths: list[str],
+    forum: str,
+    board: str,
+    data_root: str,
+    vector_store_workers: int = 4,
+) -> dict:
+    """
+    清理本次保存的帖子文件并只把这些文件增量写入动态库（爬取之后的同步阶段）。
+    :return: {"saved_paths": list[str], "cleaned_count": int, "vector_store_ok": bool}
+    """
+    # 仅清理本次新保存的文件，不处理版面下已有旧文件
+    cleaned_count = clean_post_files(saved_paths)
+    vector_store_ok = vectorize_saved_paths(
+        saved_paths=saved_paths,
+        forum=forum,
+        board=board,
+        data_root=data_root,
+        vector_store_workers=vector_store_workers,
+    )
+
     return {
         "saved_paths": saved_paths,
         "cleaned_count": cleaned_count,
@@ -143,9 +257,14 @@ async def crawl_clean_and_vectorize_batch(
     structure_path: str | None = None,
     data_root: str | None = None,
     vector_store_workers: int = 4,
+    resume: bool = True,
+    reuse_recent: bool = False,
 ) -> dict:
     """
-    异步批量：多版面爬取 -> 合并清理 -> 各版面目录分别向量化。
+    异步批量：多版面爬取 -> 清理 -> 向量化，三个阶段流式衔接。
+    某个版面爬完即进入清理、清理完即进入向量化，不等其他版面；阶段间为有界队列，
+    各阶段 worker 数取 crawler.json 的 pipeline（爬取阶段另受全局调度器限制）；
+    多个版面并发向量化，embedding 请求跨版面合批并共享 dynamic.json 中的 embedding 并发预算。
     :param browser: GlobalBrowser 实例
     :param base_url: BBS 根 URL
     :param board_specs: 版面配置列表
@@ -154,47 +273,188 @@ async def crawl_clean_and_vectorize_batch(
     :param output_root: 爬取输出根目录
     :param structure_path: 论坛结构 JSON 路径
     :param data_root: 清理与向量化数据根目录
-    :param vector_store_workers: 各版面向量化加载线程数
-    :return: {"saved_paths": list[str], "cleaned_count": int, "vector_store_results": list[dict]}
-             vector_store_results 每项为 {"forum": str, "board": str, "ok": bool}
+    :param vector_store_workers: 增量 upsert 失败回退为整目录导入时的加载线程数
+    :param resume: 是否经持久化任务队列执行：每个版面按幂等键入队，爬取阶段取到该版面时才认领任务，
+                   中断过的版面跳过已完成阶段，正被其他 worker 处理的版面本次跳过；各阶段开始时续约
+    :param reuse_recent: 是否直接复用 dedupe 窗口内已成功的版面结果（默认重新爬取）
+    :return: {"saved_paths": list[str], "cleaned_count": int, "vector_store_results": list[dict],
+              "failed": list[dict], "stage_stats": dict}
+             vector_store_results 每项为 {"forum": str, "board": str, "ok": bool}，与 board_specs 顺序一致，
+             失败的版面另含 "stage" 与 "error"；failed 为这些失败版面的 {"forum", "board", "stage", "error"}
     """
     if output_root is None:
         output_root = get_abs_path("data/dynamic")
     if data_root is None:
         data_root = output_root
-
-    saved_paths = await crawl_boards_batch(
-        browser=browser,
-        base_url=base_url,
-        board_specs=board_specs,
-        max_pages=max_pages,
-        concurrency=concurrency,
-        output_root=output_root,
-        structure_path=structure_path,
+    if not board_specs:
+        return {"saved_paths": [], "cleaned_count": 0, "vector_store_results": [], "failed": [], "stage_stats": {}}
+
+    cfg = get_pipeline_config()
+    scheduler_cfg = get_crawler_scheduler_config()
+    queue = get_job_queue() if resume else None
+    worker_id = make_worker_id()
+
+    # 先入队；任务在爬取阶段取到该版面时才认领，排队等待期间不占用租约
+    finished: list[dict] = []
+    items: list[dict] = []
+    for index, spec in enumerate(board_specs):
+        job = None
+        if queue is not None:
+            job = queue.enqueue(
+                BOARD_INGEST_JOB, board_ingest_payload(spec, max_pages, output_root, data_root), dedupe=reuse_recent,
+            )
+            if job["state"] == STATE_SUCCEEDED:
+                finished.append({**(job["result"] or {}), "index": index, "spec": spec})
+                continue
+        items.append({"index": index, "spec": spec, "job": job})
+
+    def _done(item: dict, stage: str) -> Any:
+        job = item.get("job")
+        return (job or {}).get("stages", {}).get(stage)
+
+    def _claim(item: dict) -> dict:
+        """认领版面任务；被其他 worker 持有时标记为跳过，期间已由他人完成时直接复用其结果。"""
+        job = item.get("job")
+        if not job:
+            return item
+        claimed = queue.claim_job(job["id"], worker_id)
+        if claimed is not None:
+            return {**item, "job": claimed}
+        current = queue.get(job["id"]) or job
+        if current["state"] == STATE_SUCCEEDED:
+            return {**item, **(current["result"] or {}), "job": None, "skipped": True}
+        logger.info(f"[search]{item['spec']['forum']}/{item['spec']['board']} 正由其他 worker 处理，本次跳过")
+        return {**item, "job": None, "skipped": True, "saved_paths": [], "ok": False}
+
+    def _renew(item: dict) -> bool:
+        """阶段开始前续约（版面可能在阶段间队列中等待较久）；租约已被他人接手时返回 False。"""
+        job = item.get("job")
+        if job and not queue.heartbeat(job["id"], worker_id):
+            logger.warning(f"[search]任务 {job['id']} 租约已丢失，交由当前持有者继续处理")
+            return False
+        return True
+
+    def _checkpoint(item: dict, stage: str, data: dict) -> None:
+        job = item.get("job")
+        if job and not queue.checkpoint(job["id"], worker_id, stage, data):
+            logger.warning(f"[search]任务 {job['id']} 租约已丢失，阶段 {stage} 未记录")
+
+    def _fail(item: dict, error: Any) -> None:
+        job = item.get("job")
+        if job:
+            queue.fail(job["id"], worker_id, str(error))
+
+    def _lost(item: dict) -> dict:
+        return {**item, "job": None, "skipped": True, "ok": False}
+
+    async def _crawl(item: dict) -> dict:
+        spec = item["spec"]
+        item = _claim(item)
+        if item.get("skipped"):
+            return item
+        if _done(item, "crawl") is not None:
+            return {**item, "saved_paths": _done(item, "crawl").get("saved_paths", [])}
+        started = _done(item, CRAWL_STARTED_STAGE)
+        if started is None:
+            _checkpoint(item, CRAWL_STARTED_STAGE, {"started_at": time.time()})
+        try:
+            saved = await _scheduled_crawl(
+                browser=browser,
+                base_url=base_url,
+                forum=spec["forum"],
+                board=spec["board"],
+                sub_board=spec.get("sub_board"),
+                max_pages=max_pages,
+                concurrency=concurrency,
+                output_root=output_root,
+                structure_path=structure_path,
+                flow="batch",
+            )
+        except Exception as e:
+            _fail(item, e)
+            raise
+        if started is not None:
+            saved = reconcile_saved_paths(saved, output_root, spec["forum"], spec["board"], started.get("started_at"))
+        _checkpoint(item, "crawl", {"saved_paths": saved})
+        return {**item, "saved_paths": saved}
+
+    def _clean(item: dict) -> dict:
+        if item.get("skipped"):
+            return item
+        if not _renew(item):
+            return _lost(item)
+        if _done(item, "clean") is not None:
+            return {**item, "cleaned_count": _done(item, "clean").get("cleaned_count", 0)}
+        try:
+            cleaned_count = clean_post_files(item["saved_paths"])
+        except Exception as e:
+            _fail(item, e)
+            raise
+        _checkpoint(item, "clean", {"cleaned_count": cleaned_count})
+        return {**item, "cleaned_count": cleaned_count}
+
+    def _vectorize(item: dict) -> dict:
+        spec = item["spec"]
+        if item.get("skipped"):
+            return item
+        if not _renew(item):
+            return _lost(item)
+        try:
+            ok = vectorize_saved_paths(
+                saved_paths=item["saved_paths"],
+                forum=spec["forum"],
+                board=spec["board"],
+                data_root=data_root,
+                vector_store_workers=vector_store_workers,
+            )
+        except Exception as e:
+            _fail(item, e)
+            raise
+        job = item.get("job")
+        if job and ok:
+            queue.complete(job["id"], worker_id, {
+                "saved_paths": item["saved_paths"], "cleaned_count": item["cleaned_count"], "ok": True,
+            })
+        elif not ok:
+            _fail(item, "向量化失败")
+        return {**item, "ok": ok}
+
+    outputs, stage_stats = await run_stages(
+        items,
+        [
+            Stage("crawl", _crawl, workers=scheduler_cfg["max_pending_jobs"], queue_size=cfg["queue_size"]),
+            Stage("clean", _clean, workers=cfg["clean_workers"], queue_size=cfg["queue_size"], blocking=True),
+            Stage("vectorize", _vectorize, workers=cfg["vectorize_workers"], queue_size=cfg["queue_size"], blocking=True),
+        ],
     )
-    cleaned_count = clean_post_files(saved_paths)
 
+    done = {item["index"]: item for item in [*finished, *outputs]}
+    errors = {f["item"]["index"]: f for f in stage_stats.pop("failures", [])}
+    saved_paths: list[str] = []
+    cleaned_count = 0
     vector_store_results: list[dict] = []
-    for spec in board_specs:
-        folder = os.path.join(
-            data_root,
-            sanitize_dir(spec["forum"]),
-            sanitize_dir(spec["board"]),
-        )
-        ok = init_dynamic_store(
-            folder_path=folder,
-            max_workers=vector_store_workers,
-        )
-        vector_store_results.append({
-            "forum": spec["forum"],
-            "board": spec["board"],
-            "ok": ok,
-        })
+    failed: list[dict] = []
+    for index, spec in enumerate(board_specs):
+        item = done.get(index, {})
+        saved_paths.extend(item.get("saved_paths", []))
+        cleaned_count += item.get("cleaned_count", 0)
+        result = {"forum": spec["forum"], "board": spec["board"], "ok": bool(item.get("ok", False))}
+        if index in errors:
+            result.update(stage=errors[index]["stage"], error=errors[index]["error"])
+        elif item and not result["ok"] and not item.get("skipped"):
+            result.update(stage="vectorize", error="向量化失败")
+        if "error" in result:
+            failed.append({k: result[k] for k in ("forum", "board", "stage", "error")})
+        vector_store_results.append(result)
+    if failed:
+        logger.warning(f"[search]批量流程 {len(failed)} 个版面失败: {[(f['forum'], f['board'], f['stage']) for f in failed]}")
 
     return {
         "saved_paths": saved_paths,
         "cleaned_count": cleaned_count,
         "vector_store_results": vector_store_results,
+        "failed": failed,
+        "stage_stats": stage_stats,
     }
 
 
@@ -231,6 +491,36 @@ def run_crawl_clean_and_vectorize(
     )
 
 
+def crawl_with_browser_pool(
+    base_url: str,
+    forum: str,
+    board: str,
+    sub_board: str | None,
+    max_pages: int,
+    concurrency: int,
+    output_root: str | None,
+    structure_path: str | None,
+    flow: str,
+) -> list[str]:
+    """同步爬取单个版面：从进程内浏览器池借用已登录的浏览器，经全局调度器排队，返回已保存文件路径。"""
+
+    async def _crawl(browser: Any, pages: int) -> list[str]:
+        return await _scheduled_crawl(
+            browser=browser,
+            base_url=base_url,
+            forum=forum,
+            board=board,
+            sub_board=sub_board,
+            max_pages=max_pages,
+            concurrency=pages,
+            output_root=output_root,
+            structure_path=structure_path,
+            flow=flow,
+        )
+
+    return get_browser_pool().run(_crawl, pages=concurrency)
+
+
 def crawl_board_recent_posts(
     board_path: str,
     max_pages: int = 1,
@@ -238,28 +528,24 @@ def crawl_board_recent_posts(
 ) -> dict:
     """
     Agent 用同步入口：按版面路径爬取最近帖子并清理、向量化。
+    爬取阶段从进程内浏览器池借用已登录的浏览器（见 agent/services/crawler/browser_pool），不再每次冷启动与登录；
+    清理与向量化在调用线程执行，不占用浏览器；有在线 ingest worker 时改为入队交给 worker 进程并等待结果。
     :param board_path: 版面路径，如「生活时尚/悄悄话」（讨论区/版面名）
     :param max_pages: 爬取页数（1=仅首页）
     :param concurrency: 并发数
-    :return: {"success": bool, "saved_paths": list, "cleaned_count": int, "vector_store_ok": bool} 或 {"success": False, "error": str}
+    :return: 成功时 {"success": True, "saved_paths": list, "cleaned_count": int, "vector_store_ok": bool}；
+             失败时返回 None（供 Pipeline 识别为失败，本进程执行与交给 worker 执行一致）
     """
     if not (board_path or "").strip():
         return None  # 供 Pipeline 识别为失败
-    parts = [p.strip() for p in (board_path or "").replace("\\", "/").strip("/").split("/") if p.strip()]
-    if len(parts) < 2:
-        forum, board, sub_board = "", parts[0] if parts else "", None
-    else:
-        forum, board = parts[0], parts[-1]
-        sub_board = parts[1] if len(parts) > 2 else None
-
-    if not board:
+    spec = board_spec_from_path(board_path)
+    if spec is None or not spec["board"]:
         return None
+    forum, board, sub_board = spec["forum"], spec["board"], spec["sub_board"]
 
     try:
         from utils.config_handler import load_config
-        from utils.env_handler import load_env, get_bbs_credentials
-        from infrastructure.browser_manager.browser_manager import GlobalBrowser
-        from infrastructure.browser_manager.login import login
+        from utils.env_handler import load_env
 
         load_env()
         bbs_cfg = load_config()
@@ -267,40 +553,46 @@ def crawl_board_recent_posts(
         if not base_url:
             return None
 
+        # 有在线 worker 时交给独立进程执行，Agent 进程只等待结果；失败与本进程执行失败一样返回 None
+        delegated = ingest_via_workers(forum, board, sub_board, max_pages=max_pages)
+        if delegated is not None:
+            if not delegated["success"]:
+                logger.warning(f"[search]worker 执行 {forum}/{board} 未成功（任务 {delegated['job_id']}）: {delegated['error']}")
+                return None
+            return {
+                "success": True,
+                "saved_paths": delegated["saved_paths"],
+                "cleaned_count": delegated["cleaned_count"],
+                "vector_store_ok": delegated["vector_store_ok"],
+            }
+
         output_root = get_abs_path("data/dynamic")
         structure_path = get_abs_path("data/web_structure/forum_structure.json")
 
-        async def _run() -> dict:
-            browser = GlobalBrowser(headless=True)
-            await browser.start()
-            try:
-                username, password = get_bbs_credentials()
-                if username and password:
-                    await login(browser, username, password)
-                result = await crawl_clean_and_vectorize(
-                    browser=browser,
-                    base_url=base_url,
-                    forum=forum,
-                    board=board,
-                    sub_board=sub_board,
-                    max_pages=max_pages,
-                    concurrency=concurrency,
-                    output_root=output_root,
-                    structure_path=structure_path,
-                    data_root=output_root,
-                    vector_store_workers=4,
-                )
-                return {
-                    "success": True,
-                    "saved_paths": result.get("saved_paths", []),
-                    "cleaned_count": result.get("cleaned_count", 0),
-                    "vector_store_ok": result.get("vector_store_ok", False),
-                }
-            finally:
-                await browser.close()
-
-        out = asyncio.run(_run())
-        return out
+        saved_paths = crawl_with_browser_pool(
+            base_url=base_url,
+            forum=forum,
+            board=board,
+            sub_board=sub_board,
+            max_pages=max_pages,
+            concurrency=concurrency,
+            output_root=output_root,
+            structure_path=structure_path,
+            flow="agent",
+        )
+        result = clean_and_vectorize(
+            saved_paths=saved_paths,
+            forum=forum,
+            board=board,
+            data_root=output_root,
+            vector_store_workers=4,
+        )
+        return {
+            "success": True,
+            "saved_paths": result.get("saved_paths", []),
+            "cleaned_count": result.get("cleaned_count", 0),
+            "vector_store_ok": result.get("vector_store_ok", False),
+        }
     except Exception:
         return None
 
@@ -315,6 +607,8 @@ def run_crawl_clean_and_vectorize_batch(
     structure_path: str | None = None,
     data_root: str | None = None,
     vector_store_workers: int = 4,
+    resume: bool = True,
+    reuse_recent: bool = False,
 ) -> dict:
     """同步包装：执行 crawl_clean_and_vectorize_batch（异步批量多版面爬取+清理+向量化）。"""
     return asyncio.run(
@@ -328,6 +622,8 @@ def run_crawl_clean_and_vectorize_batch(
             structure_path=structure_path,
             data_root=data_root,
             vector_store_workers=vector_store_workers,
+            resume=resume,
+            reuse_recent=reuse_recent,
         )
     )
 
@@ -392,6 +688,10 @@ def main() -> None:
                 )
                 for r in result["vector_store_results"]:
                     print("  向量库 %s/%s: %s" % (r["forum"], r["board"], "成功" if r["ok"] else "失败"))
+                stage_stats = result.get("stage_stats") or {}
+                print("  流水线总耗时 %.1fs" % stage_stats.get("elapsed", 0.0))
+                for name, st in (stage_stats.get("stages") or {}).items():
+                    print("    %s: 处理 %d 失败 %d 累计 %.1fs" % (name, st["processed"], st["failed"], st["busy"]))
             else:
                 forum, board, sub_board = (
                     board_specs[0]["forum"], board_specs[0]["board"], board_specs[0].get("sub_board")
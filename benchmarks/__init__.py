@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+"""
+基准测试：本地论坛替身与爬取吞吐基准，离线评估爬取侧改动，不访问线上站点。
+"""
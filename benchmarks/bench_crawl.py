@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+"""
+基准测试 - 爬取吞吐：对本地论坛替身（benchmarks/fixture_forum.py）运行爬取路径，报告 pages/s、posts/s、
+峰值 RSS 与分阶段耗时，用于评估爬取侧改动，不访问线上站点。
+
+场景（--scenarios，逗号分隔）：
+- single：crawl_board_and_save 冷启动爬取单个版面；
+- single_warm：同一版面先爬一遍，再测增量重爬（页面缓存条件请求、回复数未变的帖子跳过详情）；
+- batch：crawl_boards_batch 批量爬取全部版面；
+- pipeline：crawl_clean_and_vectorize_batch 爬取 -> 清理 -> 向量化流水线（默认跳过向量化，--vectorize 开启）。
+
+每个场景在独立的 spawn 子进程中运行（峰值 RSS 互不影响），所有游标/缓存/索引/任务队列与输出目录都指向临时目录；
+抓取方式固定为 HTTP（登录 cookie 取自替身站点的登录接口，不启动浏览器）。
+用法：python benchmarks/bench_crawl.py --boards 8 --pages 3 --latency-ms 30 --error-rate 0.01 --output bench.json
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import functools
+import json
+import multiprocessing
+import shutil
+import tempfile
+import threading
+import time
+from typing import Any, Callable
+
+import requests
+
+from benchmarks.fixture_forum import FixtureForumServer, board_name, build_structure
+
+SCENARIOS = ("single", "single_warm", "batch", "pipeline")
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb() -> float | None:
+    """当前进程的峰值常驻内存（MB），平台不支持时返回 None。"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 为 KB，macOS 为字节
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+class StageTimer:
+    """按阶段累计调用次数与耗时（线程安全），通过替换模块属性包裹同步/异步函数。"""
+
+    def __init__(self):
+        self.stages: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            entry = self.stages.setdefault(stage, {"calls": 0, "seconds": 0.0})
+            entry["calls"] += 1
+            entry["seconds"] += seconds
+
+    def wrap(self, owner: Any, attr: str, stage: str | Callable[..., str]) -> None:
+        """把 owner.attr 替换为计时版本；stage 可为按参数返回阶段名的函数。"""
+        func = getattr(owner, attr)
+        name_of = stage if callable(stage) else (lambda *a, **k: stage)
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def timed(*args, **kwargs):
+                t0 = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    self.add(name_of(*args, **kwargs), time.perf_counter() - t0)
+        else:
+            @functools.wraps(func)
+            def timed(*args, **kwargs):
+                t0 = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.add(name_of(*args, **kwargs), time.perf_counter() - t0)
+
+        setattr(owner, attr, timed)
+
+    def report(self) -> dict[str, dict]:
+        with self._lock:
+            return {
+                name: {"calls": v["calls"], "seconds": round(v["seconds"], 3)}
+                for name, v in sorted(self.stages.items())
+            }
+
+
+def _isolate_state(work_dir: str, options: dict) -> None:
+    """把爬取与索引侧的单例存储指向临时目录，并固定 HTTP 抓取与调度参数。"""
+    from agent.services.crawler import board_cursor, http_fetcher, job_queue, page_cache, scheduler
+    from agent.services.crawler.adaptive import build_aimd_controller
+    from agent.services.indexing import (
+        content_dedup, content_store, lexical_index, near_dup, post_meta_store, segment_store,
+    )
+    from agent.tools.search import crawler
+
+    def path(name: str) -> str:
+        return os.path.join(work_dir, name)
+
+    board_cursor._default_store = board_cursor.BoardCursorStore(path("crawl_state.sqlite3"))
+    job_queue._default_queue = job_queue.JobQueue(path("crawl_jobs.sqlite3"))
+    page_cache._default_cache = page_cache.PageCache(path("page_cache"), 512 * 1024 * 1024)
+    post_meta_store._default_store = post_meta_store.PostMetaStore(path("post_meta.sqlite3"))
+    lexical_index._default_index = lexical_index.LexicalIndex(path("lexical_index.sqlite3"))
+    content_dedup._default_index = content_dedup.ContentHashIndex(path("content_hash.sqlite3"))
+    near_dup._default_index = near_dup.NearDupIndex(path("near_dup.sqlite3"))
+    segment_store._default_store = segment_store.SegmentStore(path("segments"), path("segments/index.sqlite3"))
+    content_store._default_store = content_store.PostContentStore(path("post_content"), path("post_content/index.sqlite3"))
+    http_fetcher._fetchers.clear()
+
+    scheduler_cfg = scheduler.get_crawler_scheduler_config()
+    scheduler._default_scheduler = scheduler.CrawlScheduler(
+        max_concurrent_pages=options["max_concurrent_pages"],
+        host_rate_per_sec=options["host_rate"],
+        host_burst=max(options["host_rate"], 1.0),
+        max_pending_jobs=scheduler_cfg["max_pending_jobs"],
+        controller=build_aimd_controller({"enabled": options["aimd"]}),
+    )
+
+    base_config = crawler.get_crawler_config
+    overrides = {
+        "fetch_mode": "http",
+        "incremental": True,
+        "staging_root": path("staging"),
+        "http": {"pool_size": options["max_concurrent_pages"], "timeout_seconds": 15, "retries": 2, "page_cache": True},
+    }
+    crawler.get_crawler_config = lambda: {**base_config(), **overrides}
+
+
+def _login(base_url: str) -> list[dict]:
+    """调用替身站点的登录接口，返回 Playwright cookies 格式的登录 cookie。"""
+    resp = requests.post(f"{base_url}/user/ajax_login.json", data={"id": "bench", "passwd": "bench"}, timeout=10)
+    resp.raise_for_status()
+    return [{"name": c.name, "value": c.value, "domain": c.domain, "path": c.path or "/"} for c in resp.cookies]
+
+
+def _count_posts(paths: list[str]) -> int:
+    total = 0
+    for p in paths:
+        try:
+            with open(p, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            continue
+        posts = data.get("posts") if isinstance(data, dict) else None
+        total += len(posts) if isinstance(posts, list) else 1
+    return total
+
+
+def _run_scenario(scenario: str, base_url: str, options: dict) -> dict:
+    """子进程入口：在临时目录中运行一个场景并返回统计。"""
+    work_dir = tempfile.mkdtemp(prefix=f"bench_{scenario}_")
+    try:
+        _isolate_state(work_dir, options)
+        from agent.services.crawler import http_fetcher
+        from agent.tools.search import crawler, search
+
+        timer = StageTimer()
+        timer.wrap(http_fetcher.HttpFetcher, "fetch", lambda self, url, *_: "fetch_article" if "/article/" in url else "fetch_list")
+        timer.wrap(http_fetcher, "parse_board_list", "parse_list")
+        timer.wrap(http_fetcher, "parse_article", "parse_article")
+        timer.wrap(crawler, "promote_staged_files", "promote")
+        if not options["vectorize"]:
+            search.vectorize_saved_paths = lambda **kwargs: True
+        timer.wrap(search, "clean_post_files", "clean")
+        timer.wrap(search, "vectorize_saved_paths", "vectorize")
+
+        http_fetcher.get_http_fetcher(base_url, crawler.get_crawler_config()["http"]).load_cookies(_login(base_url))
+        structure_path = os.path.join(work_dir, "forum_structure.json")
+        with open(structure_path, "w", encoding="utf-8") as f:
+            json.dump(build_structure(options["fixture"]), f, ensure_ascii=False)
+        output_root = os.path.join(work_dir, "dynamic")
+        section = options["fixture"]["section"]
+        specs = [{"forum": section, "board": board_name(i), "sub_board": None} for i in range(options["fixture"]["boards"])]
+        common = {
+            "browser": None,
+            "base_url": base_url,
+            "max_pages": options["pages"],
+            "concurrency": options["concurrency"],
+            "output_root": output_root,
+            "structure_path": structure_path,
+        }
+
+        async def _single() -> dict:
+            saved = await crawler.crawl_board_and_save(forum=section, board=specs[0]["board"], **common)
+            return {"saved_paths": saved}
+
+        async def _batch() -> dict:
+            return {"saved_paths": await search.crawl_boards_batch(board_specs=specs, **common)}
+
+        async def _pipeline() -> dict:
+            return await search.crawl_clean_and_vectorize_batch(board_specs=specs, resume=False, **common)
+
+        runners = {"single": _single, "single_warm": _single, "batch": _batch, "pipeline": _pipeline}
+        if scenario == "single_warm":
+            asyncio.run(_single())
+            timer.stages.clear()
+        before = _server_stats(base_url)
+        t0 = time.perf_counter()
+        result = asyncio.run(runners[scenario]())
+        elapsed = time.perf_counter() - t0
+        after = _server_stats(base_url)
+        saved = result.get("saved_paths", [])
+        return {
+            "elapsed": round(elapsed, 3),
+            "server": {k: after.get(k, 0) - before.get(k, 0) for k in after},
+            "files": len(saved),
+            "posts_saved": _count_posts(saved),
+            "cleaned": result.get("cleaned_count"),
+            "stages": timer.report(),
+            "pipeline_stages": result.get("stage_stats"),
+            "peak_rss_mb": peak_rss_mb(),
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _server_stats(base_url: str) -> dict:
+    return requests.get(f"{base_url}/__stats", timeout=10).json()
+
+
+def run_benchmark(scenarios: list[str], options: dict) -> list[dict]:
+    """启动替身论坛，逐个场景在子进程中运行；吞吐按服务端计数（列表页 + 详情页 + 304）计算。"""
+    results = []
+    ctx = multiprocessing.get_context("spawn")
+    with FixtureForumServer(options["fixture"]) as server:
+        for scenario in scenarios:
+            with ctx.Pool(1) as pool:
+                stats = pool.apply(_run_scenario, (scenario, server.base_url, options))
+            served = stats["server"]
+            pages = served.get("list_pages", 0) + served.get("article_pages", 0) + served.get("not_modified", 0)
+            elapsed = max(stats["elapsed"], 1e-9)
+            results.append({
+                "scenario": scenario,
+                **stats,
+                "pages_per_sec": round(pages / elapsed, 1),
+                "posts_per_sec": round(stats["posts_saved"] / elapsed, 1),
+            })
+    return results
+
+
+def _print_report(results: list[dict]) -> None:
+    header = f"{'scenario':<12}{'elapsed(s)':>11}{'pages/s':>10}{'posts/s':>10}{'files':>7}{'rss(MB)':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['scenario']:<12}{r['elapsed']:>11}{r['pages_per_sec']:>10}{r['posts_per_sec']:>10}{r['files']:>7}{str(r['peak_rss_mb']):>9}")
+        for name, stage in r["stages"].items():
+            print(f"    {name:<16}{stage['calls']:>7} 次 {stage['seconds']:>9.3f} s")
+        server = ", ".join(f"{k}={v}" for k, v in sorted(r["server"].items()) if v)
+        print(f"    server: {server}")
+
+
+def main() -> None:
+    """爬取吞吐基准入口。"""
+    parser = argparse.ArgumentParser(description="爬取吞吐基准（本地论坛替身）")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"逗号分隔，可选 {','.join(SCENARIOS)}")
+    parser.add_argument("--boards", type=int, default=8)
+    parser.add_argument("--pages", type=int, default=3, help="每个版面爬取页数")
+    parser.add_argument("--posts-per-page", type=int, default=30)
+    parser.add_argument("--body-chars", type=int, default=600)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--concurrency", type=int, default=16, help="版面内并发")
+    parser.add_argument("--max-concurrent-pages", type=int, default=32)
+    parser.add_argument("--host-rate", type=float, default=1000.0, help="替身站点的主机限速（请求/秒）")
+    parser.add_argument("--no-aimd", action="store_true", help="关闭 AIMD 自适应并发")
+    parser.add_argument("--vectorize", action="store_true", help="pipeline 场景执行真实向量化（需要 embedding 模型）")
+    parser.add_argument("--output", default=None, help="结果另存为 JSON")
+    args = parser.parse_args()
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"未知场景: {unknown}")
+    options = {
+        "pages": args.pages,
+        "concurrency": args.concurrency,
+        "max_concurrent_pages": args.max_concurrent_pages,
+        "host_rate": args.host_rate,
+        "aimd": not args.no_aimd,
+        "vectorize": args.vectorize,
+        "fixture": {
+            "section": "基准讨论区",
+            "boards": args.boards,
+            "pages_per_board": max(args.pages, 1),
+            "posts_per_page": args.posts_per_page,
+            "body_chars": args.body_chars,
+            "latency_ms": args.latency_ms,
+            "error_rate": args.error_rate,
+        },
+    }
+    results = run_benchmark(scenarios, options)
+    _print_report(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"options": options, "results": results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+# -*- coding: utf-8 -*-
+"""
+基准测试 - 本地论坛替身：按 bbs.byr.cn（nForum）页面结构生成合成的版面列表页、帖子详情页与登录接口，
+供爬取基准离线运行，不访问线上站点。
+
+- 列表页 /board/<版面>?p=N：table.board-list，td.title_9 标题链接、td.title_10 时间、td.title_11 回复数、td.title_12 作者；
+- 详情页 /article/<版面>/<id>：td.a-content，含 发信人/信区/标题/发信站/正文/来源 各块；
+- 登录 /user/ajax_login.json（POST），未带登录 cookie 的页面返回「您未登录」提示（require_login 时）；
+- 可配置延迟（latency_ms ± latency_jitter_ms）、错误率（error_rate，返回 503）、每页帖子数与正文长度；
+- 页面内容由 (版面, 帖子 id, seed) 决定，响应带 ETag，If-None-Match 命中返回 304（便于测缓存重爬）。
+
+单独运行：python benchmarks/fixture_forum.py --port 8765
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import hashlib
+import html
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlparse
+
+DEFAULT_FIXTURE_CONFIG = {
+    "section": "基准讨论区",
+    "boards": 8,
+    "pages_per_board": 5,
+    "posts_per_page": 30,
+    "pinned_per_board": 2,
+    "body_chars": 600,
+    "latency_ms": 20,
+    "latency_jitter_ms": 10,
+    "error_rate": 0.0,
+    "require_login": True,
+    "seed": 42,
+}
+
+SESSION_COOKIE = "nforum[UTMPKEY]"
+_WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+_WORDS = (
+    "北邮", "图书馆", "自习", "食堂", "考研", "实习", "校招", "宿舍", "快递", "讲座",
+    "课程", "老师", "选课", "社团", "运动会", "西土城", "沙河", "海淀", "地铁", "毕业",
+)
+
+
+def board_name(index: int) -> str:
+    return f"Bench{index:02d}"
+
+
+def build_structure(config: dict | None = None) -> list[dict]:
+    """与替身站点对应的论坛结构（forum_structure.json 格式：讨论区 -> 版面）。"""
+    cfg = {**DEFAULT_FIXTURE_CONFIG, **(config or {})}
+    return [{
+        "name": cfg["section"],
+        "boards": [
+            {"name": board_name(i), "id": board_name(i), "url": f"/board/{board_name(i)}"}
+            for i in range(int(cfg["boards"]))
+        ],
+    }]
+
+
+class FixtureForum:
+    """合成论坛内容：帖子按 (版面, id) 确定性生成，发帖时间随 id 递减。"""
+
+    def __init__(self, config: dict | None = None):
+        self.config = {**DEFAULT_FIXTURE_CONFIG, **(config or {})}
+        self.now = datetime.now().replace(microsecond=0)
+        self.stats: dict[str, int] = {}
+        self._stats_lock = threading.Lock()
+        self._error_rng = random.Random(self.config["seed"])
+        self._rng_lock = threading.Lock()
+
+    # ---------- 统计 ----------
+
+    def count(self, key: str, n: int = 1) -> None:
+        with self._stats_lock:
+            self.stats[key] = self.stats.get(key, 0) + n
+
+    def snapshot(self) -> dict[str, int]:
+        with self._stats_lock:
+            return dict(self.stats)
+
+    def should_fail(self) -> bool:
+        rate = float(self.config["error_rate"])
+        if rate <= 0:
+            return False
+        with self._rng_lock:
+            return self._error_rng.random() < rate
+
+    def delay(self) -> None:
+        base = float(self.config["latency_ms"])
+        jitter = float(self.config["latency_jitter_ms"])
+        if base <= 0 and jitter <= 0:
+            return
+        with self._rng_lock:
+            ms = base + self._error_rng.uniform(-jitter, jitter)
+        time.sleep(max(ms, 0.0) / 1000.0)
+
+    # ---------- 内容 ----------
+
+    def _rng(self, board: str, post_id: int) -> random.Random:
+        digest = hashlib.sha1(f"{self.config['seed']}:{board}:{post_id}".encode("utf-8")).digest()
+        return random.Random(int.from_bytes(digest[:8], "big"))
+
+    def posts_per_board(self) -> int:
+        return int(self.config["pages_per_board"]) * int(self.config["posts_per_page"])
+
+    def post(self, board: str, post_id: int) -> dict:
+        rng = self._rng(board, post_id)
+        posted = self.now - timedelta(minutes=post_id * 37 + rng.randint(0, 30))
+        words = [rng.choice(_WORDS) for _ in range(rng.randint(2, 5))]
+        body_words = []
+        length = 0
+        while length < int(self.config["body_chars"]):
+            word = rng.choice(_WORDS)
+            body_words.append(word)
+            length += len(word) + 1
+        return {
+            "id": post_id,
+            "title": f"{''.join(words)} #{post_id}",
+            "author": f"user{rng.randint(1, 500):03d}",
+            "posted": posted,
+            "reply_count": rng.randint(0, 60),
+            "body": " ".join(body_words),
+        }
+
+    def list_page(self, board: str, page: int) -> str:
+        per_page = int(self.config["posts_per_page"])
+        start = (page - 1) * per_page + 1
+        ids = list(range(start, min(start + per_page, self.posts_per_board() + 1)))
+        pinned = list(range(self.posts_per_board() + 1, self.posts_per_board() + 1 + int(self.config["pinned_per_board"])))
+        rows = []
+        for post_id in [*pinned, *ids]:
+            p = self.post(board, post_id)
+            row_class = ' class="top"' if post_id in pinned else ""
+            when = p["posted"].strftime("%H:%M:%S") if p["posted"].date() == self.now.date() else p["posted"].strftime("%Y-%m-%d")
+            rows.append(
+                f"<tr{row_class}>"
+                f'<td class="title_8"><a href="/article/{quote(board)}/{post_id}"><samp class="tag ico-pos-article-normal"></samp></a></td>'
+                f'<td class="title_9"><a href="/article/{quote(board)}/{post_id}">{html.escape(p["title"])}</a></td>'
+                f'<td class="title_10">{when}</td>'
+                f'<td class="title_11 middle">{p["reply_count"]}</td>'
+                f'<td class="title_12">|&ensp;<a href="/user/query/{p["author"]}" class="c63f">{p["author"]}</a></td>'
+                f"</tr>"
+            )
+        return (
+            f'<html><head><meta charset="utf-8"><title>{html.escape(board)}-北邮人论坛</title></head><body>'
+            f'<div class="b-content"><table class="board-list tiz" cellpadding="0" cellspacing="0">'
+            f'<thead><tr><th class="title_8">状态</th><th class="title_9">主题</th><th class="title_10">发帖时间</th>'
+            f'<th class="title_11">回复</th><th class="title_12">作者</th></tr></thead>'
+            f'<tbody>{"".join(rows)}</tbody></table>'
+            f'<div class="t-pre-bottom"><ul class="pagination"><li class="page-normal">'
+            f'<a href="/board/{quote(board)}?p={page + 1}">&gt;&gt;</a></li></ul></div></div></body></html>'
+        )
+
+    def article_page(self, board: str, post_id: int) -> str:
+        p = self.post(board, post_id)
+        dt = p["posted"]
+        station_time = f"{_WEEKDAYS[dt.weekday()]} {_MONTHS[dt.month - 1]} {dt.day:2d} {dt:%H:%M:%S} {dt.year}"
+        return (
+            f'<html><head><meta charset="utf-8"><title>{html.escape(p["title"])}-北邮人论坛</title></head><body>'
+            f'<div class="b-content corner"><table class="article"><tbody><tr class="a-body">'
+            f'<td class="a-content"><p>发信人: {p["author"]} ({p["author"]}), 信区: {html.escape(board)}'
+            f'<br />标&nbsp;&nbsp;题: {html.escape(p["title"])}'
+            f'<br />发信站: 北邮人论坛 ({station_time}), 站内'
+            f'<br />&nbsp;&nbsp;<br />{html.escape(p["body"])}'
+            f'<br />--<br /><font class="f000"></font><font class="f006">※ 来源:·北邮人论坛 bbs.byr.cn·[FROM: 10.3.*.*]</font>'
+            f"</p></td></tr></tbody></table></div></body></html>"
+        )
+
+
+def _make_handler(forum: FixtureForum) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args) -> None:
+            pass
+
+        def _send(self, status: int, body: str = "", content_type: str = "text/html; charset=utf-8", headers: dict | None = None) -> None:
+            data = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            if data:
+                self.wfile.write(data)
+            forum.count("bytes", len(data))
+
+        def _logged_in(self) -> bool:
+            return SESSION_COOKIE in (self.headers.get("Cookie") or "")
+
+        def _page(self, kind: str, body: str) -> None:
+            etag = '"' + hashlib.sha1(body.encode("utf-8")).hexdigest()[:16] + '"'
+            if self.headers.get("If-None-Match") == etag:
+                forum.count("not_modified")
+                self._send(304, headers={"ETag": etag})
+                return
+            forum.count(kind)
+            self._send(200, body, headers={"ETag": etag})
+
+        def do_GET(self):
+            forum.count("requests")
+            forum.delay()
+            parsed = urlparse(self.path)
+            parts = [unquote(p) for p in parsed.path.strip("/").split("/") if p]
+            if parsed.path == "/__stats":
+                self._send(200, json.dumps(forum.snapshot()), "application/json")
+                return
+            if forum.should_fail():
+                forum.count("errors")
+                self._send(503, "Service Unavailable")
+                return
+            if forum.config["require_login"] and not self._logged_in():
+                forum.count("login_challenges")
+                self._send(200, "<html><body><div class=\"error\">您未登录,请登录后继续操作</div></body></html>")
+                return
+            try:
+                if len(parts) == 2 and parts[0] == "board":
+                    page = int((parse_qs(parsed.query).get("p") or ["1"])[0])
+                    self._page("list_pages", forum.list_page(parts[1], max(page, 1)))
+                    return
+                if len(parts) == 3 and parts[0] == "article":
+                    self._page("article_pages", forum.article_page(parts[1], int(parts[2])))
+                    return
+            except ValueError:
+                pass
+            forum.count("not_found")
+            self._send(404, "Not Found")
+
+        def do_POST(self):
+            forum.count("requests")
+            length = int(self.headers.get("Content-Length") or 0)
+            if length:
+                self.rfile.read(length)
+            if urlparse(self.path).path == "/user/ajax_login.json":
+                forum.count("logins")
+                token = hashlib.sha1(str(time.time()).encode("utf-8")).hexdigest()[:12]
+                self._send(
+                    200,
+                    json.dumps({"ajax_st": 1, "ajax_code": "0005", "ajax_msg": "操作成功"}),
+                    "application/json",
+                    headers={"Set-Cookie": f"{SESSION_COOKIE}={token}; Path=/"},
+                )
+                return
+            self._send(404, "Not Found")
+
+    return Handler
+
+
+class FixtureForumServer:
+    """在后台线程运行的替身论坛 HTTP 服务；可作上下文管理器使用。"""
+
+    def __init__(self, config: dict | None = None, host: str = "127.0.0.1", port: int = 0):
+        self.forum = FixtureForum(config)
+        self.httpd = ThreadingHTTPServer((host, port), _make_handler(self.forum))
+        self.httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FixtureForumServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fixture-forum", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "FixtureForumServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main() -> None:
+    """独立运行替身论坛：python benchmarks/fixture_forum.py --port 8765"""
+    parser = argparse.ArgumentParser(description="本地论坛替身（nForum 页面结构）")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--boards", type=int, default=DEFAULT_FIXTURE_CONFIG["boards"])
+    parser.add_argument("--pages", type=int, default=DEFAULT_FIXTURE_CONFIG["pages_per_board"])
+    parser.add_argument("--posts-per-page", type=int, default=DEFAULT_FIXTURE_CONFIG["posts_per_page"])
+    parser.add_argument("--body-chars", type=int, default=DEFAULT_FIXTURE_CONFIG["body_chars"])
+    parser.add_argument("--latency-ms", type=float, default=DEFAULT_FIXTURE_CONFIG["latency_ms"])
+    parser.add_argument("--error-rate", type=float, default=DEFAULT_FIXTURE_CONFIG["error_rate"])
+    parser.add_argument("--structure-out", default=None, help="把对应的论坛结构 JSON 写到该路径")
+    args = parser.parse_args()
+    config = {
+        "boards": args.boards,
+        "pages_per_board": args.pages,
+        "posts_per_page": args.posts_per_page,
+        "body_chars": args.body_chars,
+        "latency_ms": args.latency_ms,
+        "error_rate": args.error_rate,
+    }
+    if args.structure_out:
+        with open(args.structure_out, "w", encoding="utf-8") as f:
+            json.dump(build_structure(config), f, ensure_ascii=False, indent=2)
+    server = FixtureForumServer(config, host=args.host, port=args.port)
+    print(f"替身论坛已启动: {server.base_url}（Ctrl+C 退出）")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+"""测试公共配置：把项目根目录加入 sys.path，与各模块头部的 sys.path.insert 一致。"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""agent/services/crawler/adaptive：请求结果归类与 AIMD 窗口调整。"""
+import asyncio
+
+from agent.services.crawler.adaptive import (
+    OUTCOME_ERROR,
+    OUTCOME_LOGIN_CHALLENGE,
+    OUTCOME_OK,
+    OUTCOME_SERVER_ERROR,
+    OUTCOME_THROTTLED,
+    OUTCOME_TIMEOUT,
+    AIMDController,
+    build_aimd_controller,
+    classify_outcome,
+)
+from agent.services.crawler.errors import HttpFetchError, LoginRequiredError
+from agent.services.crawler.scheduler import CrawlScheduler
+
+
+class ReadTimeout(Exception):
+    pass
+
+
+def test_classify_by_type_and_status():
+    assert classify_outcome() == OUTCOME_OK
+    assert classify_outcome(asyncio.TimeoutError()) == OUTCOME_TIMEOUT
+    assert classify_outcome(ReadTimeout("x")) == OUTCOME_TIMEOUT
+    assert classify_outcome(LoginRequiredError("需要登录: /bbs/login")) == OUTCOME_LOGIN_CHALLENGE
+    assert classify_outcome(HttpFetchError("HTTP 429", 429)) == OUTCOME_THROTTLED
+    assert classify_outcome(HttpFetchError("HTTP 503", 503)) == OUTCOME_SERVER_ERROR
+    assert classify_outcome(HttpFetchError("HTTP 404", 404)) == OUTCOME_ERROR
+    assert classify_outcome(status=429) == OUTCOME_THROTTLED
+
+
+def test_login_or_status_text_in_message_is_not_congestion():
+    assert classify_outcome(ValueError("解析失败: https://bbs/login?from=500")) == OUTCOME_ERROR
+    assert classify_outcome(HttpFetchError("列表页未解析到帖子: /board/login")) == OUTCOME_ERROR
+
+
+def test_additive_increase_after_a_window_of_successes():
+    ctrl = AIMDController(initial_window=4, max_window=8, cooldown_seconds=0)
+    for _ in range(3):
+        assert ctrl.record(OUTCOME_OK, 0.1) == 4
+    assert ctrl.record(OUTCOME_OK, 0.1) == 5
+
+
+def test_multiplicative_decrease_with_cooldown():
+    ctrl = AIMDController(initial_window=16, min_window=2, cooldown_seconds=60)
+    assert ctrl.record(OUTCOME_THROTTLED) == 8
+    # 冷却期内同一波错误只减一次
+    assert ctrl.record(OUTCOME_SERVER_ERROR) == 8
+    assert ctrl.stats()["decreases"] == 1
+
+
+def test_window_bounds_and_no_increase_when_slow():
+    ctrl = AIMDController(initial_window=2, min_window=2, max_window=3, latency_target_ms=100, cooldown_seconds=0)
+    ctrl.record(OUTCOME_TIMEOUT)
+    assert ctrl.window == 2
+    for _ in range(20):
+        ctrl.record(OUTCOME_OK, 1.0)
+    assert ctrl.window == 2
+
+
+def test_build_controller_disabled():
+    assert build_aimd_controller({"enabled": False}) is None
+    assert build_aimd_controller({"initial_window": 5}).window == 5
+
+
+def test_only_page_slots_report_to_aimd():
+    ctrl = AIMDController(initial_window=4, cooldown_seconds=0)
+    scheduler = CrawlScheduler(max_concurrent_pages=64, host_rate_per_sec=1000, host_burst=1000, controller=ctrl)
+
+    async def main():
+        async with scheduler.slot("h", "board", slots=4):
+            for _ in range(2):
+                async with scheduler.slot("h", "board", report=True):
+                    pass
+
+    asyncio.run(main())
+    assert ctrl.stats()["outcomes"] == {OUTCOME_OK: 2}
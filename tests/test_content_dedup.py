@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""agent/services/indexing/content_dedup：清理结果复用时易变块取本次爬取的新值。"""
+import json
+import os
+
+import pytest
+
+from agent.services.indexing.content_dedup import ContentHashIndex, raw_content_hash
+from utils.file_handler import atomic_write_json
+
+RAW = (
+    "发信人: alice (Alice), 信区: Test\n标  题: hello\n发信站: 水木社区 (Mon Jan  1 10:00:00 2024), 站内\n\n"
+    "正文第一行\n正文第二行\n--\n\n※ 来源:·水木社区 http://www.newsmth.net·[FROM: 1.2.3.*]\n"
+)
+CLEANED = {
+    "发信人": "alice (Alice)", "信区": "Test", "标题": "hello",
+    "发信站": "水木社区 (Mon Jan  1 10:00:00 2024), 站内", "正文": "正文第一行\n正文第二行",
+    "来源": "水木社区 http://www.newsmth.net·[FROM: 1.2.3.*]",
+}
+
+
+@pytest.fixture
+def index(tmp_path):
+    return ContentHashIndex(str(tmp_path / "hashes.sqlite3"))
+
+
+def _write(path, content):
+    atomic_write_json(str(path), {"board_name": "Test", "posts": [{"url": "u1", "title": "hello", "content": content}]})
+
+
+def test_hash_ignores_station_and_source_lines():
+    recrawled = RAW.replace("Mon Jan  1 10:00:00 2024", "Tue Jan  2 11:00:00 2024").replace("1.2.3.*", "5.6.7.*")
+    assert raw_content_hash(RAW) == raw_content_hash(recrawled)
+    assert raw_content_hash(RAW) != raw_content_hash(RAW.replace("正文第二行", "改过的正文"))
+
+
+def test_reuse_rebuilds_volatile_blocks(index, tmp_path):
+    index.put([(raw_content_hash(RAW), CLEANED)])
+    recrawled = RAW.replace("Mon Jan  1 10:00:00 2024", "Tue Jan  2 11:00:00 2024").replace("1.2.3.*", "5.6.7.*")
+    path = tmp_path / "2024-01-02.json"
+    _write(path, recrawled)
+
+    pending_paths, pending, reused = index.reuse_cleaned([path])
+    assert (pending_paths, pending, reused) == ([], {}, 1)
+    content = json.loads(path.read_text(encoding="utf-8"))["posts"][0]["content"]
+    assert content["正文"] == CLEANED["正文"]
+    assert content["发信站"] == "水木社区 (Tue Jan  2 11:00:00 2024), 站内"
+    assert content["来源"] == "水木社区 http://www.newsmth.net·[FROM: 5.6.7.*]"
+
+
+def test_unseen_body_stays_pending(index, tmp_path):
+    path = tmp_path / "2024-01-02.json"
+    _write(path, RAW)
+    pending_paths, pending, reused = index.reuse_cleaned([path])
+    assert reused == 0
+    assert list(pending.values()) == [{"u1": raw_content_hash(RAW)}]
+    assert len(pending_paths) == 1
+
+
+def test_atomic_write_leaves_no_temp_file(tmp_path):
+    path = tmp_path / "sub" / "a.json"
+    atomic_write_json(str(path), {"a": 1})
+    atomic_write_json(str(path), {"a": 2})
+    assert json.loads(path.read_text(encoding="utf-8")) == {"a": 2}
+    assert os.listdir(path.parent) == ["a.json"]
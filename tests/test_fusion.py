@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""agent/services/query/fusion：倒数排名融合。"""
+import pytest
+
+from agent.services.query.fusion import DEFAULT_RRF_K, reciprocal_rank_fusion
+
+
+def test_rrf_scores_sum_over_rankings():
+    fused = dict(reciprocal_rank_fusion([["a", "b"], ["b", "c"]]))
+    k = DEFAULT_RRF_K
+    assert fused["a"] == pytest.approx(1 / (k + 1))
+    assert fused["b"] == pytest.approx(1 / (k + 2) + 1 / (k + 1))
+    assert fused["c"] == pytest.approx(1 / (k + 2))
+
+
+def test_rrf_orders_by_fused_score():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "b", "a"], ["b"]])
+    assert [key for key, _ in fused][0] == "b"
+
+
+def test_rrf_duplicate_keys_keep_first_rank():
+    fused = dict(reciprocal_rank_fusion([["a", "a", "b"]], k=0))
+    assert fused == {"a": pytest.approx(1.0), "b": pytest.approx(0.5)}
+
+
+def test_rrf_weights():
+    fused = reciprocal_rank_fusion([["a"], ["b"]], k=0, weights=[1.0, 2.0])
+    assert fused == [("b", pytest.approx(2.0)), ("a", pytest.approx(1.0))]
+
+
+def test_rrf_empty():
+    assert reciprocal_rank_fusion([]) == []
+    assert reciprocal_rank_fusion([[], []]) == []
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""agent/services/crawler/job_queue：状态迁移、幂等入队、租约与检查点。"""
+import time
+
+import pytest
+
+from agent.services.crawler.job_queue import (
+    STATE_DEAD,
+    STATE_PENDING,
+    STATE_RUNNING,
+    STATE_SUCCEEDED,
+    JobQueue,
+)
+
+KIND = "board_ingest"
+PAYLOAD = {"forum": "校园", "board": "Test"}
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.sqlite3"), lease_seconds=60, max_attempts=2, retry_backoff_seconds=0)
+
+
+def test_pending_running_succeeded(queue):
+    job = queue.enqueue(KIND, PAYLOAD)
+    assert job["state"] == STATE_PENDING
+    claimed = queue.claim("w1")
+    assert (claimed["id"], claimed["state"], claimed["attempts"], claimed["lease_owner"]) == (job["id"], STATE_RUNNING, 1, "w1")
+    assert queue.claim("w2") is None
+    assert queue.complete(job["id"], "w1", {"ok": True})
+    done = queue.get(job["id"])
+    assert (done["state"], done["result"], done["lease_owner"]) == (STATE_SUCCEEDED, {"ok": True}, None)
+    assert queue.stats() == {STATE_SUCCEEDED: 1}
+
+
+def test_enqueue_is_idempotent(queue):
+    job = queue.enqueue(KIND, PAYLOAD)
+    assert queue.enqueue(KIND, dict(PAYLOAD))["id"] == job["id"]
+    queue.claim("w1")
+    assert queue.enqueue(KIND, PAYLOAD)["state"] == STATE_RUNNING
+    queue.complete(job["id"], "w1", {"ok": True})
+    # 窗口内已成功：直接返回；dedupe=False 时重置为 pending 并清空检查点与结果
+    assert queue.enqueue(KIND, PAYLOAD)["state"] == STATE_SUCCEEDED
+    again = queue.enqueue(KIND, PAYLOAD, dedupe=False)
+    assert (again["id"], again["state"], again["attempts"], again["result"]) == (job["id"], STATE_PENDING, 0, None)
+
+
+def test_enqueue_raises_priority_of_pending_job(queue):
+    queue.enqueue(KIND, PAYLOAD, priority=0)
+    assert queue.enqueue(KIND, PAYLOAD, priority=5)["priority"] == 5
+    assert queue.enqueue(KIND, PAYLOAD, priority=1)["priority"] == 5
+
+
+def test_fail_retries_then_dead(queue):
+    job = queue.enqueue(KIND, PAYLOAD)
+    queue.claim("w1")
+    assert queue.fail(job["id"], "w1", "boom") == STATE_PENDING
+    assert queue.get(job["id"])["error"] == "boom"
+    queue.claim("w1")
+    assert queue.fail(job["id"], "w1", "boom again") == STATE_DEAD
+    dead = queue.get(job["id"])
+    assert dead["state"] == STATE_DEAD and dead["finished_at"] is not None
+    assert queue.claim("w1") is None
+    # dead 任务重新入队时重置为 pending
+    assert queue.enqueue(KIND, PAYLOAD)["state"] == STATE_PENDING
+
+
+def test_checkpoints_survive_retry(queue):
+    job = queue.enqueue(KIND, PAYLOAD)
+    queue.claim("w1")
+    assert queue.checkpoint(job["id"], "w1", "crawl", {"saved_paths": ["a.json"]})
+    queue.fail(job["id"], "w1", "clean failed")
+    retried = queue.claim("w2")
+    assert retried["stages"] == {"crawl": {"saved_paths": ["a.json"]}}
+
+
+def test_lost_lease_rejects_stale_worker(queue):
+    job = queue.enqueue(KIND, PAYLOAD)
+    queue.claim("w1", lease_seconds=0.01)
+    time.sleep(0.02)
+    # 租约过期：其他 worker 可接手，原 worker 的续约、检查点与结束操作都失败
+    taken = queue.claim_job(job["id"], "w2")
+    assert taken["lease_owner"] == "w2" and taken["attempts"] == 2
+    assert not queue.heartbeat(job["id"], "w1")
+    assert not queue.checkpoint(job["id"], "w1", "crawl")
+    assert not queue.complete(job["id"], "w1")
+    assert queue.fail(job["id"], "w1", "late") is None
+    assert queue.heartbeat(job["id"], "w2")
+
+
+def test_claim_job_respects_live_lease(queue):
+    job = queue.enqueue(KIND, PAYLOAD)
+    queue.claim_job(job["id"], "w1")
+    assert queue.claim_job(job["id"], "w2") is None
+    assert queue.claim_job(job["id"], "w1")["lease_owner"] == "w1"
+    queue.complete(job["id"], "w1")
+    assert queue.claim_job(job["id"], "w1") is None
+
+
+def test_expired_lease_with_no_attempts_left_goes_dead(queue):
+    job = queue.enqueue(KIND, PAYLOAD, max_attempts=1)
+    queue.claim("w1", lease_seconds=0.01)
+    time.sleep(0.02)
+    assert queue.claim("w2") is None
+    dead = queue.get(job["id"])
+    assert (dead["state"], dead["error"]) == (STATE_DEAD, "租约过期")
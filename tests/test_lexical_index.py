@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""agent/services/indexing/lexical_index：字二元组分词与 BM25 倒排索引。"""
+import pytest
+
+from agent.services.indexing.lexical_index import LexicalIndex, tokenize
+
+
+def _record(doc_key, title, content, board="创意生活", ts=None):
+    return {
+        "doc_key": doc_key, "source_file": f"/data/{doc_key}.json", "section": "生活时尚", "board": board,
+        "title": title, "author": "tester", "url": doc_key, "date": "", "time": "", "reply_count": 0,
+        "content": content, "ts": ts,
+    }
+
+
+@pytest.fixture()
+def index(tmp_path):
+    idx = LexicalIndex(str(tmp_path / "lexical.sqlite3"))
+    idx.upsert([
+        _record("u1", "数据结构期中", "CS101 复习资料", ts=100.0),
+        _record("u2", "二手自行车", "出一辆自行车", ts=200.0),
+        _record("u3", "食堂推荐", "学一食堂的面不错", board="美食", ts=300.0),
+    ])
+    return idx
+
+
+def test_tokenize_bigrams_and_words():
+    assert tokenize("数据结构") == ["数据", "据结", "结构"]
+    assert tokenize("CS101 期中") == ["cs101", "期中"]
+    assert tokenize("车") == ["车"]
+    assert tokenize("") == []
+
+
+def test_search_matches_exact_terms(index):
+    hits = index.search("cs101")
+    assert [meta["doc_key"] for meta, _ in hits] == ["u1"]
+    assert hits[0][1] > 0
+
+
+def test_search_ranks_by_bm25(index):
+    hits = index.search("自行车")
+    assert hits[0][0]["doc_key"] == "u2"
+
+
+def test_search_filters_board_and_time(index):
+    assert index.search("食堂", board="创意生活") == []
+    assert [m["doc_key"] for m, _ in index.search("食堂", board="美食")] == ["u3"]
+    assert index.search("食堂", ts_to=250.0) == []
+
+
+def test_upsert_replaces_and_remove(index):
+    index.upsert([_record("u1", "线性代数", "MA201", ts=100.0)])
+    assert index.search("cs101") == []
+    assert [m["doc_key"] for m, _ in index.search("ma201")] == ["u1"]
+    assert index.remove(["u1", "missing"]) == 1
+    assert index.search("ma201") == []
+
+
+def test_recent_orders_by_ts(index):
+    assert [m["doc_key"] for m in index.recent(limit=2)] == ["u3", "u2"]
+    assert [m["doc_key"] for m in index.recent(board="创意生活")] == ["u2", "u1"]
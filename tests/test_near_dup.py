@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""agent/services/indexing/near_dup：SimHash 指纹、LSH 召回与跨版面聚类（每个版面一个代表）。"""
+import random
+from collections import Counter
+
+import pytest
+
+from agent.services.indexing.near_dup import (
+    SHINGLE_SIZE,
+    SIMHASH_BITS,
+    NearDupIndex,
+    _hash64,
+    hamming_distance,
+    simhash,
+)
+from agent.services.indexing.content_dedup import normalize_post_body
+
+BODY = (
+    "清华大学图书馆将于本周六上午九点至下午五点进行系统维护，期间馆藏检索、电子资源访问与座位预约服务暂停，"
+    "给大家带来的不便敬请谅解，如有疑问请联系图书馆服务台或者拨打咨询电话。"
+)
+OTHER = (
+    "周末约球，东操场篮球场下午三点，缺两个后卫，水平不限，欢迎新同学参加，结束后一起去食堂吃饭，"
+    "有兴趣的同学请在本帖回复或者站内信联系我，人满即止，谢谢大家支持。"
+)
+
+
+def _naive_simhash(text: str) -> int:
+    text = normalize_post_body(text).replace(" ", "")
+    if not text:
+        return 0
+    grams = Counter(text[i:i + SHINGLE_SIZE] for i in range(max(len(text) - SHINGLE_SIZE + 1, 1)))
+    weights = [0] * SIMHASH_BITS
+    for gram, count in grams.items():
+        h = _hash64(gram)
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += count if (h >> bit) & 1 else -count
+    return sum(1 << bit for bit, w in enumerate(weights) if w > 0)
+
+
+def test_simhash_matches_bitwise_definition():
+    rng = random.Random(0)
+    alphabet = "水木社区清华大学图书馆的了是 abc\n"
+    texts = ["", "ab", BODY, OTHER] + ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 800))) for _ in range(50)]
+    for text in texts:
+        assert simhash(text) == _naive_simhash(text)
+
+
+def test_near_copies_are_close_and_unrelated_far():
+    edited = BODY + "谢谢"
+    assert hamming_distance(simhash(BODY), simhash(edited)) <= 3
+    assert hamming_distance(simhash(BODY), simhash(OTHER)) > 3
+
+
+def _record(key, board, body, section="校园"):
+    return {"doc_key": key, "section": section, "board": board, "title": "通知", "content": body}
+
+
+@pytest.fixture
+def index(tmp_path):
+    return NearDupIndex(str(tmp_path / "near_dup.sqlite3"), hamming_threshold=3, min_chars=50)
+
+
+def test_clusters_across_boards_with_one_rep_per_board(index):
+    reps = index.assign([
+        _record("a", "Library", BODY),
+        _record("b", "Announce", BODY),
+        _record("c", "Library", BODY + "转"),
+        _record("d", "Sports", OTHER),
+    ])
+    # a、b 分属不同版面，各自是所在版面的代表（都写入向量库）；c 与 a 同版面，由 a 代表
+    assert reps == {"a": "a", "b": "b", "c": "a", "d": "d"}
+    assert index.representatives(["a", "b", "c", "d"]) == {"a": "a", "b": "a", "c": "a", "d": "d"}
+    assert index.members(["a"]) == {"a": ["a", "b", "c"]}
+
+
+def test_unchanged_post_keeps_its_board_rep(index):
+    index.assign([_record("a", "Library", BODY), _record("c", "Library", BODY)])
+    assert index.assign([_record("c", "Library", BODY)]) == {"c": "a"}
+
+
+def test_rep_change_rehomes_members(index):
+    index.assign([
+        _record("a", "Library", BODY),
+        _record("b", "Announce", BODY),
+        _record("c", "Library", BODY),
+    ])
+    # 簇代表 a 改成无关内容：b、c 重新归簇，c 成为 Library 版面的新代表
+    reps = index.assign([_record("a", "Library", OTHER)])
+    assert reps == {"a": "a", "b": "b", "c": "c"}
+    assert index.representatives(["b", "c"]) == {"b": "b", "c": "b"}
+
+
+def test_short_posts_are_not_clustered(index):
+    index.assign([_record("a", "Library", BODY)])
+    assert index.assign([_record("s", "Library", "短帖")]) == {"s": "s"}
+    assert index.representatives(["s"]) == {}
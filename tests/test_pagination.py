@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""agent/services/query/pagination 与 grouped_search：游标编解码、翻页状态与按文件分组翻页。"""
+import pytest
+from langchain_core.documents import Document
+
+from agent.services.query.grouped_search import grouped_similarity_search
+from agent.services.query.pagination import PageState, decode_cursor, encode_cursor
+
+
+class FakeEmbeddings:
+    def embed_query(self, query):
+        return [0.0]
+
+
+class FakeVectorStore:
+    """按预设距离排序的分片库，支持 source_file 的 $nin 过滤，并记录每次查询的 k。"""
+
+    def __init__(self, n_files, chunks_per_file=3):
+        self.embeddings = FakeEmbeddings()
+        self.chunks = sorted(
+            ((f * 1.0 + c * 0.01, f"file{f:03d}") for f in range(n_files) for c in range(chunks_per_file)),
+        )
+        self.requested = []
+
+    @staticmethod
+    def _excluded(where):
+        clauses = (where or {}).get("$and", [where] if where else [])
+        excluded = set()
+        for clause in clauses:
+            excluded.update((clause.get("source_file") or {}).get("$nin", []))
+        return excluded
+
+    def similarity_search_by_vector_with_relevance_scores(self, embedding, k, filter=None):
+        self.requested.append(k)
+        excluded = self._excluded(filter)
+        hits = [(d, f) for d, f in self.chunks if f not in excluded][:k]
+        return [(Document(page_content=f, metadata={"source_file": f}), d) for d, f in hits]
+
+
+def _files(pairs):
+    return [doc.metadata["source_file"] for doc, _ in pairs]
+
+
+def test_cursor_round_trip():
+    state = PageState(offset=3, returned=[("source_file", "a.json"), ("source", "b.txt")])
+    decoded = decode_cursor(encode_cursor("q", state), "q")
+    assert decoded.offset == 3
+    assert decoded.returned == [("source_file", "a.json"), ("source", "b.txt")]
+    assert ("source", "b.txt") in decoded and ("source_file", "b.txt") not in decoded
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", "e30=", encode_cursor("other", PageState())])
+def test_invalid_cursor_raises(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, "q")
+
+
+def test_page_state_caps_exclude_set():
+    state = PageState(max_exclude=2)
+    for name in ("a", "b", "c", "c"):
+        state.add("source_file", name)
+    assert state.offset == 1
+    assert state.exclude == {"source_file": {"b", "c"}}
+    assert ("source_file", "a") not in state
+
+
+@pytest.mark.parametrize("max_exclude", [0, 2, 50])
+def test_paging_returns_each_file_once_in_order(max_exclude):
+    store = FakeVectorStore(n_files=11)
+    state = PageState(max_exclude=max_exclude)
+    pages = []
+    while True:
+        pairs = grouped_similarity_search(store, "q", k=3, offset=state.offset, exclude=state.exclude)
+        pairs = [(d, s) for d, s in pairs if ("source_file", d.metadata["source_file"]) not in state]
+        for doc, _ in pairs:
+            state.add("source_file", doc.metadata["source_file"])
+        pages.append(_files(pairs))
+        if len(pairs) < 3:
+            break
+    assert [f for page in pages for f in page] == [f"file{i:03d}" for i in range(11)]
+    assert len(state.returned) <= max_exclude
+
+
+def test_excluded_files_bound_store_requests():
+    store = FakeVectorStore(n_files=40)
+    state = PageState()
+    for _ in range(5):
+        for doc, _ in grouped_similarity_search(store, "q", k=4, offset=state.offset, exclude=state.exclude):
+            state.add("source_file", doc.metadata["source_file"])
+    # 每页只为本页的 4 个文件取分片，不随翻页深度增长
+    assert max(store.requested) == 4 * 2
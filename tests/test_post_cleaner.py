@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""agent/services/indexing/post_cleaner：进程池分批清理与直接调用上游 clean_json_files 的结果一致。"""
+import json
+import shutil
+
+import pytest
+
+upstream = pytest.importorskip("knowledge.processing.clean")
+
+from agent.services.indexing.post_cleaner import CleanEngine
+
+RAW = (
+    "发信人: alice (Alice), 信区: Test\n标  题: 第{i}帖\n发信站: 水木社区 (Mon Jan  1 10:00:00 2024), 站内\n\n"
+    "正文 {i}\n第二行\n--\n\n※ 来源:·水木社区 http://www.newsmth.net·[FROM: 1.2.3.*]\n"
+)
+
+
+def _make_files(root, n=7):
+    paths = []
+    for d in range(n):
+        path = root / "校园" / "Test" / f"2024-01-{d + 1:02d}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        posts = [{"url": f"u{d}-{i}", "title": f"第{i}帖", "content": RAW.format(i=i)} for i in range(3)]
+        path.write_text(json.dumps({"section_name": "校园", "board_name": "Test", "posts": posts},
+                                   ensure_ascii=False, indent=2), encoding="utf-8")
+        paths.append(path)
+    return paths
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_engine_output_matches_upstream(tmp_path, workers):
+    expected_paths = _make_files(tmp_path / "upstream")
+    shutil.copytree(tmp_path / "upstream", tmp_path / "engine")
+    engine_paths = [tmp_path / "engine" / p.relative_to(tmp_path / "upstream") for p in expected_paths]
+
+    expected_files = upstream.clean_json_files([str(p) for p in expected_paths])
+    engine = CleanEngine(workers=workers, chunk_size=2, min_parallel_files=1)
+    try:
+        stats = engine.clean_files(engine_paths)
+    finally:
+        engine.shutdown()
+
+    assert stats["files"] == expected_files
+    for expected, actual in zip(expected_paths, engine_paths):
+        assert actual.read_bytes() == expected.read_bytes()
+
+
+def test_empty_input(tmp_path):
+    stats = CleanEngine(workers=2).clean_files([])
+    assert stats["files"] == 0 and stats["workers"] == 1
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""帖子元数据查询：版面参数解析与路由、参数准备。"""
+from agent.pipeline import Pipeline
+from agent.router import Router
+from agent.services.query.boards import parse_board
+from agent.tools.query.post_meta import query_post_meta
+
+
+def test_parse_board():
+    assert parse_board("生活时尚", "创意生活", None) == ("生活时尚", "创意生活")
+    assert parse_board(None, None, "/生活时尚/创意生活/") == ("生活时尚", "创意生活")
+    assert parse_board(None, None, "生活时尚\\子目录\\创意生活") == ("生活时尚", "创意生活")
+    assert parse_board(None, None, "创意生活") == ("", "创意生活")
+    assert parse_board(None, None, None) == ("", "")
+
+
+def test_router_routes_structured_questions_to_post_meta():
+    router = Router()
+    assert router.route({"id": "9", "description": "查询本周回复最多的热帖"}, {}) == "query_post_meta"
+    assert router.route({"id": "9", "description": "查看版面帖子的具体内容"}, {}) == "query_post_data"
+
+
+def test_pipeline_prepares_post_meta_params():
+    pipeline = Pipeline(max_workers=1)
+    try:
+        params = pipeline._prepare_tool_params(
+            query_post_meta,
+            {"id": "9", "description": "查询回复最多的帖子", "board_path": "生活时尚/创意生活"},
+            {"user_input": "本周创意生活回复最多的帖子"},
+        )
+    finally:
+        pipeline.executor.shutdown()
+    assert params["order_by"] == "reply_count"
+    assert params["board_path"] == "生活时尚/创意生活"
+    assert params["date_from"]
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""utils/file_handler.JsonPostStream 流式解析与 agent/services/indexing/post_records 的文件形态处理。"""
+import json
+
+import pytest
+
+from agent.services.indexing.post_records import iter_post_records
+from utils.file_handler import JsonPostStream
+
+HEADER = {"section_name": "校园", "board_name": "Test", "date": "2024-01-02"}
+
+
+def _write(tmp_path, data, name="2024-01-02.json", raw=None):
+    path = tmp_path / name
+    path.write_text(raw if raw is not None else json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    return str(path)
+
+
+def _posts(n, size=10):
+    return [{"url": f"u{i}", "title": f"t{i}", "content": "正" * size, "reply_count": i} for i in range(n)]
+
+
+def test_stream_yields_posts_and_header(tmp_path):
+    path = _write(tmp_path, {**HEADER, "posts": _posts(3), "trailer": 1})
+    stream = JsonPostStream(path)
+    posts = list(stream)
+    assert [p["url"] for p in posts] == ["u0", "u1", "u2"]
+    assert stream.has_posts
+    assert stream.header == {**HEADER, "trailer": 1}
+
+
+def test_stream_handles_values_spanning_chunks(tmp_path):
+    posts = _posts(20, size=700)
+    path = _write(tmp_path, {**HEADER, "posts": posts})
+    # 最小分块 1024 字符，单个帖子跨越分块边界
+    assert list(JsonPostStream(path, chunk_size=1)) == posts
+
+
+def test_stream_skips_non_dict_items(tmp_path):
+    path = _write(tmp_path, {**HEADER, "posts": [1, None, {"url": "u"}, "x", []]})
+    assert list(JsonPostStream(path)) == [{"url": "u"}]
+
+
+@pytest.mark.parametrize("value", [None, {}, "x", 3])
+def test_stream_non_list_posts(tmp_path, value):
+    path = _write(tmp_path, {**HEADER, "posts": value, "after": True})
+    stream = JsonPostStream(path)
+    assert list(stream) == []
+    assert stream.has_posts
+    assert stream.header == {**HEADER, "after": True}
+
+
+def test_stream_without_posts_key(tmp_path):
+    path = _write(tmp_path, {"url": "u", "title": "t"})
+    stream = JsonPostStream(path)
+    assert list(stream) == []
+    assert not stream.has_posts
+    assert stream.header == {"url": "u", "title": "t"}
+
+
+def test_stream_non_object_top_level(tmp_path):
+    stream = JsonPostStream(_write(tmp_path, [{"url": "u"}]))
+    assert list(stream) == [] and not stream.has_posts
+
+
+def test_stream_truncated_file_raises(tmp_path):
+    raw = json.dumps({**HEADER, "posts": _posts(2)}, ensure_ascii=False)[:-20]
+    stream = JsonPostStream(_write(tmp_path, None, raw=raw))
+    with pytest.raises(ValueError):
+        list(stream)
+
+
+def test_records_from_posts_file(tmp_path):
+    records = list(iter_post_records(_write(tmp_path, {**HEADER, "posts": _posts(2)})))
+    assert [(r["section"], r["board"], r["date"], r["url"], r["reply_count"]) for r in records] == [
+        ("校园", "Test", "2024-01-02", "u0", 0), ("校园", "Test", "2024-01-02", "u1", 1),
+    ]
+    assert len({r["doc_key"] for r in records}) == 2
+
+
+@pytest.mark.parametrize("value", [None, {"url": "u"}, "x"])
+def test_records_null_or_non_list_posts_yield_nothing(tmp_path, value):
+    assert list(iter_post_records(_write(tmp_path, {**HEADER, "posts": value}))) == []
+
+
+def test_records_single_post_file_without_posts_key(tmp_path):
+    records = list(iter_post_records(_write(tmp_path, {**HEADER, "url": "u", "title": "t", "content": "c"})))
+    assert [(r["url"], r["title"], r["board"]) for r in records] == [("u", "t", "Test")]
+
+
+def test_records_empty_object_yields_nothing(tmp_path):
+    assert list(iter_post_records(_write(tmp_path, {}))) == []
+
+
+def test_records_parse_error_is_reported(tmp_path):
+    path = _write(tmp_path, None, raw='{"posts": [{"url": "u0"}, {"url": ')
+    errors = set()
+    records = list(iter_post_records(path, errors))
+    assert [r["url"] for r in records] == ["u0"]
+    assert len(errors) == 1
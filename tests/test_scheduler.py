@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""agent/services/crawler/scheduler：令牌桶、槽位分配与 run_bounded 背压。"""
+import asyncio
+import time
+
+import pytest
+
+from agent.services.crawler.scheduler import CrawlScheduler, TokenBucket
+
+
+def test_token_bucket_burst_then_rate():
+    bucket = TokenBucket(rate=10.0, burst=2)
+    assert bucket._reserve(1) == 0.0
+    assert bucket._reserve(1) == 0.0
+    # 令牌用尽后按缺口等待：第 3 个约 0.1 秒，第 4 个约 0.2 秒（预约保证先到先得）
+    assert bucket._reserve(1) == pytest.approx(0.1, abs=0.02)
+    assert bucket._reserve(1) == pytest.approx(0.2, abs=0.02)
+
+
+def test_token_bucket_refills_up_to_burst():
+    bucket = TokenBucket(rate=1000.0, burst=3)
+    for _ in range(3):
+        bucket._reserve(1)
+    time.sleep(0.05)
+    assert bucket._reserve(3) == 0.0
+    assert bucket._reserve(1) > 0
+
+
+def test_slots_never_exceed_capacity():
+    scheduler = CrawlScheduler(max_concurrent_pages=3, host_rate_per_sec=1000, host_burst=1000)
+    peak = 0
+
+    async def page():
+        nonlocal peak
+        async with scheduler.slot("h", "f"):
+            peak = max(peak, scheduler.stats()["in_use"])
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(*(page() for _ in range(12)))
+
+    asyncio.run(main())
+    assert peak == 3
+    assert scheduler.stats()["in_use"] == 0
+
+
+def test_run_bounded_limits_in_flight_and_keeps_order():
+    scheduler = CrawlScheduler(max_pending_jobs=2)
+    active = peak = 0
+
+    def factory(i):
+        async def job():
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01 * (5 - i))
+            active -= 1
+            return i
+        return job
+
+    results = asyncio.run(scheduler.run_bounded(factory(i) for i in range(5)))
+    assert results == [0, 1, 2, 3, 4]
+    assert peak == 2
+
+
+def test_run_bounded_cancels_siblings_on_failure():
+    scheduler = CrawlScheduler(max_concurrent_pages=4, max_pending_jobs=4, host_rate_per_sec=1000, host_burst=1000)
+    cancelled = []
+
+    def slow(i):
+        async def job():
+            try:
+                async with scheduler.slot("h", "f"):
+                    await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(i)
+                raise
+        return job
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            await scheduler.run_bounded([slow(0), fail, slow(1)])
+
+    asyncio.run(main())
+    assert sorted(cancelled) == [0, 1]
+    assert scheduler.stats()["in_use"] == 0
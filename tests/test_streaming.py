@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""agent/services/crawler/streaming：阶段串联、失败项上报与背压。"""
+import asyncio
+
+from agent.services.crawler.streaming import Stage, run_stages
+
+
+def test_items_flow_through_all_stages():
+    async def double(x):
+        return x * 2
+
+    outputs, stats = asyncio.run(run_stages(range(5), [
+        Stage("double", double, workers=2),
+        Stage("inc", lambda x: x + 1, blocking=True),
+    ]))
+    assert sorted(outputs) == [1, 3, 5, 7, 9]
+    assert stats["stages"]["double"]["processed"] == 5
+    assert stats["stages"]["inc"]["processed"] == 5
+    assert stats["failures"] == []
+
+
+def test_failed_items_are_reported_not_passed_downstream():
+    def check(x):
+        if x % 2:
+            raise ValueError(f"odd {x}")
+        return x
+
+    seen = []
+    outputs, stats = asyncio.run(run_stages(range(4), [
+        Stage("check", check, blocking=True),
+        Stage("collect", lambda x: seen.append(x) or x, blocking=True),
+    ]))
+    assert sorted(outputs) == sorted(seen) == [0, 2]
+    assert stats["stages"]["check"]["failed"] == 2
+    assert sorted((f["stage"], f["item"], f["error"]) for f in stats["failures"]) == [
+        ("check", 1, "odd 1"), ("check", 3, "odd 3"),
+    ]
+
+
+def test_bounded_queue_applies_backpressure():
+    consumed = []
+    lead = []
+
+    def source():
+        for i in range(20):
+            consumed.append(i)
+            yield i
+
+    async def slow(x):
+        await asyncio.sleep(0.01)
+        lead.append(len(consumed) - 1 - x)
+        return x
+
+    outputs, _ = asyncio.run(run_stages(source(), [Stage("slow", slow, queue_size=2)]))
+    assert sorted(outputs) == list(range(20))
+    # 上游最多领先：队列中的 2 项 + 阻塞在 put 上的 1 项
+    assert max(lead) <= 3
+
+
+def test_no_stages_returns_items():
+    outputs, stats = asyncio.run(run_stages([1, 2], []))
+    assert outputs == [1, 2]
+    assert stats["failures"] == []
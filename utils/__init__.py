@@ -10,6 +10,12 @@ from .file_handler import (
     get_file_md5_hex,
     listdir_with_allowed_type,
     list_allowed_files_recursive,
+    atomic_write_json,
+    atomic_write_text,
+    JsonPostStream,
+    add_documents_in_batches,
+    iter_document_batches,
+    iter_json_documents,
     json_loader,
     pdf_loader,
     txt_loader,
@@ -20,6 +26,7 @@ from .headers_handler import (
     get_headers,
 )
 from .logger_handler import logger
+from .sqlite_handler import connect_sqlite, sqlite_session
 from .path_tool import get_abs_path, get_project_root
 from .timer import timer, timed
 from .dimension_config import (
@@ -42,6 +49,12 @@ __all__ = [
     "get_file_md5_hex",
     "listdir_with_allowed_type",
     "list_allowed_files_recursive",
+    "atomic_write_json",
+    "atomic_write_text",
+    "JsonPostStream",
+    "add_documents_in_batches",
+    "iter_document_batches",
+    "iter_json_documents",
     "json_loader",
     "pdf_loader",
     "txt_loader",
@@ -49,6 +62,8 @@ __all__ = [
     "get_default_headers",
     "get_headers",
     "logger",
+    "connect_sqlite",
+    "sqlite_session",
     "get_abs_path",
     "get_project_root",
     "timer",
@@ -1,7 +1,10 @@
 import json
 import os
 import hashlib
+import re
 import sys
+import threading
+from typing import Any, Iterable, Iterator
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -69,6 +72,27 @@ def list_allowed_files_recursive(path: str, allowed_types: tuple[str]) -> list[s
     return files
 
 
+def atomic_write_text(path: str, text: str) -> None:
+    """
+    原子写入文本：先写同目录临时文件再 os.replace，中断不会留下半个文件。
+    临时文件名带进程号与线程号，多个进程/线程同时写同一路径时互不覆盖对方的临时文件；失败时清理临时文件。
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def atomic_write_json(path: str, data: Any) -> None:
+    """原子写入 JSON（ensure_ascii=False, indent=2），见 atomic_write_text。"""
+    atomic_write_text(path, json.dumps(data, ensure_ascii=False, indent=2))
+
+
 def pdf_loader(filepath: str, passwd=None) -> list[Document]:
     return PyPDFLoader(filepath, passwd).load()
 
@@ -77,43 +101,175 @@ def txt_loader(filepath: str) -> list[Document]:
     return TextLoader(filepath, encoding="utf-8").load()
 
 
-def json_loader(filepath: str) -> list[Document]:
+DEFAULT_JSON_CHUNK_SIZE = 64 * 1024     # 流式读取 JSON 的分块大小（字符）
+DEFAULT_DOCUMENT_BATCH_SIZE = 64
+
+_JSON_WS = re.compile(r"[ \t\n\r]*")
+_json_decoder = json.JSONDecoder()
+
+
+class JsonPostStream:
     """
-    加载 BBS 版面每日爬取的 JSON（含 section_name, board_name, date, posts）。
-    每个帖子转为一条 Document，便于检索。
+    流式读取版面-日期 JSON：逐个产出 posts 数组中的帖子 dict，不把整个文件读入内存。
+    其他顶层字段（section_name、board_name、date 等）解析后放入 header；爬虫与清理写回时头部字段都在 posts 之前，
+    posts 之后才出现的字段只在遍历结束后可见。遍历结束后 has_posts 表示文件是否含 posts 键
+    （值为 null 或不是数组时不产出帖子，该值也不放入 header）。
+    峰值内存约为单个帖子 + 一个读取分块；格式错误时抛出 ValueError。
+    用法: stream = JsonPostStream(path); for post in stream: ... stream.header ...
     """
-    out = []
+
+    def __init__(self, filepath: str, chunk_size: int = DEFAULT_JSON_CHUNK_SIZE):
+        self.filepath = filepath
+        self.chunk_size = max(int(chunk_size), 1024)
+        self.header: dict[str, Any] = {}
+        self.has_posts = False
+        self._f = None
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _read(self) -> None:
+        # 单个值跨越多个分块时按已缓冲长度加倍读取，避免反复从头解析
+        chunk = self._f.read(max(self.chunk_size, len(self._buf) - self._pos))
+        if not chunk:
+            self._eof = True
+        self._buf += chunk
+
+    def _peek(self) -> str:
+        """跳过空白并返回下一个字符（不消费）；文件已结束时抛出 ValueError。"""
+        while True:
+            self._pos = _JSON_WS.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if self._eof:
+                raise ValueError(f"{self.filepath} 在第 {self._pos} 个字符处意外结束")
+            self._read()
+
+    def _value(self) -> Any:
+        """解析当前位置的一个完整 JSON 值，已消费的缓冲区前缀随即丢弃。"""
+        self._peek()
+        while True:
+            try:
+                value, end = _json_decoder.raw_decode(self._buf, self._pos)
+                # 数字等值恰好停在缓冲区末尾时可能还没读完
+                if end < len(self._buf) or self._eof:
+                    self._pos = end
+                    if self._pos > self.chunk_size:
+                        self._buf = self._buf[self._pos:]
+                        self._pos = 0
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._read()
+
+    def __iter__(self) -> Iterator[dict]:
+        with open(self.filepath, "r", encoding="utf-8") as f:
+            self._f, self._buf, self._pos, self._eof = f, "", 0, False
+            try:
+                if self._peek() != "{":
+                    return
+                self._pos += 1
+                while True:
+                    ch = self._peek()
+                    if ch == ",":
+                        self._pos += 1
+                        continue
+                    if ch == "}":
+                        return
+                    key = self._value()
+                    if self._peek() != ":":
+                        raise ValueError(f"{self.filepath} 在第 {self._pos} 个字符处缺少冒号")
+                    self._pos += 1
+                    if key == "posts" and self._peek() != "[":
+                        self.has_posts = True
+                        self._value()
+                    elif key == "posts":
+                        self.has_posts = True
+                        self._pos += 1
+                        while True:
+                            ch = self._peek()
+                            if ch == ",":
+                                self._pos += 1
+                            elif ch == "]":
+                                self._pos += 1
+                                break
+                            else:
+                                post = self._value()
+                                if isinstance(post, dict):
+                                    yield post
+                    else:
+                        self.header[key] = self._value()
+            finally:
+                self._f, self._buf = None, ""
+
+
+def _post_document(filepath: str, header: dict, post: dict) -> Document:
+    section = header.get("section_name", "")
+    board = header.get("board_name", "")
+    date = header.get("date", "")
+    title = post.get("title", "")
+    author = post.get("author", "")
+    time_str = post.get("time", "")
+    reply_count = post.get("reply_count", 0)
+    url = post.get("url", "")
+    content = (
+        f"版面：{section} {board} 日期：{date} "
+        f"标题：{title} 作者：{author} 时间：{time_str} 回复数：{reply_count} 链接：{url}"
+    )
+    return Document(
+        page_content=content,
+        metadata={
+            "source": filepath,
+            "section": section,
+            "board": board,
+            "date": date,
+            "title": title,
+            "reply_count": reply_count,
+        },
+    )
+
+
+def iter_json_documents(filepath: str, chunk_size: int = DEFAULT_JSON_CHUNK_SIZE) -> Iterator[Document]:
+    """
+    流式加载 BBS 版面每日爬取的 JSON（含 section_name, board_name, date, posts）：
+    逐个解析 posts 中的帖子并产出 Document，内存占用与文件大小无关。读取或解析失败时记录日志并停止。
+    """
+    stream = JsonPostStream(filepath, chunk_size=chunk_size)
     try:
-        with open(filepath, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        for post in stream:
+            yield _post_document(filepath, stream.header, post)
     except Exception as e:
         logger.error(f"[json_loader]读取 {filepath} 失败: {e}")
-        return out
-    section = data.get("section_name", "")
-    board = data.get("board_name", "")
-    date = data.get("date", "")
-    posts = data.get("posts") or []
-    for p in posts:
-        title = p.get("title", "")
-        author = p.get("author", "")
-        time_str = p.get("time", "")
-        reply_count = p.get("reply_count", 0)
-        url = p.get("url", "")
-        content = (
-            f"版面：{section} {board} 日期：{date} "
-            f"标题：{title} 作者：{author} 时间：{time_str} 回复数：{reply_count} 链接：{url}"
-        )
-        out.append(
-            Document(
-                page_content=content,
-                metadata={
-                    "source": filepath,
-                    "section": section,
-                    "board": board,
-                    "date": date,
-                    "title": title,
-                    "reply_count": reply_count,
-                },
-            )
-        )
-    return out
+
+
+def json_loader(filepath: str) -> list[Document]:
+    """
+    加载 BBS 版面每日爬取的 JSON（含 section_name, board_name, date, posts）。
+    每个帖子转为一条 Document，便于检索；大文件请用 iter_json_documents 逐条读取。
+    """
+    return list(iter_json_documents(filepath))
+
+
+def iter_document_batches(documents: Iterable[Document], batch_size: int = DEFAULT_DOCUMENT_BATCH_SIZE) -> Iterator[list[Document]]:
+    """把 Document 流按固定大小分批，最后一批可能不足 batch_size。"""
+    batch: list[Document] = []
+    for doc in documents:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def add_documents_in_batches(vector_store, documents: Iterable[Document], batch_size: int = DEFAULT_DOCUMENT_BATCH_SIZE) -> int:
+    """
+    按固定批量把 Document 流写入向量库（vector_store.add_documents），同一时刻只持有一批，返回写入条数。
+    用法: add_documents_in_batches(store, (d for p in paths for d in iter_json_documents(p)))
+    """
+    count = 0
+    for batch in iter_document_batches(documents, batch_size=max(int(batch_size), 1)):
+        vector_store.add_documents(batch)
+        count += len(batch)
+    return count
@@ -0,0 +1,51 @@
+"""
+SQLite handler：为各本地索引/侧存储提供统一的连接方式（WAL、忙等待、Row 工厂）。
+每次操作新建连接，便于在线程池与多进程间安全使用。
+"""
+import os
+import sqlite3
+import sys
+from contextlib import contextmanager
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.path_tool import get_abs_path
+
+DEFAULT_BUSY_TIMEOUT = 30.0
+
+
+def resolve_db_path(db_path: str) -> str:
+    """相对路径按项目根目录解析，并确保父目录存在。"""
+    path = db_path if os.path.isabs(db_path) else get_abs_path(db_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def connect_sqlite(db_path: str, timeout: float = DEFAULT_BUSY_TIMEOUT) -> sqlite3.Connection:
+    """
+    打开 SQLite 连接：开启 WAL 与 NORMAL 同步级别，行以 sqlite3.Row 返回。
+    :param db_path: 数据库文件路径（相对路径按项目根目录解析）
+    :param timeout: 锁等待秒数
+    """
+    conn = sqlite3.connect(resolve_db_path(db_path), timeout=timeout)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+@contextmanager
+def sqlite_session(db_path: str, timeout: float = DEFAULT_BUSY_TIMEOUT):
+    """
+    上下文管理器：正常退出时提交，异常时回滚，最后关闭连接。
+    用法: with sqlite_session(path) as conn: conn.execute(...)
+    """
+    conn = connect_sqlite(db_path, timeout=timeout)
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()